@@ -0,0 +1,450 @@
+"""Нагрузочный прогон бота на синтетических обновлениях Telegram.
+
+Собирает настоящий диспетчер из main.py и подает ему обновления через
+dp.feed_update, как это делают поллинг и вебхук. Bot API подменяется
+фейковой сессией, которая ничего не отправляет в сеть, но возвращает
+правдоподобные ответы и считает вызовы. FSM и кэши работают на
+fakeredis (или на настоящем Redis с --redis real), база — локальный
+PostgreSQL из infra/docker-compose.yml с примененными миграциями.
+
+Сценарии (по умолчанию в пропорции start=2,browse=5,register=1):
+
+    start     /start
+    browse    категория -> следующая страница -> пост -> назад к списку
+    register  регистрация ребенка: кнопка, имя, фамилия, возраст, контакт
+
+Запуск из каталога fastapi_app:
+
+    pip install fakeredis
+    python -m benchmarks.replay --rate 50 --duration 30
+    python -m benchmarks.replay --mix browse=1 --api-latency 40 --json result.json
+
+Отчет: p50/p95/p99 времени обработки обновления, среднее число
+SQL-запросов и вызовов Bot API на обновление — по шагам и в целом.
+Созданные пользователи, заявки и мероприятия удаляются после прогона
+(--keep-data оставляет их).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncGenerator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMediaGroup, TelegramMethod
+from aiogram.types import (
+    CallbackQuery,
+    Chat,
+    InlineKeyboardMarkup,
+    Message,
+    PhotoSize,
+    Update,
+    User as TelegramUser,
+)
+from sqlalchemy import delete, event, select
+
+import main
+from core.config import settings
+from core.db import async_session_maker, engine
+from core.events_cache import events_cache
+from core.logging_config import LOGGING_CONFIG
+from core.user_cache import user_cache
+from crud.events import events_crud
+from services.models import ChildRegistration, Event, User
+
+# Диапазоны синтетических данных, по которым они удаляются после прогона
+TELEGRAM_ID_BASE = 9_100_000_000
+VK_POST_PREFIX = "bench-"
+CATEGORIES = ("competition", "event", "sponsor")
+
+# Счетчики текущего обновления: SQL-запросы и вызовы Bot API
+_queries: ContextVar[Optional[list[int]]] = ContextVar("bench_queries", default=None)
+_api_calls: ContextVar[Optional[list[int]]] = ContextVar("bench_api_calls", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class FakeSession(BaseSession):
+    """Сессия Bot API без сети с записью отправленных сообщений по чатам."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: dict[str, int] = defaultdict(int)
+        self.messages: dict[int, list[Message]] = defaultdict(list)
+        self._ids = itertools.count(1)
+
+    def _message(self, chat_id: int, method: TelegramMethod, photo: bool = False) -> Message:
+        message_id = getattr(method, "message_id", None) or next(self._ids)
+        markup = getattr(method, "reply_markup", None)
+        message = Message(
+            message_id=message_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=chat_id, type="private"),
+            text=None if photo else getattr(method, "text", None),
+            caption=getattr(method, "caption", None),
+            photo=[PhotoSize(
+                file_id=f"bench-file-{message_id}",
+                file_unique_id=f"bench-{message_id}",
+                width=1280,
+                height=720,
+            )] if photo else None,
+            reply_markup=markup if isinstance(markup, InlineKeyboardMarkup) else None,
+        )
+        history = self.messages[chat_id]
+        history[:] = [m for m in history if m.message_id != message_id][-20:]
+        history.append(message)
+        return message
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        name = type(method).__name__
+        self.calls[name] += 1
+        counter = _api_calls.get()
+        if counter is not None:
+            counter[0] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        chat_id = getattr(method, "chat_id", None)
+        if isinstance(method, SendMediaGroup):
+            return [self._message(chat_id, method, photo=True) for _ in method.media]
+        if name == "SendPhoto":
+            return self._message(chat_id, method, photo=True)
+        if name in ("SendMessage", "EditMessageText", "EditMessageReplyMarkup", "EditMessageCaption"):
+            return self._message(chat_id, method)
+        return True
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+    def find_button(self, chat_id: int, prefix: str) -> Optional[tuple[Message, str]]:
+        """Последнее сообщение с кнопкой, callback_data которой начинается с prefix."""
+        for message in reversed(self.messages[chat_id]):
+            if message.reply_markup is None:
+                continue
+            for row in message.reply_markup.inline_keyboard:
+                for button in row:
+                    if button.callback_data and button.callback_data.startswith(prefix):
+                        return message, button.callback_data
+        return None
+
+
+@dataclass
+class Sample:
+    step: str
+    latency: float
+    queries: int
+    api_calls: int
+    error: Optional[str] = None
+
+
+@dataclass
+class Replay:
+    """Состояние прогона: бот, счетчики и собранные замеры."""
+
+    bot: Bot
+    session: FakeSession
+    samples: list[Sample] = field(default_factory=list)
+    update_ids: itertools.count = field(default_factory=lambda: itertools.count(1))
+    message_ids: itertools.count = field(default_factory=lambda: itertools.count(1_000_000))
+
+    def _user(self, telegram_id: int) -> TelegramUser:
+        return TelegramUser(id=telegram_id, is_bot=False, first_name="Bench", username=f"bench{telegram_id}")
+
+    async def feed(self, step: str, **payload: Any) -> None:
+        update = Update(update_id=next(self.update_ids), **payload)
+        queries, api_calls = [0], [0]
+        queries_token = _queries.set(queries)
+        api_token = _api_calls.set(api_calls)
+        started = time.perf_counter()
+        error = None
+        try:
+            await main.dp.feed_update(self.bot, update)
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            latency = time.perf_counter() - started
+            _queries.reset(queries_token)
+            _api_calls.reset(api_token)
+        self.samples.append(Sample(step, latency, queries[0], api_calls[0], error))
+
+    async def send_text(self, step: str, telegram_id: int, text: str) -> None:
+        await self.feed(step, message=Message(
+            message_id=next(self.message_ids),
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=telegram_id, type="private"),
+            from_user=self._user(telegram_id),
+            text=text,
+        ))
+
+    async def tap(self, step: str, telegram_id: int, prefix: str) -> bool:
+        """Нажать кнопку из последнего сообщения бота; False, если ее нет."""
+        found = self.session.find_button(telegram_id, prefix)
+        if found is None:
+            return False
+        message, data = found
+        await self.feed(step, callback_query=CallbackQuery(
+            id=str(next(self.update_ids)),
+            from_user=self._user(telegram_id),
+            chat_instance=str(telegram_id),
+            data=data,
+            message=message,
+        ))
+        return True
+
+    async def tap_data(self, step: str, telegram_id: int, data: str) -> None:
+        """Нажать кнопку главного меню (его reply-клавиатура не хранится)."""
+        message = Message(
+            message_id=next(self.message_ids),
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=telegram_id, type="private"),
+            text="menu",
+        )
+        await self.feed(step, callback_query=CallbackQuery(
+            id=str(next(self.update_ids)),
+            from_user=self._user(telegram_id),
+            chat_instance=str(telegram_id),
+            data=data,
+            message=message,
+        ))
+
+
+async def scenario_start(replay: Replay, telegram_id: int) -> None:
+    await replay.send_text("start", telegram_id, "/start")
+
+
+async def scenario_browse(replay: Replay, telegram_id: int) -> None:
+    await replay.tap_data("category", telegram_id, random.choice(CATEGORIES))
+    await replay.tap("page_N", telegram_id, "page_")
+    if await replay.tap("details_N", telegram_id, "/details_"):
+        await replay.tap("back_to_list", telegram_id, "back_to_list_")
+
+
+async def scenario_register(replay: Replay, telegram_id: int) -> None:
+    await replay.tap_data("child_reg", telegram_id, "child_reg")
+    await replay.send_text("child_name", telegram_id, "Иван")
+    await replay.send_text("child_surname", telegram_id, f"Тестов{random.randint(1, 10**6)}")
+    await replay.send_text("child_age", telegram_id, str(random.randint(5, 17)))
+    await replay.send_text("parent_contact", telegram_id, "+79990000000")
+
+
+SCENARIOS = {
+    "start": (scenario_start, 1),
+    "browse": (scenario_browse, 4),
+    "register": (scenario_register, 5),
+}
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def seed_events(per_category: int, images: int) -> None:
+    """Создать мероприятия bench-* (повторный запуск ничего не меняет)."""
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "vk_post_id": f"{VK_POST_PREFIX}{category}-{i}",
+            "title": f"Тестовое мероприятие {i}",
+            "content": "Текст поста для нагрузочного прогона. " * 20,
+            "images": [f"https://example.com/bench/{category}/{i}/{n}.jpg" for n in range(images)],
+            "published_at": now - timedelta(hours=i),
+            "category": category,
+            "status": "active",
+        }
+        for category in CATEGORIES
+        for i in range(per_category)
+    ]
+    async with async_session_maker() as session, session.begin():
+        await events_crud.upsert_vk_posts(session, rows)
+
+
+async def cleanup(users: int) -> None:
+    telegram_ids = range(TELEGRAM_ID_BASE, TELEGRAM_ID_BASE + users)
+    async with async_session_maker() as session, session.begin():
+        user_ids = select(User.id).where(User.telegram_id.in_(telegram_ids))
+        await session.execute(delete(ChildRegistration).where(ChildRegistration.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.telegram_id.in_(telegram_ids)))
+        await session.execute(delete(Event).where(Event.vk_post_id.startswith(VK_POST_PREFIX)))
+    for telegram_id in telegram_ids:
+        await user_cache.invalidate(telegram_id)
+    await events_cache.invalidate(*CATEGORIES)
+
+
+def use_fake_redis() -> None:
+    """Переключить FSM и кэши на fakeredis."""
+    try:
+        import fakeredis.aioredis
+    except ImportError:
+        sys.exit("fakeredis is not installed: pip install fakeredis (or use --redis real)")
+    from aiocache import Cache
+    from aiocache.serializers import PickleSerializer
+
+    server = fakeredis.FakeServer()
+    main.storage.redis = fakeredis.aioredis.FakeRedis(server=server)
+    user_cache.redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    main.idempotency.redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    events_cache.cache = Cache(Cache.MEMORY, namespace="events:", serializer=PickleSerializer())
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[Sample]) -> dict[str, Any]:
+    latencies = [s.latency * 1000 for s in samples]
+    return {
+        "updates": len(samples),
+        "errors": sum(1 for s in samples if s.error),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "db_queries_per_update": round(statistics.fmean(s.queries for s in samples), 2),
+        "api_calls_per_update": round(statistics.fmean(s.api_calls for s in samples), 2),
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    columns = ("updates", "errors", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+               "db_queries_per_update", "api_calls_per_update")
+    headers = ("step", "updates", "errors", "p50 ms", "p95 ms", "p99 ms", "max ms", "db q/upd", "api/upd")
+    rows = [(name, *(str(stats[c]) for c in columns)) for name, stats in report["steps"].items()]
+    rows.append(("TOTAL", *(str(report["total"][c]) for c in columns)))
+    widths = [max(len(h), *(len(r[i]) for r in rows)) for i, h in enumerate(headers)]
+    print(f"\nrate: target {report['target_rate']}/s, achieved {report['achieved_rate']}/s, "
+          f"duration {report['duration_s']} s, dropped scenarios {report['dropped']}")
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+    print("\nBot API calls:", ", ".join(f"{k}={v}" for k, v in sorted(report["api_calls"].items())))
+    if report["error_types"]:
+        print("errors:", ", ".join(f"{k}={v}" for k, v in report["error_types"].items()))
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    if args.redis == "fake":
+        use_fake_redis()
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_query)
+    await seed_events(args.events, args.images)
+
+    session = FakeSession(latency=args.api_latency / 1000)
+    replay = Replay(bot=Bot(token=settings.telegram_bot_token, session=session), session=session)
+
+    # Свободные пользователи: у одного пользователя сценарии идут по очереди
+    free_users: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(args.users):
+        free_users.put_nowait(TELEGRAM_ID_BASE + i)
+
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    updates_per_scenario = sum(SCENARIOS[n][1] * w for n, w in zip(names, weights)) / sum(weights)
+    interval = updates_per_scenario / args.rate
+
+    async def run_scenario(name: str, telegram_id: int) -> None:
+        try:
+            await SCENARIOS[name][0](replay, telegram_id)
+        finally:
+            free_users.put_nowait(telegram_id)
+
+    tasks: set[asyncio.Task] = set()
+    dropped = 0
+    started = time.perf_counter()
+    deadline = started + args.duration
+    next_start = started
+    while next_start < deadline:
+        await asyncio.sleep(max(0.0, next_start - time.perf_counter()))
+        next_start += random.expovariate(1 / interval)
+        if free_users.empty():
+            dropped += 1
+            continue
+        name = random.choices(names, weights)[0]
+        task = asyncio.create_task(run_scenario(name, free_users.get_nowait()))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    samples = replay.samples
+    by_step: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_step[sample.step].append(sample)
+    error_types: dict[str, int] = defaultdict(int)
+    for sample in samples:
+        if sample.error:
+            error_types[sample.error] += 1
+
+    report = {
+        "target_rate": args.rate,
+        "achieved_rate": round(len(samples) / elapsed, 1),
+        "duration_s": round(elapsed, 1),
+        "dropped": dropped,
+        "steps": {name: summarize(items) for name, items in by_step.items()},
+        "total": summarize(samples) if samples else {},
+        "api_calls": dict(session.calls),
+        "error_types": dict(error_types),
+    }
+    if not args.keep_data:
+        await cleanup(args.users)
+    await replay.bot.session.close()
+    await engine.dispose()
+    return report
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Replay synthetic Telegram updates against the bot dispatcher")
+    parser.add_argument("--rate", type=float, default=20, help="target updates per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to generate load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("start=2,browse=5,register=1"),
+                        help="scenario weights, e.g. start=1,browse=3,register=1")
+    parser.add_argument("--users", type=int, default=200, help="synthetic Telegram users")
+    parser.add_argument("--events", type=int, default=30, help="seeded events per category")
+    parser.add_argument("--images", type=int, default=1, help="images per seeded event")
+    parser.add_argument("--api-latency", type=float, default=0, help="simulated Bot API latency, ms")
+    parser.add_argument("--redis", choices=("fake", "real"), default="fake")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--keep-data", action="store_true", help="do not delete synthetic rows afterwards")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for a reproducible mix")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    for name in LOGGING_CONFIG["loggers"]:
+        logging.getLogger(name or None).setLevel(args.log_level.upper())
+
+    report = asyncio.run(run(args))
+    if not report["total"]:
+        sys.exit("no updates were replayed")
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,347 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+from uuid import uuid4
+
+from aiogram import Bot
+from prometheus_client import Counter
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.notifications import BLOCKED, NotificationDispatcher
+
+logger = logging.getLogger("my_app.broadcast")
+
+broadcast_messages_total = Counter(
+    "broadcast_messages_total",
+    "Broadcast deliveries by result",
+    ["result"],
+)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+
+
+@dataclass(frozen=True)
+class BroadcastProgress:
+    """Состояние рассылки из Redis."""
+
+    id: int
+    status: str
+    total: int
+    sent: int
+    failed: int
+    blocked: int
+    created_by: int
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, CANCELLED)
+
+
+class BroadcastManager:
+    """Рассылка сообщения всем пользователям бота.
+
+    Получатели читаются из users порциями по возрастанию id и
+    отправляются пулом из concurrency воркеров через NotificationDispatcher
+    (общий лимит rate сообщений в секунду, повтор после RetryAfter).
+    Прогресс хранится в Redis:
+
+    - broadcast:{id} — текст, статус, счетчики и last_user_id, id последнего
+      получателя полностью отправленной порции;
+    - broadcast:{id}:done — id получателей текущей порции, которым сообщение
+      уже ушло, и broadcast:{id}:blocked — telegram_id заблокировавших бота
+      в текущей порции;
+    - broadcast:{id}:lease — владелец рассылки, продлевается, пока она идет.
+
+    После падения процесса рассылка продолжается с last_user_id без
+    повторной отправки уже получившим (resume при старте приложения),
+    после ошибки внутри процесса — повторяется с паузой до max_retry_delay.
+    Пользователи, заблокировавшие бота, помечаются в users.blocked_at и
+    в следующие рассылки не попадают.
+    """
+
+    key_prefix = "broadcast"
+
+    def __init__(
+        self,
+        bot: Bot,
+        redis: Redis,
+        session_maker: async_sessionmaker,
+        rate: float = 25,
+        concurrency: int = 20,
+        chunk_size: int = 500,
+        lease_ttl: int = 60,
+        retry_delay: float = 5,
+        max_retry_delay: float = 300,
+    ) -> None:
+        self.bot = bot
+        self.redis = redis
+        self.session_maker = session_maker
+        self.rate = rate
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.lease_ttl = lease_ttl
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.owner = uuid4().hex
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    def _key(self, broadcast_id: int, suffix: Optional[str] = None) -> str:
+        key = f"{self.key_prefix}:{broadcast_id}"
+        return f"{key}:{suffix}" if suffix else key
+
+    @property
+    def _active_key(self) -> str:
+        return f"{self.key_prefix}:active"
+
+    async def create(self, text: str, created_by: int) -> int:
+        """Сохранить новую рассылку; отправка начинается после start()."""
+        # Ленивый импорт: crud импортирует services, а обработчики админа — этот модуль
+        from crud.users import users_crud
+
+        broadcast_id = await self.redis.incr(f"{self.key_prefix}:seq")
+        async with self.session_maker() as session:
+            total = await users_crud.count_broadcast_recipients(session)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(broadcast_id), mapping={
+                "text": text,
+                "status": PENDING,
+                "created_by": created_by,
+                "created_at": int(time.time()),
+                "total": total,
+                "sent": 0,
+                "failed": 0,
+                "blocked": 0,
+                "last_user_id": 0,
+            })
+            pipe.sadd(self._active_key, broadcast_id)
+            await pipe.execute()
+        logger.info(f"Broadcast {broadcast_id} created by {created_by} for {total} users")
+        return broadcast_id
+
+    def start(self, broadcast_id: int) -> None:
+        """Запустить отправку в фоне, если она еще не идет в этом процессе."""
+        if broadcast_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(broadcast_id))
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+
+    async def resume(self) -> None:
+        """Продолжить незавершенные рассылки (после рестарта или падения)."""
+        for broadcast_id in await self.redis.smembers(self._active_key):
+            self.start(int(broadcast_id))
+
+    async def cancel(self, broadcast_id: int) -> bool:
+        """Остановить рассылку; воркер заметит это перед следующей порцией."""
+        status = await self.redis.hget(self._key(broadcast_id), "status")
+        if status is None or status in (DONE, CANCELLED):
+            return False
+        await self.redis.hset(self._key(broadcast_id), "status", CANCELLED)
+        return True
+
+    async def get_progress(self, broadcast_id: int) -> Optional[BroadcastProgress]:
+        raw = await self.redis.hgetall(self._key(broadcast_id))
+        if not raw:
+            return None
+        return BroadcastProgress(
+            id=broadcast_id,
+            status=raw["status"],
+            total=int(raw["total"]),
+            sent=int(raw["sent"]),
+            failed=int(raw["failed"]),
+            blocked=int(raw["blocked"]),
+            created_by=int(raw["created_by"]),
+        )
+
+    async def close(self) -> None:
+        """Остановить фоновые задачи; рассылки продолжатся после рестарта."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # region Отправка
+
+    async def _acquire_lease(self, broadcast_id: int) -> bool:
+        return bool(await self.redis.set(
+            self._key(broadcast_id, "lease"), self.owner, nx=True, ex=self.lease_ttl,
+        ))
+
+    async def _keep_lease(self, broadcast_id: int, delivery: asyncio.Task) -> None:
+        """Продлевать аренду, пока идет отправка; при потере — остановить отправку.
+
+        Аренда считается потерянной, если ключ принадлежит другому процессу
+        или ее не удавалось продлить дольше lease_ttl (ключ мог истечь,
+        и рассылку подхватил другой процесс).
+        """
+        key = self._key(broadcast_id, "lease")
+        extended_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                if await self.redis.get(key) != self.owner:
+                    logger.error(f"Broadcast {broadcast_id} lease lost, stopping delivery")
+                    delivery.cancel()
+                    return
+                await self.redis.expire(key, self.lease_ttl)
+                extended_at = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Failed to extend broadcast {broadcast_id} lease: {e}")
+                if time.monotonic() - extended_at >= self.lease_ttl:
+                    logger.error(f"Broadcast {broadcast_id} lease expired, stopping delivery")
+                    delivery.cancel()
+                    return
+
+    async def _release_lease(self, broadcast_id: int) -> None:
+        key = self._key(broadcast_id, "lease")
+        try:
+            if await self.redis.get(key) == self.owner:
+                await self.redis.delete(key)
+        except Exception as e:
+            logger.warning(f"Failed to release broadcast {broadcast_id} lease: {e}")
+
+    async def _run(self, broadcast_id: int) -> None:
+        """Отправка под арендой; после ошибки — повтор с растущей паузой.
+
+        Повтор продолжает с контрольной точки и заканчивается, когда
+        рассылка завершена или отменена. Если аренда потеряна, рассылку
+        продолжает ее новый владелец, а этот процесс выходит.
+        """
+        delay = self.retry_delay
+        while True:
+            if not await self._acquire_lease(broadcast_id):
+                logger.info(f"Broadcast {broadcast_id} is running in another process")
+                return
+            delivery = asyncio.create_task(self._deliver_all(broadcast_id))
+            heartbeat = asyncio.create_task(self._keep_lease(broadcast_id, delivery))
+            try:
+                await delivery
+                return
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # Остановка приложения: продолжим после рестарта
+                    logger.info(f"Broadcast {broadcast_id} paused, will resume after restart")
+                    raise
+                # Отправку остановил heartbeat: аренда у другого процесса
+                return
+            except Exception as e:
+                logger.error(
+                    f"Broadcast {broadcast_id} failed: {e}, retrying in {delay:.0f}s",
+                    exc_info=True,
+                )
+            finally:
+                heartbeat.cancel()
+                await self._release_lease(broadcast_id)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def _deliver_all(self, broadcast_id: int) -> None:
+        from crud.users import users_crud
+
+        key = self._key(broadcast_id)
+        raw = await self.redis.hgetall(key)
+        if not raw or raw["status"] in (DONE, CANCELLED):
+            await self.redis.srem(self._active_key, broadcast_id)
+            return
+        text = raw["text"]
+        last_user_id = int(raw["last_user_id"])
+        await self.redis.hset(key, "status", RUNNING)
+        logger.info(f"Broadcast {broadcast_id} running from user id {last_user_id}")
+
+        dispatcher = NotificationDispatcher(
+            self.bot,
+            global_rate=self.rate,
+            concurrency=self.concurrency,
+        )
+        status = DONE
+        while True:
+            if await self.redis.hget(key, "status") == CANCELLED:
+                status = CANCELLED
+                break
+            async with self.session_maker() as session:
+                chunk = await users_crud.get_broadcast_chunk(session, last_user_id, self.chunk_size)
+            if not chunk:
+                break
+
+            # После падения внутри порции часть получателей уже отмечена
+            done = {int(user_id) for user_id in await self.redis.smembers(self._key(broadcast_id, "done"))}
+            pending = [row for row in chunk if row.id not in done]
+            await self._send_chunk(broadcast_id, dispatcher, text, pending)
+            blocked = [int(telegram_id) for telegram_id in await self.redis.smembers(self._key(broadcast_id, "blocked"))]
+            if blocked:
+                async with self.session_maker() as session:
+                    await users_crud.mark_blocked(session, blocked)
+
+            last_user_id = chunk[-1].id
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, "last_user_id", last_user_id)
+                pipe.delete(self._key(broadcast_id, "done"), self._key(broadcast_id, "blocked"))
+                await pipe.execute()
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"status": status, "finished_at": int(time.time())})
+            pipe.srem(self._active_key, broadcast_id)
+            await pipe.execute()
+        progress = await self.get_progress(broadcast_id)
+        logger.info(f"Broadcast {broadcast_id} {status}: {progress}")
+        await self._report(progress)
+
+    async def _send_chunk(
+        self,
+        broadcast_id: int,
+        dispatcher: NotificationDispatcher,
+        text: str,
+        recipients: Sequence[Any],
+    ) -> None:
+        """Отправить порцию пулом воркеров, отмечая каждого получателя в Redis."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for row in recipients:
+            queue.put_nowait(row)
+
+        async def worker() -> None:
+            while not queue.empty():
+                row = queue.get_nowait()
+                result = await dispatcher.deliver(row.telegram_id, text)
+                broadcast_messages_total.labels(result=result).inc()
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.sadd(self._key(broadcast_id, "done"), row.id)
+                    if result == BLOCKED:
+                        pipe.sadd(self._key(broadcast_id, "blocked"), row.telegram_id)
+                    pipe.hincrby(self._key(broadcast_id), result, 1)
+                    await pipe.execute()
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(recipients)))))
+
+    async def _report(self, progress: Optional[BroadcastProgress]) -> None:
+        """Сообщить автору рассылки итог."""
+        if progress is None:
+            return
+        verb = "завершена" if progress.status == DONE else "остановлена"
+        try:
+            await self.bot.send_message(
+                progress.created_by,
+                f"Рассылка #{progress.id} {verb}.\n{format_progress(progress)}",
+            )
+        except Exception as e:
+            logger.warning(f"Failed to report broadcast {progress.id}: {e}")
+
+    # endregion
+
+
+def format_progress(progress: BroadcastProgress) -> str:
+    """Текст о ходе рассылки для админа."""
+    return (
+        f"Обработано {progress.processed} из {progress.total}: "
+        f"доставлено {progress.sent}, заблокировали бота {progress.blocked}, "
+        f"ошибок {progress.failed}."
+    )
@@ -0,0 +1,128 @@
+import copy
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Optional, cast
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Record:
+    """Состояние и данные одного ключа FSM внутри обновления."""
+
+    state: Optional[str]
+    data: Dict[str, Any]
+    state_dirty: bool = False
+    data_dirty: bool = False
+
+
+@dataclass
+class _Batch:
+    records: Dict[StorageKey, _Record] = field(default_factory=dict)
+
+
+_current_batch: ContextVar[Optional[_Batch]] = ContextVar("fsm_batch", default=None)
+
+
+class BatchingRedisStorage(RedisStorage):
+    """RedisStorage, который копит изменения FSM в пределах одного обновления.
+
+    Внутри batch() состояние и данные ключа читаются из Redis одним MGET
+    при первом обращении, все set_state/set_data/update_data меняют
+    только локальную копию, а на выходе изменения записываются одним
+    pipeline. Вне batch() хранилище работает как обычный RedisStorage.
+    Для всех записей действуют state_ttl/data_ttl, поэтому брошенные
+    диалоги (например, недописанная регистрация) истекают сами.
+    """
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        if _current_batch.get() is not None:
+            # Вложенный batch использует внешний буфер
+            yield
+            return
+        batch = _Batch()
+        token = _current_batch.set(batch)
+        try:
+            yield
+        finally:
+            _current_batch.reset(token)
+            await self._flush(batch)
+
+    async def _record(self, batch: _Batch, key: StorageKey) -> _Record:
+        record = batch.records.get(key)
+        if record is None:
+            state, data = await self.redis.mget(
+                self.key_builder.build(key, "state"),
+                self.key_builder.build(key, "data"),
+            )
+            if isinstance(state, bytes):
+                state = state.decode("utf-8")
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            record = _Record(
+                state=cast(Optional[str], state),
+                data=self.json_loads(data) if data is not None else {},
+            )
+            batch.records[key] = record
+        return record
+
+    async def _flush(self, batch: _Batch) -> None:
+        dirty = [
+            (key, record)
+            for key, record in batch.records.items()
+            if record.state_dirty or record.data_dirty
+        ]
+        if not dirty:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, record in dirty:
+                if record.state_dirty:
+                    state_key = self.key_builder.build(key, "state")
+                    if record.state is None:
+                        pipe.delete(state_key)
+                    else:
+                        pipe.set(state_key, record.state, ex=self.state_ttl)
+                if record.data_dirty:
+                    data_key = self.key_builder.build(key, "data")
+                    if not record.data:
+                        pipe.delete(data_key)
+                    else:
+                        pipe.set(data_key, self.json_dumps(record.data), ex=self.data_ttl)
+            await pipe.execute()
+        logger.debug(f"Flushed FSM changes for {len(dirty)} key(s)")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        batch = _current_batch.get()
+        if batch is None:
+            return await super().set_state(key, state)
+        record = await self._record(batch, key)
+        record.state = state.state if isinstance(state, State) else state
+        record.state_dirty = True
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        batch = _current_batch.get()
+        if batch is None:
+            return await super().get_state(key)
+        return (await self._record(batch, key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        batch = _current_batch.get()
+        if batch is None:
+            return await super().set_data(key, data)
+        record = await self._record(batch, key)
+        record.data = copy.deepcopy(data)
+        record.data_dirty = True
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        batch = _current_batch.get()
+        if batch is None:
+            return await super().get_data(key)
+        # Копия, как у RedisStorage: изменения без set_data не сохраняются
+        return copy.deepcopy((await self._record(batch, key)).data)
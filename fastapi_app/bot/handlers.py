@@ -9,8 +9,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 # Импорты из SQLAlchemy
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Импорт для логирования
 import logging
@@ -19,8 +18,9 @@ import logging
 logger = logging.getLogger(__name__)
 
 # Импорты из кастомных модулей
-from core.db import get_async_session
+from core.user_cache import CachedUser, user_cache
 from bot.keyboards import get_main_menu_keyboard  # Импортируем только функцию
+from crud.users import users_crud
 from services.models import User
 
 # Создание роутера
@@ -36,30 +36,35 @@ class QuizState(StatesGroup):
 async def start(
     message: types.Message,
     state: FSMContext,
+    session: AsyncSession,
+    user: Optional[CachedUser] = None,
 ) -> None:
     user_id = message.from_user.id
-    async with get_async_session() as session:
+    # Пользователь уже загружен RoleMiddleware через кэш, в базу идем только для новых
+    if not user:
         try:
-            result = await session.execute(
-                select(User).where(User.telegram_id == user_id).options(selectinload(User.admin_role))
+            db_user = User(telegram_id=user_id, name=message.from_user.username or "Anonymous")
+            session.add(db_user)
+            await session.commit()
+            user = CachedUser(
+                id=db_user.id,
+                telegram_id=user_id,
+                name=db_user.name,
+                is_admin=False,
             )
-            user = result.scalar_one_or_none()
-            if not user:
-                user = User(telegram_id=user_id, name=message.from_user.username or "Anonymous")
-                session.add(user)
-                await session.commit()
-                await session.refresh(user, ["admin_role"])  # Убедимся, что admin_role загружено
+            await user_cache.set(user)
         except Exception as e:
             logger.error("Database error in /start: %s", str(e))
             await message.answer("Произошла ошибка, попробуйте позже.")
             return
+    else:
+        # Пользователь, заблокировавший бота, снова получает рассылки
+        await users_crud.unblock(session, user_id)
 
-        is_admin = user.admin_role is not None
-        main_menu_kb = get_main_menu_keyboard(is_admin=is_admin)
+    main_menu_kb = get_main_menu_keyboard(is_admin=user.is_admin)
 
-        await state.set_state(QuizState.MAIN_MENU)
-        await message.answer(
-            f"Привет {user.name} добро пожаловать на страничку Федерации Борьбы г. Мытищи",
-            reply_markup=main_menu_kb,
-        )
-        await message.delete()
\ No newline at end of file
+    await state.set_state(QuizState.MAIN_MENU)
+    await message.answer(
+        f"Привет {user.name} добро пожаловать на страничку Федерации Борьбы г. Мытищи",
+        reply_markup=main_menu_kb,
+    )
\ No newline at end of file
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import InputMediaPhoto, Message
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.rate_limit import TokenBucket
+
+if TYPE_CHECKING:
+    from services.models import Event
+
+logger = logging.getLogger("my_app.media")
+
+# Картинок в одном альбоме Telegram
+MEDIA_GROUP_LIMIT = 10
+# Лимит длины подписи к фото
+CAPTION_LIMIT = 1024
+
+
+def event_photo_urls(event: Event) -> list[str]:
+    """Картинки мероприятия, которые попадают в сообщение (не больше альбома)."""
+    if not isinstance(event.images, list):
+        return []
+    return event.images[:MEDIA_GROUP_LIMIT]
+
+
+def event_photo_sources(event: Event) -> tuple[list[str], bool]:
+    """Что передать в Telegram: file_id, если картинки уже загружены, иначе URL.
+
+    :return: (источники, True если это file_id).
+    """
+    urls = event_photo_urls(event)
+    file_ids = event.image_file_ids
+    if urls and isinstance(file_ids, list) and len(file_ids) == len(urls):
+        return file_ids, True
+    return urls, False
+
+
+def photo_file_ids(messages: Sequence[Message]) -> list[str]:
+    """file_id самого крупного размера из отправленных фото."""
+    return [message.photo[-1].file_id for message in messages if message.photo]
+
+
+async def send_photos(
+    bot: Bot,
+    chat_id: int,
+    sources: Sequence[str],
+    caption: Optional[str] = None,
+    **kwargs,
+) -> list[Message]:
+    """Отправить одно фото или альбом одним запросом."""
+    if len(sources) == 1:
+        message = await bot.send_photo(chat_id, photo=sources[0], caption=caption, **kwargs)
+        return [message]
+    media = [
+        InputMediaPhoto(media=source, caption=caption if index == 0 else None)
+        for index, source in enumerate(sources)
+    ]
+    return await bot.send_media_group(chat_id, media=media, **kwargs)
+
+
+async def remember_file_ids(
+    session: AsyncSession,
+    event: Event,
+    messages: Sequence[Message],
+) -> bool:
+    """Сохранить file_id после отправки картинок по URL.
+
+    Пишет только условным UPDATE в базу: сам объект event не меняется,
+    иначе при следующем flush сессия перезаписала бы file_id без проверки images.
+
+    :return: True, если file_id сохранены.
+    """
+    # Ленивый импорт: crud импортирует services, а обработчики мероприятий — этот модуль
+    from crud.events import events_crud
+
+    file_ids = photo_file_ids(messages)
+    urls = event_photo_urls(event)
+    if len(file_ids) != len(urls):
+        logger.warning(f"Got {len(file_ids)} file_ids for {len(urls)} images of event {event.id}")
+        return False
+    return await events_crud.set_image_file_ids(session, event.id, event.images, file_ids)
+
+
+async def upload_pending_media(
+    bot: Bot,
+    session: AsyncSession,
+    chat_id: int,
+    limit: int = 50,
+    max_attempts: int = 5,
+    retry_delay: int = 3600,
+) -> int:
+    """Фоновая загрузка картинок новых мероприятий в Telegram.
+
+    Картинки отправляются без звука в служебный чат, чтобы Telegram
+    скачал их с VK один раз, а полученные file_id сохраняются в
+    events.image_file_ids. Отправка идет не чаще одного фото в секунду —
+    лимит Telegram для одного чата. Неудачные попытки записываются в базу:
+    такое мероприятие повторяется не раньше чем через retry_delay секунд
+    и не больше max_attempts раз.
+
+    :return: число мероприятий с сохраненными file_id.
+    """
+    from crud.events import events_crud
+
+    events = await events_crud.get_events_without_media(
+        session, limit=limit, max_attempts=max_attempts, retry_delay=retry_delay,
+    )
+    limiter = TokenBucket(1)
+    uploaded = 0
+    for event in events:
+        urls = event_photo_urls(event)
+        for _ in urls:
+            await limiter.acquire()
+        try:
+            messages = await send_photos(bot, chat_id, urls, disable_notification=True)
+        except TelegramRetryAfter as e:
+            logger.warning(f"Flood limit while uploading media, stopping for {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            break
+        except TelegramAPIError as e:
+            logger.warning(f"Failed to upload images of event {event.id}: {e}")
+            await events_crud.record_media_failure(session, event.id, event.images)
+            continue
+        if await remember_file_ids(session, event, messages):
+            uploaded += 1
+        elif len(photo_file_ids(messages)) != len(urls):
+            await events_crud.record_media_failure(session, event.id, event.images)
+    if events:
+        logger.info(f"Uploaded media for {uploaded}/{len(events)} events")
+    return uploaded
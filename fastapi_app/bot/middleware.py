@@ -1,15 +1,73 @@
 import logging
+import re
+import time
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, CallbackQuery
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, CallbackQuery, Update
+from prometheus_client import Counter, Histogram
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from typing import Callable, Dict, Any, Awaitable
 
-from sqlalchemy import select
-from core.db import async_session_maker
-from sqlalchemy.orm import selectinload
-from services.models import User
+from bot.fsm_storage import BatchingRedisStorage
+from core.db import LazySession, async_session_maker, query_counter
+from core.user_cache import user_cache
 
 logger = logging.getLogger(__name__)
 
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+bot_updates_total = Counter(
+    "bot_updates_total",
+    "Telegram updates processed",
+    ["update_type", "callback_prefix"],
+)
+bot_update_duration = Histogram(
+    "bot_update_duration_seconds",
+    "Full update processing time including middlewares",
+    ["update_type"],
+    buckets=LATENCY_BUCKETS,
+)
+bot_update_errors_total = Counter(
+    "bot_update_errors_total",
+    "Updates that raised an exception",
+    ["update_type", "error"],
+)
+bot_handler_duration = Histogram(
+    "bot_handler_duration_seconds",
+    "Handler execution time",
+    ["handler"],
+    buckets=LATENCY_BUCKETS,
+)
+bot_handler_errors_total = Counter(
+    "bot_handler_errors_total",
+    "Exceptions raised by handlers",
+    ["handler", "error"],
+)
+bot_duplicate_updates_total = Counter(
+    "bot_duplicate_updates_total",
+    "Repeated updates skipped by idempotent handlers",
+    ["handler"],
+)
+bot_db_queries_per_update = Histogram(
+    "bot_db_queries_per_update",
+    "SQL statements executed while processing one update",
+    ["update_type"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34),
+)
+
+# Начало callback_data до первого сегмента с цифрами: "page_2_n_..." -> "page"
+_CALLBACK_PREFIX = re.compile(r"^([^\d]*?)(?:_[^_]*\d.*)?$")
+
+
+def callback_prefix(data: str | None) -> str:
+    """Метка callback_data без идентификаторов и курсоров."""
+    if not data:
+        return ""
+    match = _CALLBACK_PREFIX.match(data)
+    prefix = match.group(1) if match and match.group(1) else "other"
+    return prefix[:32]
+
 class DatabaseMiddleware(BaseMiddleware):
     async def __call__(
         self,
@@ -17,22 +75,23 @@ class DatabaseMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        async with async_session_maker() as session:
-            logger.debug("Session created in DatabaseMiddleware: %s", type(session))
-            data["session"] = session
-            try:
-                # Вызываем следующий обработчик
-                result = await handler(event, data)
-                await session.commit()
+        # Соединение берется из пула только при первом обращении к сессии
+        session = LazySession(async_session_maker)
+        data["session"] = session
+        try:
+            # Вызываем следующий обработчик
+            result = await handler(event, data)
+            if await session.commit_if_changed():
                 logger.debug("Transaction committed successfully")
-                return result
-            except Exception as e:
-                await session.rollback()
-                logger.error("Database error: %s", str(e), exc_info=True)
-                raise
-            finally:
-                await session.close()
+            return result
+        except Exception as e:
+            await session.rollback_if_started()
+            logger.error("Database error: %s", str(e), exc_info=True)
+            raise
+        finally:
+            if session.started:
                 logger.debug("Session closed")
+            await session.close()
 
 
 class RoleMiddleware(BaseMiddleware):
@@ -54,16 +113,135 @@ class RoleMiddleware(BaseMiddleware):
             return await handler(event, data)
 
         user_id = event.from_user.id
-        result = await session.execute(
-            select(User).where(User.telegram_id == user_id).options(selectinload(User.admin_role))
-        )
-        user = result.scalars().first()
-        is_admin = user and user.admin_role is not None
+        user = await user_cache.get_or_load(user_id, session)
+        is_admin = user is not None and user.is_admin
         data["is_admin"] = is_admin
-        data["user"] = user  # Сохраняем user для использования в обработчиках
+        data["user"] = user  # CachedUser для использования в обработчиках
 
         if not is_admin and isinstance(event, CallbackQuery) and "admin" in event.data:
             await event.answer("У вас нет прав администратора.", show_alert=True)
             return
 
         return await handler(event, data)
+
+
+class FSMBatchMiddleware(BaseMiddleware):
+    """Один буфер FSM на обновление: чтение одним MGET, запись одним pipeline.
+
+    Должен стоять раньше FSMContextMiddleware диспетчера, чтобы в буфер
+    попало и чтение состояния, которое тот делает для фильтров.
+    """
+
+    def __init__(self, storage: BatchingRedisStorage) -> None:
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.storage.batch():
+            return await handler(event, data)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Метрики обновления целиком: счетчики, время, ошибки и SQL-запросы.
+
+    Регистрируется первым внешним middleware на dp.update, чтобы в замер
+    попали FSM, сессия базы и все обработчики.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        prefix = ""
+        if isinstance(event, Update) and event.callback_query is not None:
+            prefix = callback_prefix(event.callback_query.data)
+        bot_updates_total.labels(update_type=update_type, callback_prefix=prefix).inc()
+
+        counter = [0]
+        token = query_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            bot_update_errors_total.labels(update_type=update_type, error=type(e).__name__).inc()
+            raise
+        finally:
+            bot_update_duration.labels(update_type=update_type).observe(time.perf_counter() - started)
+            bot_db_queries_per_update.labels(update_type=update_type).observe(counter[0])
+            query_counter.reset(token)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Время и ошибки конкретного обработчика (внутренний middleware)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            bot_handler_errors_total.labels(handler=name, error=type(e).__name__).inc()
+            raise
+        finally:
+            bot_handler_duration.labels(handler=name).observe(time.perf_counter() - started)
+
+
+class IdempotentUpdateMiddleware(BaseMiddleware):
+    """Однократная обработка обновления для обработчиков с флагом idempotent.
+
+    update_id запоминается в Redis (SET NX с TTL), повторная доставка того
+    же обновления (ретрай вебхука, перезапуск поллинга до подтверждения
+    offset) пропускается. Если обработчик упал, отметка снимается, чтобы
+    повтор от Telegram обработался. Остальные обработчики Redis не трогают.
+    Если Redis недоступен, обработчик вызывается без дедупликации.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 86400, key_prefix: str = "update") -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update = data.get("event_update")
+        if not get_flag(data, "idempotent") or update is None:
+            return await handler(event, data)
+
+        key = f"{self.key_prefix}:{data['bot'].id}:{update.update_id}"
+        try:
+            first_delivery = await self.redis.set(key, 1, nx=True, ex=self.ttl)
+        except RedisError as e:
+            # Без Redis обновление обрабатывается как обычно: повторную
+            # заявку отсечет уникальный ключ в базе
+            logger.warning(f"Redis unavailable for update deduplication: {e}")
+            return await handler(event, data)
+        if not first_delivery:
+            name = getattr(getattr(data.get("handler"), "callback", None), "__name__", "unknown")
+            bot_duplicate_updates_total.labels(handler=name).inc()
+            logger.info(f"Skipping repeated update {update.update_id} for {name}")
+            return None
+        try:
+            return await handler(event, data)
+        except Exception:
+            try:
+                await self.redis.delete(key)
+            except RedisError as e:
+                logger.warning(f"Failed to clear mark of update {update.update_id}: {e}")
+            raise
@@ -0,0 +1,217 @@
+import asyncio
+import html
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Sequence
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from prometheus_client import Counter
+
+from core.rate_limit import TokenBucket
+
+logger = logging.getLogger("my_app.notifications")
+
+notifications_sent_total = Counter(
+    "telegram_notifications_total",
+    "Telegram notifications by result",
+    ["result"],
+)
+
+# Лимит Telegram на длину текста сообщения
+MESSAGE_LIMIT = 4096
+
+# Итог доставки одному получателю (deliver)
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+def build_digest(events: Sequence[Any], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """Собрать пачку новых мероприятий в сводку из одного или нескольких сообщений.
+
+    :param events: строки с полями title и vk_post_id
+    :return: тексты сообщений не длиннее limit.
+    """
+    if not events:
+        return []
+    header = f"Новые события ({len(events)}):"
+    messages: list[str] = []
+    current = header
+    for event in events:
+        # Сообщения уходят с parse_mode=HTML: «<» или «&» в заголовке из VK
+        # иначе сломают всю сводку
+        title = html.escape(" ".join(event.title.split()))
+        line = f"\n• {title} (ID: {html.escape(str(event.vk_post_id))})"
+        if len(current) + len(line) > limit:
+            messages.append(current)
+            current = line.lstrip("\n")
+        else:
+            current += line
+    messages.append(current)
+    return messages
+
+
+class NotificationDispatcher:
+    """Рассылка сообщений с учетом лимитов Telegram.
+
+    Общий поток ограничен global_rate сообщений в секунду (у Telegram —
+    около 30), а сообщения в один чат — per_chat_rate (около 1 в секунду).
+    Одновременно выполняется не больше concurrency запросов. На TelegramRetryAfter
+    отправка ждет указанное время и повторяется; чат, который заблокировал
+    бота, пропускается.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = 30,
+        per_chat_rate: float = 1,
+        concurrency: int = 10,
+        max_attempts: int = 3,
+        max_tracked_chats: int = 10000,
+    ) -> None:
+        self.bot = bot
+        self.global_limiter = TokenBucket(global_rate)
+        self.per_chat_interval = 1 / per_chat_rate
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_attempts = max_attempts
+        self.max_tracked_chats = max_tracked_chats
+        # Время последней (или уже назначенной) отправки в чат
+        self._last_sent: OrderedDict[int, float] = OrderedDict()
+
+    async def _wait_for_chat(self, chat_id: int) -> None:
+        """Дождаться своей очереди на отправку в чат.
+
+        Слот занимается до ожидания: параллельные отправки в один чат
+        (например, воркеры NotificationQueue) получают слоты через
+        per_chat_interval, а не просыпаются одновременно.
+        """
+        now = time.monotonic()
+        last = self._last_sent.get(chat_id)
+        slot = now if last is None else max(now, last + self.per_chat_interval)
+        self._last_sent[chat_id] = slot
+        self._last_sent.move_to_end(chat_id)
+        while len(self._last_sent) > self.max_tracked_chats:
+            self._last_sent.popitem(last=False)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def deliver(self, chat_id: int, text: str, **kwargs: Any) -> str:
+        """Отправить одно сообщение с повтором после RetryAfter.
+
+        :return: SENT; BLOCKED, если чат больше недоступен (бот заблокирован,
+            аккаунт удален, чат не найден); FAILED при прочих ошибках.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_for_chat(chat_id)
+            await self.global_limiter.acquire()
+            try:
+                async with self.semaphore:
+                    await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                notifications_sent_total.labels(result="sent").inc()
+                return SENT
+            except TelegramRetryAfter as e:
+                notifications_sent_total.labels(result="retry_after").inc()
+                logger.warning(
+                    f"Flood limit for chat {chat_id}, retry in {e.retry_after}s "
+                    f"(attempt {attempt})"
+                )
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError as e:
+                notifications_sent_total.labels(result="forbidden").inc()
+                logger.info(f"Chat {chat_id} is unavailable: {e}")
+                return BLOCKED
+            except TelegramBadRequest as e:
+                if "chat not found" in str(e).lower():
+                    notifications_sent_total.labels(result="forbidden").inc()
+                    logger.info(f"Chat {chat_id} is unavailable: {e}")
+                    return BLOCKED
+                notifications_sent_total.labels(result="error").inc()
+                logger.error(f"Failed to send notification to {chat_id}: {e}")
+                return FAILED
+            except TelegramAPIError as e:
+                notifications_sent_total.labels(result="error").inc()
+                logger.error(f"Failed to send notification to {chat_id}: {e}")
+                return FAILED
+        notifications_sent_total.labels(result="gave_up").inc()
+        logger.error(f"Gave up sending notification to {chat_id}")
+        return FAILED
+
+    async def send(self, chat_id: int, text: str, **kwargs: Any) -> bool:
+        """Отправить одно сообщение; True, если оно доставлено."""
+        return await self.deliver(chat_id, text, **kwargs) == SENT
+
+    async def fan_out(self, chat_ids: Iterable[int], messages: Sequence[str]) -> int:
+        """Отправить сообщения всем получателям.
+
+        Сообщения в каждый чат идут по порядку, чаты обрабатываются
+        параллельно. Возвращает число чатов, получивших все сообщения.
+        """
+        async def deliver(chat_id: int) -> bool:
+            for text in messages:
+                if not await self.send(chat_id, text):
+                    return False
+            return True
+
+        recipients = list(dict.fromkeys(chat_ids))
+        results = await asyncio.gather(*(deliver(chat_id) for chat_id in recipients))
+        delivered = sum(results)
+        logger.info(f"Delivered {len(messages)} message(s) to {delivered}/{len(recipients)} chats")
+        return delivered
+
+    async def notify_new_events(self, chat_ids: Iterable[int], events: Sequence[Any]) -> int:
+        """Разослать сводку о новых мероприятиях."""
+        return await self.fan_out(chat_ids, build_digest(events))
+
+
+class NotificationQueue:
+    """Фоновая отправка уведомлений, не задерживающая обработчики.
+
+    Обработчик кладет сообщения в очередь и сразу отвечает пользователю,
+    а workers задач отправляют их через NotificationDispatcher с лимитами
+    Telegram. Очередь хранится в памяти процесса: сообщения, не
+    отправленные к остановке за drain_timeout, теряются.
+    """
+
+    def __init__(self, bot: Bot, workers: int = 5, drain_timeout: float = 10) -> None:
+        self.dispatcher = NotificationDispatcher(bot, concurrency=workers)
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.queue: asyncio.Queue[tuple[int, str, dict[str, Any]]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    def enqueue(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        """Поставить сообщение в очередь; воркеры запускаются при первом вызове."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.queue.put_nowait((chat_id, text, kwargs))
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, text, kwargs = await self.queue.get()
+            try:
+                await self.dispatcher.deliver(chat_id, text, **kwargs)
+            except Exception as e:
+                logger.error(f"Failed to send queued notification to {chat_id}: {e}", exc_info=True)
+            finally:
+                self.queue.task_done()
+
+    async def close(self) -> None:
+        """Дождаться отправки очереди (не дольше drain_timeout) и остановить воркеров."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.queue.qsize()} queued notification(s) dropped on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
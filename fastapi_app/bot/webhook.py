@@ -0,0 +1,55 @@
+import logging
+import secrets
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+
+logger = logging.getLogger("my_app.webhook")
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def get_webhook_router(
+    bot: Bot,
+    dp: Dispatcher,
+    path: str,
+    secret_token: str,
+) -> APIRouter:
+    """Создает роутер FastAPI, принимающий обновления Telegram.
+
+    Args:
+        bot: Экземпляр бота, от имени которого обрабатываются обновления.
+        dp: Диспетчер aiogram с подключенными роутерами и middleware.
+        path: Путь, на который Telegram отправляет обновления.
+        secret_token: Секрет, переданный в setWebhook. Telegram присылает его
+            в заголовке X-Telegram-Bot-Api-Secret-Token; запросы без него
+            или с другим значением отклоняются.
+
+    Returns:
+        APIRouter: Роутер с единственным POST-эндпоинтом.
+    """
+    if not secret_token:
+        raise ValueError("Webhook secret token is required")
+    router = APIRouter()
+
+    @router.post(path, include_in_schema=False)
+    async def telegram_webhook(
+        request: Request,
+        x_telegram_bot_api_secret_token: Optional[str] = Header(default=None, alias=SECRET_HEADER),
+    ) -> Response:
+        """Проверяет секрет и передает обновление в диспетчер."""
+        if not secrets.compare_digest(x_telegram_bot_api_secret_token or "", secret_token):
+            logger.warning("Rejected webhook request with invalid secret token")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            # Отвечаем 200, иначе Telegram будет бесконечно повторять доставку
+            logger.error(f"Error while processing update {update.update_id}: {e}", exc_info=True)
+        return Response(status_code=status.HTTP_200_OK)
+
+    return router
@@ -1,6 +1,10 @@
-from pydantic import Field
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
+import re
+
+# Допустимый секрет вебхука по документации setWebhook
+WEBHOOK_SECRET_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,256}")
 
 class Settings(BaseSettings):
     """Настройки приложения для интеграции Django, FastAPI и Telegram-бота."""
@@ -13,17 +17,93 @@ class Settings(BaseSettings):
     postgres_port_prod: int = Field(alias="POSTGRES_PORT_PROD", default=5432)
     postgres_port_local: int = Field(alias="POSTGRES_PORT_LOCAL", default=5000)
 
+    # Окружение: development включает подробные логи по умолчанию
+    environment: str = Field(alias="ENVIRONMENT", default="production")
+
+    # Пул соединений и параметры сессий PostgreSQL
+    db_pool_size: int = Field(alias="DB_POOL_SIZE", default=5)
+    db_max_overflow: int = Field(alias="DB_MAX_OVERFLOW", default=10)
+    db_pool_timeout: int = Field(alias="DB_POOL_TIMEOUT", default=30)
+    # Пересоздавать соединения старше N секунд (обрывы на стороне балансировщика)
+    db_pool_recycle: int = Field(alias="DB_POOL_RECYCLE", default=1800)
+    db_pool_pre_ping: bool = Field(alias="DB_POOL_PRE_PING", default=True)
+    # Кэш подготовленных запросов asyncpg; 0 — для pgbouncer в режиме transaction
+    db_statement_cache_size: int = Field(alias="DB_STATEMENT_CACHE_SIZE", default=100)
+    db_statement_timeout_ms: int = Field(alias="DB_STATEMENT_TIMEOUT_MS", default=30000)
+    db_echo: bool = Field(alias="DB_ECHO", default=False)
+    # Имя клиента в pg_stat_activity; воркер Celery задает свое в docker-compose
+    db_application_name: str = Field(alias="DB_APPLICATION_NAME", default="wrestrus90-web")
+
+    # Уровни логирования; пустые значения берутся по окружению
+    log_level: str | None = Field(alias="LOG_LEVEL", default=None)
+    sqlalchemy_log_level: str | None = Field(alias="SQLALCHEMY_LOG_LEVEL", default=None)
+    aiogram_log_level: str | None = Field(alias="AIOGRAM_LOG_LEVEL", default=None)
+    # Формат вывода логов: text или json (одна JSON-строка на запись)
+    log_format: str = Field(alias="LOG_FORMAT", default="text")
+    # Из DEBUG-записей aiogram/aiohttp пишется каждая N-я; 1 — все
+    log_debug_sample: int = Field(alias="LOG_DEBUG_SAMPLE", default=10, ge=1)
+
     # Telegram-бот
     telegram_bot_token: str = Field(alias="TELEGRAM_BOT_TOKEN")
+    # Режим вебхука: если задан публичный URL, поллинг не запускается
+    telegram_webhook_url: str | None = Field(alias="TELEGRAM_WEBHOOK_URL", default=None)
+    telegram_webhook_path: str = Field(alias="TELEGRAM_WEBHOOK_PATH", default="/telegram/webhook")
+    # Обязателен в режиме вебхука: без него эндпоинт принимал бы обновления от кого угодно
+    telegram_webhook_secret: str | None = Field(alias="TELEGRAM_WEBHOOK_SECRET", default=None)
+    # Служебный чат для фоновой загрузки картинок мероприятий в Telegram;
+    # без него file_id запоминаются при первом просмотре поста
+    telegram_media_chat_id: int | None = Field(alias="TELEGRAM_MEDIA_CHAT_ID", default=None)
+    telegram_media_upload_batch: int = Field(alias="TELEGRAM_MEDIA_UPLOAD_BATCH", default=50)
+    # Сколько раз пробовать загрузить картинки мероприятия и пауза после неудачи (секунды)
+    telegram_media_max_attempts: int = Field(alias="TELEGRAM_MEDIA_MAX_ATTEMPTS", default=5)
+    telegram_media_retry_delay: int = Field(alias="TELEGRAM_MEDIA_RETRY_DELAY", default=3600)
 
     # Redis
     redis_host: str = Field(alias="REDIS_HOST", default="redis")
     redis_port: int = Field(alias="REDIS_PORT", default=6379)
 
+    # Время жизни состояния FSM без активности (секунды): брошенные диалоги истекают
+    fsm_ttl: int = Field(alias="FSM_TTL", default=86400)
+    # Сколько помнить update_id для обработчиков с флагом idempotent (секунды);
+    # Telegram повторяет недоставленные обновления до суток
+    update_dedup_ttl: int = Field(alias="UPDATE_DEDUP_TTL", default=86400)
+
+    # Кэш пользователей и ролей (секунды)
+    user_cache_local_ttl: int = Field(alias="USER_CACHE_LOCAL_TTL", default=30)
+    user_cache_redis_ttl: int = Field(alias="USER_CACHE_REDIS_TTL", default=600)
+    user_cache_max_size: int = Field(alias="USER_CACHE_MAX_SIZE", default=10000)
+    # Кэш выборок мероприятий (секунды)
+    events_cache_ttl: int = Field(alias="EVENTS_CACHE_TTL", default=300)
+
     # VK API
     # answer_telegram_id: str = Field(alias="ANSWER_TELEGRAM_ID")
     vk_access_token: str = Field(alias="VK_ACCESS_TOKEN")
     vk_group_id: str = Field(alias="VK_GROUP_ID")
+    # Предел страниц (по 100 постов) за один проход инкрементальной синхронизации
+    vk_sync_max_pages: int = Field(alias="VK_SYNC_MAX_PAGES", default=20)
+    # Период инкрементальной синхронизации стены в Celery Beat (секунды)
+    vk_sync_interval: int = Field(alias="VK_SYNC_INTERVAL", default=3600)
+    # Лимит VK API для ключа сообщества — 3 запроса в секунду
+    vk_requests_per_second: float = Field(alias="VK_REQUESTS_PER_SECOND", default=3)
+    # Страниц wall.get в одном запросе execute при загрузке истории (не больше 25)
+    vk_execute_pages: int = Field(alias="VK_EXECUTE_PAGES", default=25, ge=1, le=25)
+
+    # Рассылки: сообщений в секунду (лимит Telegram ~30 на бота, часть
+    # оставляем ответам бота), параллельных отправок и размер порции
+    broadcast_rate: float = Field(alias="BROADCAST_RATE", default=25)
+    broadcast_concurrency: int = Field(alias="BROADCAST_CONCURRENCY", default=20, ge=1)
+    broadcast_chunk_size: int = Field(alias="BROADCAST_CHUNK_SIZE", default=500, ge=1)
+
+    # Часовой пояс дат в выгрузках регистраций (Excel не хранит смещение)
+    export_timezone: str = Field(alias="EXPORT_TIMEZONE", default="Europe/Moscow")
+
+    # Пароли администраторов: раунды bcrypt (хеши с другим числом раундов
+    # пересчитываются при входе) и число потоков для хеширования
+    bcrypt_rounds: int = Field(alias="BCRYPT_ROUNDS", default=12, ge=4, le=31)
+    password_hash_workers: int = Field(alias="PASSWORD_HASH_WORKERS", default=2, ge=1)
+    # Неудачных входов в админ-панель на один логин за окно (секунды)
+    admin_login_max_attempts: int = Field(alias="ADMIN_LOGIN_MAX_ATTEMPTS", default=5)
+    admin_login_window: int = Field(alias="ADMIN_LOGIN_WINDOW", default=300)
 
     # Данные первого суперпользователя
     first_superuser_first_name: str = Field(alias="FIRST_SUPERUSER_FIRST_NAME")
@@ -58,14 +138,52 @@ class Settings(BaseSettings):
         )
 
     @property
-    def redis_url(self) -> str:
-        """Создание строки подключения к Redis."""
-        host = (
+    def is_development(self) -> bool:
+        return self.environment.lower() in ("dev", "development", "local")
+
+    @property
+    def log_levels(self) -> dict[str, str]:
+        """Уровни логирования приложения, SQLAlchemy и aiogram/aiohttp."""
+        if self.is_development:
+            defaults = {"app": "DEBUG", "sqlalchemy": "INFO", "aiogram": "DEBUG"}
+        else:
+            defaults = {"app": "INFO", "sqlalchemy": "WARNING", "aiogram": "INFO"}
+        return {
+            "app": (self.log_level or defaults["app"]).upper(),
+            "sqlalchemy": (self.sqlalchemy_log_level or defaults["sqlalchemy"]).upper(),
+            "aiogram": (self.aiogram_log_level or defaults["aiogram"]).upper(),
+        }
+
+    @model_validator(mode="after")
+    def check_webhook_secret(self) -> "Settings":
+        """В режиме вебхука секрет обязателен и должен подходить для setWebhook."""
+        if self.telegram_webhook_url:
+            if not self.telegram_webhook_secret:
+                raise ValueError("TELEGRAM_WEBHOOK_SECRET is required when TELEGRAM_WEBHOOK_URL is set")
+            if not WEBHOOK_SECRET_PATTERN.fullmatch(self.telegram_webhook_secret):
+                raise ValueError(
+                    "TELEGRAM_WEBHOOK_SECRET must be 1-256 characters: A-Z, a-z, 0-9, _ and -"
+                )
+        return self
+
+    @property
+    def use_webhook(self) -> bool:
+        """Получать обновления Telegram через вебхук вместо поллинга."""
+        return bool(self.telegram_webhook_url)
+
+    @property
+    def redis_server(self) -> str:
+        """Хост Redis с учетом запуска в контейнере."""
+        return (
         "localhost"
         if os.environ.get("RUNNING_IN_DOCKER", "false") == "false"
         else self.redis_host
         )
-        return f"redis://{host}:{self.redis_port}/0"
+
+    @property
+    def redis_url(self) -> str:
+        """Создание строки подключения к Redis."""
+        return f"redis://{self.redis_server}:{self.redis_port}/0"
 
     model_config = SettingsConfigDict(
         env_file="../infra/.env",  # Путь относительно текущей директории
@@ -1,10 +1,30 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from prometheus_client import Histogram
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, declared_attr
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from contextlib import asynccontextmanager
 
 from core.config import settings
 
+db_pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool (waiting and connecting)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+db_session_hold_seconds = Histogram(
+    "db_session_hold_seconds",
+    "Time a bot update holds a database session",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# Счетчик SQL-запросов текущего обновления бота (None вне обновления)
+query_counter: ContextVar[Optional[list[int]]] = ContextVar("query_counter", default=None)
+
 class PreBase:
     """Базовый класс для всех моделей с автоматическим именем таблицы и полем ID."""
     
@@ -17,13 +37,56 @@ class PreBase:
 # Создаём базовый класс для моделей
 Base = declarative_base(cls=PreBase)
 
-# Настройка асинхронного движка
-engine = create_async_engine(
-    settings.database_url,
-    echo=True,  # Для отладки, можно отключить в продакшене
-    pool_size=5,  # Ограничение пула соединений
-    max_overflow=10,
-)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий время получения соединения.
+
+    В замер входит ожидание свободного соединения при исчерпанном пуле
+    и установка нового соединения, если пул еще не заполнен.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - started)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+def create_db_engine(application_name: Optional[str] = None) -> AsyncEngine:
+    """Создать движок с параметрами пула и сессий из настроек.
+
+    :param application_name: имя клиента в pg_stat_activity
+        (по умолчанию DB_APPLICATION_NAME).
+    """
+    engine = create_async_engine(
+        settings.database_url,
+        echo=settings.db_echo,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "server_settings": {
+                "application_name": application_name or settings.db_application_name,
+                "statement_timeout": str(settings.db_statement_timeout_ms),
+            },
+        },
+    )
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_query)
+    return engine
+
+
+# Единственный движок процесса: его используют и веб-процесс, и воркер Celery
+engine = create_db_engine()
 
 # Фабрика асинхронных сессий
 async_session_maker = async_sessionmaker(
@@ -46,4 +109,73 @@ async def get_async_session():
             await session.close()
 
 # Для обратной совместимости
-AsyncSessionLocal = async_session_maker
\ No newline at end of file
+AsyncSessionLocal = async_session_maker
+
+
+class LazySession:
+    """Прокси AsyncSession, открывающий сессию только при первом обращении.
+
+    Используется в DatabaseMiddleware: обновления, которые не работают
+    с базой (навигация по меню), не берут соединение из пула, а коммит
+    выполняется только если в сессии что-то было записано.
+    """
+
+    def __init__(self, factory: async_sessionmaker = async_session_maker) -> None:
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+        self._opened_at = 0.0
+
+    @property
+    def session(self) -> AsyncSession:
+        """Реальная сессия, создается при первом обращении."""
+        if self._session is None:
+            self._session = self._factory()
+            self._opened_at = time.perf_counter()
+            event.listen(self._session.sync_session, "after_flush", _mark_flushed)
+            event.listen(self._session.sync_session, "after_commit", _reset_flushed)
+            event.listen(self._session.sync_session, "after_rollback", _reset_flushed)
+        return self._session
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    @property
+    def has_changes(self) -> bool:
+        """Есть ли незафиксированные изменения (сброшенные или ожидающие flush)."""
+        if self._session is None:
+            return False
+        return bool(
+            self._session.info.get("flushed")
+            or self._session.new
+            or self._session.dirty
+            or self._session.deleted
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def commit_if_changed(self) -> bool:
+        """Коммитит транзакцию, только если были изменения."""
+        if not self.has_changes:
+            return False
+        await self._session.commit()
+        return True
+
+    async def rollback_if_started(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            db_session_hold_seconds.observe(time.perf_counter() - self._opened_at)
+
+
+def _mark_flushed(session, flush_context) -> None:
+    session.info["flushed"] = True
+
+
+def _reset_flushed(session) -> None:
+    session.info.pop("flushed", None)
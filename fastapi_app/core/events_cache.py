@@ -0,0 +1,118 @@
+import logging
+from typing import Any, Optional
+
+from aiocache import Cache
+from aiocache.base import BaseCache
+from aiocache.serializers import PickleSerializer
+from prometheus_client import Counter
+
+from core.config import settings
+
+logger = logging.getLogger("my_app.events_cache")
+
+events_cache_requests_total = Counter(
+    "events_cache_requests_total",
+    "Events query cache lookups",
+    ["kind", "result"],
+)
+events_cache_invalidations_total = Counter(
+    "events_cache_invalidations_total",
+    "Events query cache generation bumps",
+    ["category"],
+)
+
+
+class EventsQueryCache:
+    """Кэш выборок мероприятий с инвалидацией через поколения.
+
+    Ключ имеет вид kind:f<версия формата>:v<поколение>:category:status:
+    offset:limit[:query]. Вместо offset может стоять курсор keyset-пагинации,
+    query — нормализованный поисковый запрос; пустые category и status
+    заменяются на «all», пустые offset и limit — на «-». Версия формата
+    меняется вместе со структурой кэшируемых значений. Поколение относится
+    к категории: любая запись увеличивает счетчик поколения затронутых
+    категорий и общего списка, поэтому старые ключи перестают читаться
+    и истекают по TTL.
+    """
+
+    ALL = "all"
+    # Версия формата закэшированных значений: увеличивается, когда меняется
+    # их структура, чтобы после выкладки не читались записи старого формата
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache: BaseCache, ttl: int = 300) -> None:
+        self.cache = cache
+        self.ttl = ttl
+
+    @staticmethod
+    def _generation_key(category: str) -> str:
+        return f"gen:{category}"
+
+    async def _generation(self, category: Optional[str]) -> int:
+        return await self.cache.get(
+            self._generation_key(category or self.ALL),
+            default=0,
+            loads_fn=lambda value: int(value) if value is not None else None,
+        )
+
+    async def get(
+        self,
+        kind: str,
+        category: Optional[str] = None,
+        status: Optional[str] = None,
+        offset: Optional[int | str] = None,
+        limit: Optional[int] = None,
+        query: Optional[str] = None,
+    ) -> tuple[Optional[str], Any]:
+        """Вернуть ключ и закэшированное значение (None при промахе).
+
+        Если Redis недоступен, ключ тоже None — значение не будет сохранено.
+        """
+        try:
+            generation = await self._generation(category)
+            key = (
+                f"{kind}:f{self.FORMAT_VERSION}:v{generation}:{category or self.ALL}:{status or self.ALL}:"
+                f"{offset if offset is not None else '-'}:{limit if limit is not None else '-'}"
+            )
+            if query is not None:
+                key = f"{key}:{query}"
+            value = await self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"Events cache unavailable: {e}")
+            events_cache_requests_total.labels(kind=kind, result="error").inc()
+            return None, None
+
+        events_cache_requests_total.labels(
+            kind=kind, result="miss" if value is None else "hit"
+        ).inc()
+        return key, value
+
+    async def set(self, key: Optional[str], value: Any) -> None:
+        if key is None:
+            return
+        try:
+            await self.cache.set(key, value, ttl=self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to store {key} in events cache: {e}")
+
+    async def invalidate(self, *categories: Optional[str]) -> None:
+        """Увеличить поколение указанных категорий и общего списка."""
+        for category in {c for c in categories if c} | {self.ALL}:
+            try:
+                await self.cache.increment(self._generation_key(category))
+                events_cache_invalidations_total.labels(category=category).inc()
+            except Exception as e:
+                logger.warning(f"Failed to invalidate events cache for {category}: {e}")
+        logger.debug(f"Events cache invalidated for categories={categories}")
+
+
+events_cache = EventsQueryCache(
+    Cache(
+        Cache.REDIS,
+        endpoint=settings.redis_server,
+        port=settings.redis_port,
+        namespace="events:",
+        serializer=PickleSerializer(),
+    ),
+    ttl=settings.events_cache_ttl,
+)
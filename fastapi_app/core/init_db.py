@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-from passlib.context import CryptContext
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
 from core.logging_config import setup_logging, LOGGING_CONFIG
 from core.config import settings
 from core.db import Base, engine, async_session_maker
+from core.passwords import password_service
 from services.models import Admin, User
 import logging
 
@@ -14,12 +14,6 @@ import logging
 setup_logging()
 logger = logging.getLogger("my_app.init_db")
 
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12,
-)
-
 async def create_first_superuser() -> None:
     """Создаёт первого суперпользователя, если он ещё не существует."""
     logger.info("Starting creation of first superuser")
@@ -50,7 +44,7 @@ async def create_first_superuser() -> None:
             # Создаём и сохраняем администратора
             admin = Admin(
                 user_id=user.id,
-                password=pwd_context.hash(settings.first_superuser_password),
+                password=await password_service.hash(settings.first_superuser_password),
             )
             session.add(admin)
             await session.commit()  # Коммитим все изменения
@@ -1,113 +1,213 @@
+import atexit
+import itertools
+import json
 import logging
+import logging.config
 import logging.handlers
 import os
+import queue
 import sys
+from datetime import datetime, timezone
+
+from core.config import settings
+
+# Уровни по окружению (ENVIRONMENT) с переопределением через LOG_LEVEL и др.
+LOG_LEVELS = settings.log_levels
+LOG_FILE = os.path.join(os.path.dirname(__file__), "../../app.log")
+
+# Очередь между логгерами и фоновым потоком, который форматирует и пишет записи
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: logging.handlers.QueueListener | None = None
 
-from fastapi import logger
 
 class SuppressSelectorFilter(logging.Filter):
-    def filter(self, record):
-        if "Using selector: EpollSelector" in record.getMessage():
-            logger.debug(f"Suppressed EpollSelector log from logger: {record.name}")
-            return False
-        return True
+    """Отбрасывает отладочное сообщение asyncio о выбранном селекторе.
+
+    Сравнивает шаблон сообщения без форматирования записи.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not (record.name == "asyncio" and record.msg == "Using selector: %s")
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Пропускает только каждую N-ю DEBUG-запись шумных логгеров.
+
+    Записи уровня INFO и выше проходят всегда.
+    """
+
+    def __init__(self, prefixes: tuple[str, ...] = ("aiogram", "aiohttp"), every: int = 1) -> None:
+        super().__init__()
+        self.prefixes = prefixes
+        self.every = max(every, 1)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno > logging.DEBUG:
+            return True
+        if not record.name.startswith(self.prefixes):
+            return True
+        return next(self._counter) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись для сборщиков логов."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который оставляет потоку QueueListener только вывод.
+
+    Стандартный prepare() полностью форматирует запись (включая traceback)
+    перед постановкой в очередь, то есть в цикле событий. Здесь в вызывающем
+    потоке делается только снимок текста: если у записи есть args (или msg
+    не строка), сразу вычисляется record.msg % record.args, а args
+    очищаются. Иначе изменяемые аргументы (dict, list, ORM-объекты из
+    отладочных логов aiogram и SQLAlchemy) могли бы поменяться до вывода,
+    а их __repr__ и ленивые загрузки выполнялись бы из чужого потока.
+    Сообщения приложения — f-строки без args, для них prepare() ничего не
+    делает. Форматер, время и traceback по exc_info остаются за потоком
+    QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args or not isinstance(record.msg, str):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def queue_handler() -> logging.Handler:
+    """Фабрика обработчика для dictConfig: все логгеры пишут в одну очередь."""
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SuppressSelectorFilter())
+    handler.addFilter(DebugSamplingFilter(every=settings.log_debug_sample))
+    return handler
+
+
+def build_output_handlers() -> list[logging.Handler]:
+    """Обработчики, которые работают в потоке QueueListener."""
+    if settings.log_format.lower() == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.DEBUG)
+    console.setFormatter(formatter)
+
+    file = logging.handlers.RotatingFileHandler(
+        LOG_FILE,
+        maxBytes=10 * 1024 * 1024,
+        backupCount=5,
+        encoding="utf-8",
+    )
+    file.setLevel(logging.INFO)
+    file.setFormatter(formatter)
+    return [console, file]
+
 
 LOGGING_CONFIG = {
     "version": 1,
     "disable_existing_loggers": False,
-    "filters": {
-        "suppress_selector": {
-            "()": SuppressSelectorFilter,
-        },
-    },
-    "formatters": {
-        "standard": {
-            "format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
-        },
-    },
     "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "standard",
-            "stream": "ext://sys.stdout",
-            "level": "DEBUG",
-            "filters": ["suppress_selector"],
-        },
-        "file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "standard",
-            "filename": os.path.join(os.path.dirname(__file__), "../../app.log"),
-            "maxBytes": 10 * 1024 * 1024,
-            "backupCount": 5,
-            "level": "INFO",
-            "encoding": "utf-8",
-            "filters": ["suppress_selector"],
+        "queue": {
+            "()": queue_handler,
         },
     },
     "loggers": {
         "": {
-            "level": "DEBUG",
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["app"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "my_app": {
-            "level": "DEBUG",
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["app"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "my_app.celery": {
-            "level": "DEBUG",
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["app"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "my_app.vk_service": {
-            "level": "DEBUG",
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["app"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "asyncio": {
             "level": "ERROR",
-            "handlers": ["console", "file"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "celery": {
-            "level": "DEBUG",
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["app"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "aiogram": {
-            "level": "DEBUG",  # Увеличим до DEBUG для отладки
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["aiogram"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "aiohttp": {
-            "level": "DEBUG",
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["aiogram"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
         "sqlalchemy": {
-            "level": "DEBUG",  # Добавим для отладки SQL-запросов
-            "handlers": ["console", "file"],
+            "level": LOG_LEVELS["sqlalchemy"],
+            "handlers": ["queue"],
             "propagate": False,
-            "filters": ["suppress_selector"],
         },
     },
 }
 
+
+def stop_logging() -> None:
+    """Дописать оставшиеся в очереди записи и остановить фоновый поток."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
 def setup_logging() -> None:
-    log_dir = os.path.dirname(LOGGING_CONFIG["handlers"]["file"]["filename"])
+    global _listener
+    # Повторный вызов (main и init_db) ничего не меняет: dictConfig закрыл бы
+    # обработчики, с которыми работает фоновый поток
+    if _listener is not None:
+        return
     try:
-        os.makedirs(log_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
         logging.config.dictConfig(LOGGING_CONFIG)
+        _listener = logging.handlers.QueueListener(
+            log_queue,
+            *build_output_handlers(),
+            respect_handler_level=True,
+        )
+        _listener.start()
+        atexit.register(stop_logging)
         logger = logging.getLogger("my_app")
         logger.debug("Logging setup completed successfully")
     except Exception as e:
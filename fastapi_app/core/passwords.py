@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from core.config import settings
+
+logger = logging.getLogger("my_app.passwords")
+
+
+class PasswordService:
+    """Хеширование и проверка паролей bcrypt вне цикла событий.
+
+    bcrypt с 12 раундами — это около 250 мс процессорного времени, поэтому
+    вызовы выполняются в отдельном пуле потоков ограниченного размера:
+    цикл событий, общий с поллингом Telegram, не блокируется, а
+    одновременные входы не занимают больше max_workers ядер.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 2) -> None:
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=rounds,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="bcrypt",
+        )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """Проверить пароль и вернуть новый хеш, если текущий устарел.
+
+        Новый хеш возвращается, когда хеш сохранен с другим числом раундов,
+        чем задано в настройках (или другой схемой). Его нужно сохранить
+        вместо старого: так число раундов меняется без сброса паролей.
+        """
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    async def dummy_verify(self) -> None:
+        """Проверка с тем же временем ответа для несуществующего логина."""
+        await self._run(self.context.dummy_verify)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_service = PasswordService(
+    rounds=settings.bcrypt_rounds,
+    max_workers=settings.password_hash_workers,
+)
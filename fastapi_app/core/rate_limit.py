@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger("my_app.rate_limit")
+
+
+class TokenBucket:
+    """Асинхронный ограничитель частоты «ведро токенов».
+
+    Токены пополняются со скоростью rate в секунду, но не больше capacity.
+    acquire() ждет, пока не появится токен; ожидающие обслуживаются по
+    очереди.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class LoginRateLimiter:
+    """Ограничение неудачных попыток входа по логину в окне времени.
+
+    Счетчик хранится в Redis и общий для всех воркеров. Заблокированный
+    логин отклоняется до проверки пароля, так что перебор не тратит
+    процессор на bcrypt. Если Redis недоступен, вход не блокируется.
+    """
+
+    key_prefix = "login_attempts"
+
+    def __init__(self, redis: Redis, max_attempts: int = 5, window: int = 300) -> None:
+        self.redis = redis
+        self.max_attempts = max_attempts
+        self.window = window
+
+    def _key(self, login: str) -> str:
+        return f"{self.key_prefix}:{login.strip().lower()}"
+
+    async def is_blocked(self, login: str) -> bool:
+        try:
+            attempts = await self.redis.get(self._key(login))
+        except RedisError as e:
+            logger.warning(f"Redis unavailable for login rate limiter: {e}")
+            return False
+        return attempts is not None and int(attempts) >= self.max_attempts
+
+    async def register_failure(self, login: str) -> None:
+        key = self._key(login)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.incr(key)
+                pipe.expire(key, self.window, nx=True)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to register login failure for {login}: {e}")
+
+    async def reset(self, login: str) -> None:
+        try:
+            await self.redis.delete(self._key(login))
+        except RedisError as e:
+            logger.warning(f"Failed to reset login attempts for {login}: {e}")
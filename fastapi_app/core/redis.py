@@ -0,0 +1,6 @@
+from redis.asyncio import Redis
+
+from core.config import settings
+
+# Общий клиент Redis для кэшей приложения (FSM-хранилище aiogram создает свой)
+redis_client = Redis.from_url(settings.redis_url, decode_responses=True)
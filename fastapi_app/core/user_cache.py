@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from core.config import settings
+from core.redis import redis_client
+
+if TYPE_CHECKING:
+    from services.models import User
+
+logger = logging.getLogger("my_app.user_cache")
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Снимок пользователя, достаточный для проверки роли и приветствия."""
+
+    id: int
+    telegram_id: int
+    name: str
+    is_admin: bool
+
+    @classmethod
+    def from_model(cls, user: User) -> CachedUser:
+        return cls(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            name=user.name,
+            is_admin=user.admin_role is not None,
+        )
+
+
+class UserRoleCache:
+    """Двухуровневый кэш пользователей по telegram_id.
+
+    Первый уровень — LRU в памяти процесса с коротким TTL, второй — хэш
+    в Redis, общий для всех воркеров. Инвалидация чистит оба уровня
+    в текущем процессе; в остальных процессах локальная запись живет
+    не дольше local_ttl.
+    """
+
+    key_prefix = "user_role"
+
+    def __init__(
+        self,
+        redis: Redis,
+        max_size: int = 10000,
+        local_ttl: int = 30,
+        redis_ttl: int = 600,
+    ) -> None:
+        self.redis = redis
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._local: OrderedDict[int, tuple[float, CachedUser]] = OrderedDict()
+
+    def _key(self, telegram_id: int) -> str:
+        return f"{self.key_prefix}:{telegram_id}"
+
+    def _get_local(self, telegram_id: int) -> Optional[CachedUser]:
+        entry = self._local.get(telegram_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._local[telegram_id]
+            return None
+        self._local.move_to_end(telegram_id)
+        return user
+
+    def _set_local(self, user: CachedUser) -> None:
+        self._local[user.telegram_id] = (time.monotonic() + self.local_ttl, user)
+        self._local.move_to_end(user.telegram_id)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def get(self, telegram_id: int) -> Optional[CachedUser]:
+        """Получить пользователя из кэша без обращения к базе."""
+        user = self._get_local(telegram_id)
+        if user is not None:
+            return user
+        try:
+            raw = await self.redis.hgetall(self._key(telegram_id))
+        except RedisError as e:
+            logger.warning(f"Redis unavailable for user cache: {e}")
+            return None
+        if not raw:
+            return None
+        user = CachedUser(
+            id=int(raw["id"]),
+            telegram_id=telegram_id,
+            name=raw["name"],
+            is_admin=raw["is_admin"] == "1",
+        )
+        self._set_local(user)
+        return user
+
+    async def set(self, user: CachedUser) -> None:
+        """Сохранить пользователя на обоих уровнях кэша."""
+        self._set_local(user)
+        key = self._key(user.telegram_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping={
+                    "id": user.id,
+                    "name": user.name,
+                    "is_admin": int(user.is_admin),
+                })
+                pipe.expire(key, self.redis_ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to store user {user.telegram_id} in Redis: {e}")
+
+    async def invalidate(self, telegram_id: int) -> None:
+        """Удалить пользователя из кэша."""
+        self._local.pop(telegram_id, None)
+        try:
+            await self.redis.delete(self._key(telegram_id))
+        except RedisError as e:
+            logger.warning(f"Failed to invalidate user {telegram_id} in Redis: {e}")
+        logger.debug(f"User cache invalidated for telegram_id={telegram_id}")
+
+    async def get_or_load(
+        self,
+        telegram_id: int,
+        session: AsyncSession,
+    ) -> Optional[CachedUser]:
+        """Получить пользователя из кэша, при промахе — из базы."""
+        # Ленивый импорт: services импортирует обработчики, которые используют кэш
+        from services.models import User
+
+        user = await self.get(telegram_id)
+        if user is not None:
+            return user
+        result = await session.execute(
+            select(User)
+            .where(User.telegram_id == telegram_id)
+            .options(selectinload(User.admin_role))
+        )
+        db_user = result.scalars().first()
+        if db_user is None:
+            return None
+        user = CachedUser.from_model(db_user)
+        await self.set(user)
+        return user
+
+
+user_cache = UserRoleCache(
+    redis_client,
+    max_size=settings.user_cache_max_size,
+    local_ttl=settings.user_cache_local_ttl,
+    redis_ttl=settings.user_cache_redis_ttl,
+)
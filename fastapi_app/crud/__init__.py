@@ -0,0 +1,4 @@
+# Модели загружаются через пакет services, который импортирует обработчики,
+# а те — модули crud. Загружаем его первым, чтобы crud можно было
+# импортировать напрямую (Celery, скрипты) без циклического импорта.
+import services  # noqa: F401
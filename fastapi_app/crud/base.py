@@ -1,8 +1,40 @@
-from typing import List
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Select, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(sort_value: datetime, obj_id: int) -> str:
+    """Закодировать позицию (время, id) в компактную строку для callback_data."""
+    if sort_value.tzinfo is None:
+        sort_value = sort_value.replace(tzinfo=timezone.utc)
+    micros = (sort_value - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{obj_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Раскодировать курсор, созданный encode_cursor.
+
+    :raises ValueError: если курсор поврежден.
+    """
+    micros, obj_id = cursor.split("-")
+    return EPOCH + timedelta(microseconds=int(micros)), int(obj_id)
+
+
+@dataclass
+class KeysetPage:
+    """Страница keyset-пагинации с курсорами соседних страниц."""
+
+    items: Sequence[Any] = field(default_factory=list)
+    has_prev: bool = False
+    has_next: bool = False
+    prev_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+
 
 class CRUDBase:
     """Базовый класс для всех моделей для работы с базой данных."""
@@ -32,6 +64,72 @@ class CRUDBase:
         )
         return db_obj.scalars().first()
 
+    def build_keyset_query(
+            self,
+            sort_field: str,
+            cursor: Optional[str] = None,
+            backward: bool = False,
+            filters: Sequence[Any] = (),
+    ) -> Select:
+        """Построить запрос страницы, упорядоченной по (sort_field, id) desc.
+
+        :param sort_field: имя колонки или гибридного свойства с датой для сортировки
+        :param cursor: позиция, от которой строится страница
+        :param backward: True — страница перед курсором, False — после
+        :param filters: дополнительные условия WHERE
+        :return: запрос без LIMIT.
+        """
+        sort_column = getattr(self.model, sort_field)
+        # Строки с NULL в ключе сортировки в курсор не попадают; для дат,
+        # которые могут быть пустыми, модель задает ключ через coalesce
+        # (см. Event.listed_at)
+        query = select(self.model).where(sort_column.is_not(None), *filters)
+        if cursor:
+            position = tuple_(sort_column, self.model.id)
+            value = tuple_(*decode_cursor(cursor))
+            query = query.where(position > value if backward else position < value)
+        if backward:
+            return query.order_by(sort_column.asc(), self.model.id.asc())
+        return query.order_by(sort_column.desc(), self.model.id.desc())
+
+    async def get_keyset_page(
+            self,
+            session: AsyncSession,
+            sort_field: str,
+            cursor: Optional[str] = None,
+            backward: bool = False,
+            limit: int = 5,
+            filters: Sequence[Any] = (),
+    ) -> KeysetPage:
+        """Получить страницу по курсору, упорядоченную по (sort_field, id) desc.
+
+        :param session: сессия базы данных
+        :param sort_field: имя колонки или гибридного свойства с датой для сортировки
+        :param cursor: позиция, от которой строится страница
+        :param backward: True — страница перед курсором, False — после
+        :param limit: размер страницы
+        :param filters: дополнительные условия WHERE
+        :return: страница с курсорами соседних страниц.
+        """
+        query = self.build_keyset_query(sort_field, cursor, backward, filters)
+
+        # Лишняя строка показывает, есть ли продолжение, без COUNT(*)
+        rows = list((await session.execute(query.limit(limit + 1))).scalars().all())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+
+        page = KeysetPage(
+            items=rows,
+            has_prev=has_more if backward else cursor is not None,
+            has_next=cursor is not None if backward else has_more,
+        )
+        if rows:
+            page.prev_cursor = encode_cursor(getattr(rows[0], sort_field), rows[0].id)
+            page.next_cursor = encode_cursor(getattr(rows[-1], sort_field), rows[-1].id)
+        return page
+
     async def get_all(self, session: AsyncSession) -> List[dict]:
         """Получить все объекты."""
         db_objs = await session.execute(select(self.model))
@@ -1,10 +1,12 @@
-from typing import Any, List, Optional, Sequence
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, List, Optional, Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import Integer, Row, any_, bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from crud.base import CRUDBase
-from services.models import ChildRegistration
+from crud.base import CRUDBase, KeysetPage
+from services.models import ChildRegistration, User
 
 
 class CRUDChildRegistrations(CRUDBase):
@@ -39,6 +41,19 @@ class CRUDChildRegistrations(CRUDBase):
         return result.scalars().all()
 
 
+    async def get_registrations_page(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        backward: bool = False,
+        limit: int = 5,
+    ) -> KeysetPage:
+        """Получение страницы регистраций по курсору (created_at, id)."""
+        return await self.get_keyset_page(
+            session, "created_at", cursor=cursor, backward=backward, limit=limit,
+        )
+
+
     async def get_registrations_count(
         self,
         session: AsyncSession,
@@ -50,20 +65,77 @@ class CRUDChildRegistrations(CRUDBase):
         return result.scalar()
 
 
+    async def get_pending_page(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        backward: bool = False,
+        limit: int = 10,
+    ) -> KeysetPage:
+        """Страница заявок на рассмотрении (частичный индекс по status = 'pending')."""
+        return await self.get_keyset_page(
+            session,
+            "created_at",
+            cursor=cursor,
+            backward=backward,
+            limit=limit,
+            filters=[self.model.status == "pending"],
+        )
+
+
+    async def set_statuses(
+        self,
+        session: AsyncSession,
+        reg_ids: Sequence[int],
+        status: str,
+    ) -> list[Row]:
+        """Утвердить или отклонить заявки на рассмотрении одним запросом.
+
+        UPDATE ... WHERE id = ANY(:ids) с одним параметром-массивом, поэтому
+        запрос подготавливается один раз при любом числе заявок. Уже
+        рассмотренные заявки не меняются, так что повторное нажатие не
+        приводит к повторному уведомлению. Для утвержденных проставляется
+        approved_at.
+
+        :return: измененные заявки (id, child_name, child_surname) вместе
+            с telegram_id родителя для уведомлений.
+        """
+        if not reg_ids:
+            return []
+        # UPDATE ... FROM users на уровне Core: ORM-вариант не умеет
+        # возвращать колонки присоединенной таблицы
+        registrations, users = self.model.__table__, User.__table__
+        query = (
+            update(registrations)
+            .where(
+                registrations.c.id == any_(bindparam("reg_ids", list(reg_ids), type_=ARRAY(Integer))),
+                registrations.c.status == "pending",
+                registrations.c.user_id == users.c.id,
+            )
+            .values(
+                status=status,
+                approved_at=func.now() if status == "approved" else None,
+            )
+            .returning(
+                registrations.c.id,
+                registrations.c.child_name,
+                registrations.c.child_surname,
+                users.c.telegram_id,
+            )
+        )
+        rows = (await session.execute(query)).all()
+        await session.commit()
+        return rows
+
+
     async def update_registration_status(
         self,
         reg_id: int,
         status: str,
         session: AsyncSession,
     ) -> bool:
-        """Обновление статуса регистрации."""
-        registration = await self.get_registration_by_id(session, reg_id)
-        if registration:
-            registration.status = status
-            await session.commit()
-            await session.refresh(registration)
-            return True
-        return False
+        """Обновление статуса заявки на рассмотрении."""
+        return bool(await self.set_statuses(session, [reg_id], status))
 
 
     async def create_registration(
@@ -79,6 +151,39 @@ class CRUDChildRegistrations(CRUDBase):
         return registration
 
 
+    async def create_registration_if_absent(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        child_name: str,
+        child_surname: str,
+        age: int,
+        parent_contact: str,
+    ) -> Optional[int]:
+        """Создать заявку, если такого ребенка у родителя еще нет.
+
+        INSERT ... ON CONFLICT DO NOTHING по (user_id, child_name,
+        child_surname, age): повторная отправка формы ничего не меняет
+        и не вызывает ошибку. Коммит выполняет вызывающий.
+
+        :return: id новой заявки или None, если она уже существует.
+        """
+        query = (
+            insert(self.model)
+            .values(
+                user_id=user_id,
+                child_name=child_name,
+                child_surname=child_surname,
+                age=age,
+                parent_contact=parent_contact,
+                status="pending",
+            )
+            .on_conflict_do_nothing(constraint="uq_child_registrations_user_child")
+            .returning(self.model.id)
+        )
+        return (await session.execute(query)).scalar()
+
+
     async def update_registration(
         self,
         reg_id: int,
@@ -95,4 +200,60 @@ class CRUDChildRegistrations(CRUDBase):
         return registration
 
 
+    def export_filters(
+        self,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> list:
+        """Условия выгрузки: статус и даты создания заявки (date_to включительно)."""
+        filters = []
+        if status:
+            filters.append(self.model.status == status)
+        if date_from:
+            filters.append(self.model.created_at >= date_from)
+        if date_to:
+            filters.append(self.model.created_at < date_to + timedelta(days=1))
+        return filters
+
+
+    async def stream_export_rows(
+        self,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        chunk_size: int = 500,
+    ) -> AsyncIterator[Row]:
+        """Регистрации вместе с данными родителя для выгрузки.
+
+        Строки читаются серверным курсором порциями по chunk_size, поэтому
+        выгрузка за сезон не загружается в память целиком. Курсор живет
+        в транзакции сессии, пока итерация не закончится.
+        """
+        query = (
+            select(
+                self.model.id,
+                self.model.created_at,
+                self.model.status,
+                self.model.child_surname,
+                self.model.child_name,
+                self.model.age,
+                self.model.parent_contact,
+                self.model.approved_at,
+                User.name.label("parent_name"),
+                User.telegram_id,
+                User.phone,
+                User.email,
+            )
+            .join(User, User.id == self.model.user_id)
+            .where(*self.export_filters(status, date_from, date_to))
+            .order_by(self.model.created_at.desc(), self.model.id.desc())
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await session.stream(query)
+        async for row in result:
+            yield row
+
+
 child_reg_crud = CRUDChildRegistrations(ChildRegistration)
\ No newline at end of file
@@ -1,23 +1,219 @@
-from aiocache import cached, Cache
-from aiocache.serializers import PickleSerializer
+import re
+from dataclasses import dataclass, field
+from datetime import timedelta
 from enum import Enum
-from typing import List, Optional
-from sqlalchemy import select, func, update
+from typing import Any, List, Optional
+from sqlalchemy import REAL, Select, case, cast, inspect, literal, literal_column, null, or_, select, func, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from core.events_cache import events_cache
 from services.models import Event
-from .base import CRUDBase
+from .base import CRUDBase, KeysetPage
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Конфигурация полнотекстового поиска, совпадает с колонкой Event.search_vector
+SEARCH_CONFIG = "russian"
+SEARCH_MAX_WORDS = 8
+_SEARCH_WORD = re.compile(r"[^\W_]+")
+
+
+def build_search_query(text: str) -> Optional[str]:
+    """Превратить ввод пользователя в строку для to_tsquery.
+
+    Все слова обязательны, последнее ищется как префикс: inline-запрос
+    приходит по мере набора. Из ввода берутся только буквы и цифры,
+    поэтому операторы tsquery в него не попадут.
+    """
+    words = _SEARCH_WORD.findall(text.lower())[:SEARCH_MAX_WORDS]
+    if not words:
+        return None
+    return " & ".join(words[:-1] + [f"{words[-1]}:*"])
+
+
+def encode_search_cursor(rank: float, event_id: int) -> str:
+    """Позиция в выдаче поиска: ранг и id последнего результата."""
+    return f"{rank!r}:{event_id}"
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    """Раскодировать курсор поиска.
+
+    :raises ValueError: если курсор поврежден.
+    """
+    rank, event_id = cursor.split(":")
+    return float(rank), int(event_id)
+
+
+# Колонки мероприятия, которые хранятся в кэше выборок (отложенный
+# search_vector в списки не загружается)
+_CACHED_COLUMNS = frozenset(
+    prop.key for prop in inspect(Event).column_attrs if not prop.deferred
+)
+
+
+def _event_to_cache(event: Event) -> dict[str, Any]:
+    """Значения колонок мероприятия: в кэш не кладутся ORM-объекты."""
+    return {key: getattr(event, key) for key in _CACHED_COLUMNS}
+
+
+def _event_from_cache(row: dict[str, Any]) -> Optional[Event]:
+    """Отсоединенный Event из кэша; None, если с тех пор изменились колонки модели."""
+    if row.keys() != _CACHED_COLUMNS:
+        return None
+    event = Event(**row)
+    make_transient_to_detached(event)
+    return event
+
+
+def _events_from_cache(rows: list[dict[str, Any]]) -> Optional[List[Event]]:
+    events = [_event_from_cache(row) for row in rows]
+    if any(event is None for event in events):
+        return None
+    return events
+
+
+def _page_to_cache(page: KeysetPage) -> dict[str, Any]:
+    return {
+        "items": [_event_to_cache(event) for event in page.items],
+        "has_prev": page.has_prev,
+        "has_next": page.has_next,
+        "prev_cursor": page.prev_cursor,
+        "next_cursor": page.next_cursor,
+    }
+
+
+def _page_from_cache(value: dict[str, Any]) -> Optional[KeysetPage]:
+    items = _events_from_cache(value["items"])
+    if items is None:
+        return None
+    return KeysetPage(
+        items=items,
+        has_prev=value["has_prev"],
+        has_next=value["has_next"],
+        prev_cursor=value["prev_cursor"],
+        next_cursor=value["next_cursor"],
+    )
+
 class EventCategory(Enum):
     COMPETITION = "competition"
     EVENT = "event"
     SPONSOR = "sponsor"
 
 
+@dataclass
+class UpsertResult:
+    """Итог пакетной загрузки постов VK."""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # Строки (id, vk_post_id, title, category) вставленных мероприятий
+    new_events: list[Any] = field(default_factory=list)
+    # Категории, списки которых изменились
+    categories: set[str] = field(default_factory=set)
+
+    def merge(self, other: "UpsertResult") -> None:
+        """Добавить итог другого пакета."""
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.new_events.extend(other.new_events)
+        self.categories |= other.categories
+
+
 class CRUDEvents(CRUDBase):
-    @cached(ttl=300, serializer=PickleSerializer(), namespace="events")
+    def list_filters(self, category: str | None = None, status: str | None = None) -> list:
+        """Условия WHERE для списков мероприятий."""
+        filters = []
+        if category:
+            filters.append(self.model.category == category)
+        if status:
+            filters.append(self.model.status == status)
+        return filters
+
+    async def upsert_vk_posts(
+        self,
+        session: AsyncSession,
+        rows: list[dict],
+        batch_size: int = 500,
+    ) -> UpsertResult:
+        """Вставить или обновить мероприятия по vk_post_id.
+
+        Один INSERT ... ON CONFLICT DO UPDATE ... RETURNING на пакет.
+        Обновляются только поля, пришедшие из VK, и только если они
+        изменились; статус и категорию, выставленные админом, не трогаем.
+        Коммит остается за вызывающим кодом.
+        """
+        result = UpsertResult()
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            stmt = pg_insert(self.model).values(batch)
+            excluded = stmt.excluded
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[self.model.vk_post_id],
+                set_={
+                    "title": excluded.title,
+                    "content": excluded.content,
+                    "images": excluded.images,
+                    "published_at": excluded.published_at,
+                    # Загруженные в Telegram картинки актуальны, пока не изменились images
+                    "image_file_ids": case(
+                        (
+                            cast(self.model.images, JSONB).is_distinct_from(cast(excluded.images, JSONB)),
+                            null(),
+                        ),
+                        else_=self.model.image_file_ids,
+                    ),
+                    # Новые картинки загружаются заново с чистым счетчиком неудач
+                    "media_upload_attempts": case(
+                        (
+                            cast(self.model.images, JSONB).is_distinct_from(cast(excluded.images, JSONB)),
+                            0,
+                        ),
+                        else_=self.model.media_upload_attempts,
+                    ),
+                    "media_failed_at": case(
+                        (
+                            cast(self.model.images, JSONB).is_distinct_from(cast(excluded.images, JSONB)),
+                            null(),
+                        ),
+                        else_=self.model.media_failed_at,
+                    ),
+                },
+                where=or_(
+                    self.model.title.is_distinct_from(excluded.title),
+                    self.model.content.is_distinct_from(excluded.content),
+                    # У json нет оператора сравнения, сравниваем как jsonb
+                    cast(self.model.images, JSONB).is_distinct_from(cast(excluded.images, JSONB)),
+                    self.model.published_at.is_distinct_from(excluded.published_at),
+                ),
+            ).returning(
+                self.model.id,
+                self.model.vk_post_id,
+                self.model.title,
+                self.model.category,
+                # xmax = 0 только у только что вставленной строки
+                literal_column("xmax = 0").label("inserted"),
+            )
+            returned = (await session.execute(stmt)).all()
+            for row in returned:
+                result.categories.add(row.category)
+                if row.inserted:
+                    result.inserted += 1
+                    result.new_events.append(row)
+                else:
+                    result.updated += 1
+            result.unchanged += len(batch) - len(returned)
+        logger.info(
+            f"Upserted {len(rows)} VK posts: inserted={result.inserted}, "
+            f"updated={result.updated}, unchanged={result.unchanged}"
+        )
+        return result
+
+
     async def get_all_events(
         self,
         session: AsyncSession,
@@ -27,16 +223,123 @@ class CRUDEvents(CRUDBase):
         status: str | None = None
     ) -> List[Event]:
         """Получить все мероприятия с пагинацией и опциональной фильтрацией."""
-        query = select(self.model).offset(offset).limit(limit).order_by(self.model.published_at.desc())
+        cache_key, cached = await events_cache.get("list", category, status, offset, limit)
+        if cached is not None:
+            events = _events_from_cache(cached)
+            if events is not None:
+                return events
+        query = select(self.model).offset(offset).limit(limit).order_by(self.model.listed_at.desc(), self.model.id.desc())
         if category:
             query = query.where(self.model.category == category)
         if status:
             query = query.where(self.model.status == status)
         db_objs = await session.execute(query)
-        return db_objs.scalars().all()
+        events = list(db_objs.scalars().all())
+        await events_cache.set(cache_key, [_event_to_cache(event) for event in events])
+        return events
+
+
+    async def get_events_page(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        backward: bool = False,
+        limit: int = 10,
+        category: str | None = None,
+        status: str | None = None
+    ) -> KeysetPage:
+        """Получить страницу мероприятий по курсору (listed_at, id)."""
+        position = f"{'p' if backward else 'n'}{cursor or ''}"
+        cache_key, cached = await events_cache.get("page", category, status, position, limit)
+        if cached is not None:
+            page = _page_from_cache(cached)
+            if page is not None:
+                return page
+        page = await self.get_keyset_page(
+            session,
+            "listed_at",
+            cursor=cursor,
+            backward=backward,
+            limit=limit,
+            filters=self.list_filters(category, status),
+        )
+        await events_cache.set(cache_key, _page_to_cache(page))
+        return page
+
+
+    def build_search_keyset_query(
+        self,
+        search_query: str,
+        cursor: Optional[str] = None,
+        category: str | None = None,
+        status: str | None = "active",
+    ) -> Select:
+        """Построить запрос поиска (Event, ts_rank), упорядоченный по (ts_rank, id) desc.
+
+        :param search_query: строка для to_tsquery из build_search_query
+        :param cursor: курсор из encode_search_cursor
+        :return: запрос без LIMIT.
+        :raises ValueError: если курсор поврежден.
+        """
+        tsquery = func.to_tsquery(SEARCH_CONFIG, search_query)
+        rank = func.ts_rank(self.model.search_vector, tsquery)
+        query = select(self.model, rank).where(
+            self.model.search_vector.op("@@")(tsquery),
+            *self.list_filters(category, status),
+        )
+        if cursor:
+            cursor_rank, cursor_id = decode_search_cursor(cursor)
+            # ts_rank возвращает real: курсор сравнивается в том же типе
+            query = query.where(
+                tuple_(rank, self.model.id) < tuple_(literal(cursor_rank, REAL), cursor_id)
+            )
+        return query.order_by(rank.desc(), self.model.id.desc())
+
+
+    async def search_events(
+        self,
+        session: AsyncSession,
+        text: str,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        category: str | None = None,
+        status: str | None = "active",
+    ) -> KeysetPage:
+        """Полнотекстовый поиск по заголовку и тексту мероприятий.
+
+        Результаты упорядочены по (ts_rank, id) desc; следующая страница
+        строится по курсору из next_cursor. Совпадения ищутся по
+        GIN-индексу ix_events_search_vector.
+
+        :raises ValueError: если курсор поврежден.
+        """
+        search_query = build_search_query(text)
+        if search_query is None:
+            return KeysetPage()
+        cache_key, cached = await events_cache.get(
+            "search", category, status, cursor, limit, query=search_query
+        )
+        if cached is not None:
+            page = _page_from_cache(cached)
+            if page is not None:
+                return page
+
+        query = self.build_search_keyset_query(search_query, cursor, category, status)
+        rows = (await session.execute(query.limit(limit + 1))).all()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        page = KeysetPage(
+            items=[event for event, _ in rows],
+            has_prev=cursor is not None,
+            has_next=has_next,
+        )
+        if rows:
+            page.prev_cursor = encode_search_cursor(rows[0][1], rows[0][0].id)
+            page.next_cursor = encode_search_cursor(rows[-1][1], rows[-1][0].id)
+        await events_cache.set(cache_key, _page_to_cache(page))
+        return page
 
 
-    @cached(ttl=300, serializer=PickleSerializer(), namespace="events")
     async def get_events_count(
         self,
         session: AsyncSession,
@@ -44,13 +347,18 @@ class CRUDEvents(CRUDBase):
         status: str | None = None
     ) -> int:
         """Получить общее количество мероприятий с опциональной фильтрацией."""
+        cache_key, cached = await events_cache.get("count", category, status)
+        if cached is not None:
+            return cached
         query = select(func.count()).select_from(self.model)
         if category:
             query = query.where(self.model.category == category)
         if status:
             query = query.where(self.model.status == status)
         result = await session.execute(query)
-        return result.scalar_one()
+        count = result.scalar_one()
+        await events_cache.set(cache_key, count)
+        return count
 
 
     async def get_total_active_competitions(self, session: AsyncSession) -> int:
@@ -76,18 +384,104 @@ class CRUDEvents(CRUDBase):
         return db_obj.scalars().first()
 
 
+    async def get_events_without_media(
+        self,
+        session: AsyncSession,
+        limit: int = 50,
+        max_attempts: int = 5,
+        retry_delay: int = 3600,
+    ) -> List[Event]:
+        """Мероприятия с картинками, которые еще не загружены в Telegram.
+
+        Мероприятия, загрузка которых не удалась max_attempts раз, больше не
+        выбираются, а после неудачи — не раньше чем через retry_delay секунд:
+        иначе постоянно падающие посты занимают весь limit и новые не грузятся.
+        Новые мероприятия идут первыми.
+        """
+        result = await session.execute(
+            select(self.model)
+            .where(
+                self.model.image_file_ids.is_(None),
+                # -> 0 дает NULL для пустого массива и не-массивов
+                cast(self.model.images, JSONB)[0].is_not(None),
+                self.model.media_upload_attempts < max_attempts,
+                or_(
+                    self.model.media_failed_at.is_(None),
+                    self.model.media_failed_at < func.now() - timedelta(seconds=retry_delay),
+                ),
+            )
+            .order_by(
+                self.model.media_upload_attempts,
+                self.model.published_at.desc().nulls_last(),
+                self.model.id.desc(),
+            )
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+
+    async def record_media_failure(
+        self,
+        session: AsyncSession,
+        event_id: int,
+        images: list[str],
+    ) -> None:
+        """Отметить неудачную загрузку картинок мероприятия.
+
+        Как и set_image_file_ids, не трогает запись, если images уже поменялись.
+        """
+        await session.execute(
+            update(self.model)
+            .where(
+                self.model.id == event_id,
+                cast(self.model.images, JSONB) == cast(images, JSONB),
+            )
+            .values(
+                media_upload_attempts=self.model.media_upload_attempts + 1,
+                media_failed_at=func.now(),
+            )
+        )
+        await session.commit()
+
+
+    async def set_image_file_ids(
+        self,
+        session: AsyncSession,
+        event_id: int,
+        images: list[str],
+        file_ids: list[str],
+    ) -> bool:
+        """Запомнить file_id картинок мероприятия.
+
+        Сохраняет, только если images не поменялись с момента загрузки.
+        """
+        result = await session.execute(
+            update(self.model)
+            .where(
+                self.model.id == event_id,
+                cast(self.model.images, JSONB) == cast(images, JSONB),
+            )
+            .values(image_file_ids=file_ids)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
     async def update_event_status(self, session: AsyncSession, event_id: int, status: str) -> bool:
         """Обновить статус мероприятия."""
         result = await session.execute(
-            update(self.model).where(self.model.id == event_id).values(status=status)
+            update(self.model)
+            .where(self.model.id == event_id)
+            .values(status=status)
+            .returning(self.model.category)
         )
-        if result.rowcount == 0:
+        category = result.scalar_one_or_none()
+        if category is None:
             logger.warning(f"Event with id={event_id} not found for status update")
             return False
         await session.commit()
         logger.info(f"Successfully updated status for event_id={event_id} to {status}")
-        await Cache(Cache.MEMORY).delete(f"get_all_events:{status}:active")
-        await Cache(Cache.MEMORY).delete(f"get_events_count:{status}:active")
+        await events_cache.invalidate(category)
         return True
 
 
@@ -99,18 +493,20 @@ class CRUDEvents(CRUDBase):
                 raise ValueError(f"Недопустимая категория: {category}. Допустимые значения: {[c.value for c in EventCategory]}")
             
             logger.debug(f"Updating category for event_id={event_id} to category={category}")
-            result = await session.execute(
-                update(self.model).where(self.model.id == event_id).values(category=category)
+            old_category = await session.scalar(
+                select(self.model.category).where(self.model.id == event_id)
             )
-            if result.rowcount == 0:
+            if old_category is None:
                 logger.warning(f"Event with id={event_id} not found for category update")
                 return False
-            
+            await session.execute(
+                update(self.model).where(self.model.id == event_id).values(category=category)
+            )
+
             if commit:
                 await session.commit()
                 logger.info(f"Successfully updated category for event_id={event_id} to {category}")
-                await Cache(Cache.MEMORY).delete(f"get_all_events:{category}:active")
-                await Cache(Cache.MEMORY).delete(f"get_events_count:{category}:active")
+                await events_cache.invalidate(old_category, category)
             return True
         
         except Exception as e:
@@ -127,8 +523,7 @@ class CRUDEvents(CRUDBase):
         await session.delete(db_obj)
         await session.commit()
         logger.info(f"Successfully deleted event_id={event_id}")
-        await Cache(Cache.MEMORY).delete(f"get_all_events:{db_obj.category}:active")
-        await Cache(Cache.MEMORY).delete(f"get_events_count:{db_obj.category}:active")
+        await events_cache.invalidate(db_obj.category)
         return True
 
 events_crud = CRUDEvents(Event)
\ No newline at end of file
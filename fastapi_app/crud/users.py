@@ -1,11 +1,16 @@
+import asyncio
+import logging
 from typing import Any, Optional, Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import event, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import Session, object_session, selectinload
 
-from crud.base import CRUDBase
-from services.models import User
+from core.user_cache import user_cache
+from crud.base import CRUDBase, KeysetPage
+from services.models import Admin, User
+
+logger = logging.getLogger(__name__)
 
 
 class CRUDUsers(CRUDBase):
@@ -49,6 +54,18 @@ class CRUDUsers(CRUDBase):
         )
         return result.scalars().all()
 
+    async def get_users_page(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        backward: bool = False,
+        limit: int = 5,
+    ) -> KeysetPage:
+        """Получение страницы юзеров по курсору (created_at, id)."""
+        return await self.get_keyset_page(
+            session, "created_at", cursor=cursor, backward=backward, limit=limit,
+        )
+
     async def get_users_count(
         self,
         session: AsyncSession,
@@ -61,6 +78,82 @@ class CRUDUsers(CRUDBase):
         )
         return result.scalar()
 
+    async def get_admin_telegram_ids(
+        self,
+        session: AsyncSession,
+    ) -> list[int]:
+        """Получение telegram id всех администраторов."""
+        result = await session.execute(
+            select(self.model.telegram_id).join(Admin, Admin.user_id == self.model.id),
+        )
+        return list(result.scalars().all())
+
+    def broadcast_filters(self) -> list:
+        """Получатели рассылок: есть telegram_id и бот не заблокирован."""
+        return [self.model.telegram_id.is_not(None), self.model.blocked_at.is_(None)]
+
+    async def count_broadcast_recipients(
+        self,
+        session: AsyncSession,
+    ) -> int:
+        """Количество получателей рассылки."""
+        result = await session.execute(
+            select(func.count()).select_from(self.model).where(*self.broadcast_filters()),
+        )
+        return result.scalar_one()
+
+    async def get_broadcast_chunk(
+        self,
+        session: AsyncSession,
+        after_id: int = 0,
+        limit: int = 500,
+    ) -> Sequence[Any]:
+        """Следующая порция получателей рассылки (id, telegram_id) по возрастанию id.
+
+        Порции читаются короткими запросами по первичному ключу: позиция
+        (after_id) — это и есть контрольная точка рассылки, и соединение
+        не держится открытым, пока идет отправка.
+        """
+        result = await session.execute(
+            select(self.model.id, self.model.telegram_id)
+            .where(self.model.id > after_id, *self.broadcast_filters())
+            .order_by(self.model.id)
+            .limit(limit),
+        )
+        return result.all()
+
+    async def mark_blocked(
+        self,
+        session: AsyncSession,
+        telegram_ids: Sequence[int],
+    ) -> int:
+        """Пометить пользователей, которым не доставляются сообщения."""
+        if not telegram_ids:
+            return 0
+        result = await session.execute(
+            update(self.model)
+            .where(self.model.telegram_id.in_(telegram_ids), self.model.blocked_at.is_(None))
+            .values(blocked_at=func.now()),
+        )
+        await session.commit()
+        return result.rowcount
+
+    async def unblock(
+        self,
+        session: AsyncSession,
+        telegram_id: int,
+    ) -> bool:
+        """Снять отметку о блокировке, если пользователь снова написал боту."""
+        result = await session.execute(
+            update(self.model)
+            .where(self.model.telegram_id == telegram_id, self.model.blocked_at.is_not(None))
+            .values(blocked_at=None),
+        )
+        if not result.rowcount:
+            return False
+        await session.commit()
+        return True
+
     async def create_user(
         self,
         session: AsyncSession,
@@ -82,11 +175,58 @@ class CRUDUsers(CRUDBase):
         """Обновление объекта юзера."""
         user = await session.get(self.model, user_id)
         if user:
+            old_telegram_id = user.telegram_id
             for key, value in kwargs.items():
                 setattr(user, key, value)
             await session.commit()
             await session.refresh(user)
+            await user_cache.invalidate(old_telegram_id)
+            if user.telegram_id != old_telegram_id:
+                await user_cache.invalidate(user.telegram_id)
         return user
 
 
 users_crud = CRUDUsers(User)
+
+# region Инвалидация кэша ролей при изменении администраторов
+
+_PENDING_KEY = "user_cache_invalidate"
+_background_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(Admin, "after_insert")
+@event.listens_for(Admin, "after_delete")
+def _collect_admin_change(mapper, connection, target: Admin) -> None:
+    """Запоминает telegram_id пользователя, чья роль изменилась."""
+    session = object_session(target)
+    if session is None:
+        return
+    telegram_id = connection.execute(
+        select(User.telegram_id).where(User.id == target.user_id)
+    ).scalar()
+    if telegram_id is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(telegram_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    """Сбрасывает кэш только после фиксации транзакции."""
+    telegram_ids = session.info.pop(_PENDING_KEY, None)
+    if not telegram_ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning("No running event loop, user cache invalidation skipped")
+        return
+    for telegram_id in telegram_ids:
+        task = loop.create_task(user_cache.invalidate(telegram_id))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+# endregion
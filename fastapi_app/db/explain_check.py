@@ -0,0 +1,199 @@
+"""Проверка планов запросов списков через EXPLAIN.
+
+Запускается против локального PostgreSQL из infra/docker-compose.yml
+после `alembic -c db/alembic.ini upgrade head`:
+
+    python -m db.explain_check
+
+Для каждого запроса списка (те же построители запросов, что в crud)
+выполняется EXPLAIN (FORMAT JSON) с выключенным последовательным
+сканированием: так проверяется, что для формы запроса есть подходящий
+индекс, даже если таблицы почти пустые. Запрос считается прошедшим,
+если в плане есть сканирование индекса (для поиска — именно GIN-индекса)
+и, когда порядок должен давать индекс, нет узла Sort. Код возврата ненулевой, если хотя бы один
+запрос не прошел. Те же проверки выполняет tests/test_query_plans.py.
+"""
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import Select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from core.db import engine
+from crud.base import encode_cursor
+from crud.child_registrations import child_reg_crud
+from crud.events import build_search_query, encode_search_cursor, events_crud
+from crud.users import users_crud
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+@dataclass
+class PlanCase:
+    """Форма запроса и требования к ее плану."""
+
+    query: Select
+    # Порядок строк дает индекс, узла Sort в плане быть не должно
+    # (у поиска сортировка по ts_rank идет после выборки из GIN-индекса)
+    ordered_by_index: bool = True
+    # Индекс, который обязательно должен использоваться; для списков любой
+    # подходящий btree-индекс годится, и выбор между ними зависит от данных
+    index: Optional[str] = None
+    # Дополнительно выключенные способы доступа (enable_*). Без них на почти
+    # пустой таблице вместо последовательного сканирования выбирается полный
+    # проход по любому btree-индексу с фильтром, и это ничего не говорит
+    # о том, подходит ли условие запроса к ожидаемому индексу
+    disabled: tuple[str, ...] = ()
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) для произвольного SELECT с параметрами."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def walk_plan(node: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+def list_queries() -> dict[str, PlanCase]:
+    """Запросы в том виде, в котором их строят обработчики бота."""
+    cursor = encode_cursor(datetime.now(timezone.utc), 2**31 - 1)
+    search_query = build_search_query("турнир по борьбе")
+    return {
+        "events: active category, first page": PlanCase(
+            events_crud.build_keyset_query(
+                "listed_at",
+                filters=events_crud.list_filters("competition", "active"),
+            ).limit(6),
+        ),
+        "events: active category, next page": PlanCase(
+            events_crud.build_keyset_query(
+                "listed_at",
+                cursor=cursor,
+                filters=events_crud.list_filters("event", "active"),
+            ).limit(6),
+        ),
+        "events: active category, previous page": PlanCase(
+            events_crud.build_keyset_query(
+                "listed_at",
+                cursor=cursor,
+                backward=True,
+                filters=events_crud.list_filters("event", "active"),
+            ).limit(6),
+        ),
+        "events: admin list, next page": PlanCase(
+            events_crud.build_keyset_query(
+                "listed_at",
+                cursor=cursor,
+            ).limit(6),
+        ),
+        # Поиск проверяется без фильтра статуса: публичный поиск добавляет
+        # status = 'active', и на маленькой таблице, где активны почти все
+        # строки, планировщик честно выбирает частичный btree-индекс. Условие
+        # @@ то же самое, поэтому проверка ловит расхождение с GIN-индексом
+        "events: search, first page": PlanCase(
+            events_crud.build_search_keyset_query(search_query, status=None).limit(21),
+            ordered_by_index=False,
+            index="ix_events_search_vector",
+            disabled=("enable_indexscan", "enable_indexonlyscan"),
+        ),
+        "events: search, next page": PlanCase(
+            events_crud.build_search_keyset_query(
+                search_query,
+                cursor=encode_search_cursor(0.5, 2**31 - 1),
+                status=None,
+            ).limit(21),
+            ordered_by_index=False,
+            index="ix_events_search_vector",
+            disabled=("enable_indexscan", "enable_indexonlyscan"),
+        ),
+        "users: admin list, next page": PlanCase(
+            users_crud.build_keyset_query(
+                "created_at",
+                cursor=cursor,
+            ).limit(6),
+        ),
+        "registrations: admin list, next page": PlanCase(
+            child_reg_crud.build_keyset_query(
+                "created_at",
+                cursor=cursor,
+            ).limit(6),
+        ),
+        "registrations: pending queue, next page": PlanCase(
+            child_reg_crud.build_keyset_query(
+                "created_at",
+                cursor=cursor,
+                filters=[child_reg_crud.model.status == "pending"],
+            ).limit(11),
+        ),
+    }
+
+
+async def explain_plans(queries: dict[str, PlanCase]) -> dict[str, Any]:
+    """EXPLAIN каждого запроса без последовательного сканирования."""
+    plans = {}
+    async with engine.connect() as conn:
+        for name, case in queries.items():
+            async with conn.begin():
+                for setting in ("enable_seqscan", *case.disabled):
+                    await conn.execute(text(f"SET LOCAL {setting} = off"))
+                plan = (await conn.execute(Explain(case.query))).scalar()
+            plans[name] = json.loads(plan) if isinstance(plan, str) else plan
+    return plans
+
+
+def plan_problems(case: PlanCase, plan: Any) -> list[str]:
+    """Чем план не устраивает; пустой список — план в порядке."""
+    nodes = list(walk_plan(plan[0]["Plan"]))
+    indexes = {
+        node["Index Name"] for node in nodes
+        if node["Node Type"] in INDEX_NODES and "Index Name" in node
+    }
+    problems = []
+    if not indexes:
+        problems.append("no index scan")
+    elif case.index and case.index not in indexes:
+        problems.append(f"expected {case.index}, used {', '.join(sorted(indexes))}")
+    if case.ordered_by_index and any(node["Node Type"] == "Sort" for node in nodes):
+        problems.append("plan sorts rows instead of reading them in index order")
+    return problems
+
+
+def used_indexes(plan: Any) -> list[str]:
+    return sorted({node["Index Name"] for node in walk_plan(plan[0]["Plan"]) if "Index Name" in node})
+
+
+async def check_plans() -> bool:
+    queries = list_queries()
+    try:
+        plans = await explain_plans(queries)
+    finally:
+        await engine.dispose()
+    ok = True
+    for name, case in queries.items():
+        problems = plan_problems(case, plans[name])
+        ok = ok and not problems
+        print(f"[{'FAIL' if problems else 'OK'}] {name}: {'; '.join(problems) or ', '.join(used_indexes(plans[name]))}")
+        if problems:
+            print(json.dumps(plans[name], indent=2, ensure_ascii=False))
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(check_plans()) else 1)
@@ -0,0 +1,28 @@
+"""event image file ids
+
+Revision ID: 3b8f0d2c6a41
+Revises: 7c2e5a91f3b4
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8f0d2c6a41'
+down_revision: Union[str, None] = '7c2e5a91f3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('image_file_ids', sa.JSON(none_as_null=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('events', 'image_file_ids')
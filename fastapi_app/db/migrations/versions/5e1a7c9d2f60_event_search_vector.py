@@ -0,0 +1,59 @@
+"""event search vector
+
+Revision ID: 5e1a7c9d2f60
+Revises: 3b8f0d2c6a41
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1a7c9d2f60'
+down_revision: Union[str, None] = '3b8f0d2c6a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Генерируемая колонка заполняется для всех строк при добавлении
+    # (таблица переписывается под блокировкой — на сотнях тысяч постов это секунды)
+    op.add_column(
+        'events',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('russian', coalesce(content, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_events_search_vector',
+            'events',
+            ['search_vector'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_events_search_vector',
+            table_name='events',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('events', 'search_vector')
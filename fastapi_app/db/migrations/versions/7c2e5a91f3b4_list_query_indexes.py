@@ -0,0 +1,88 @@
+"""list query indexes
+
+Revision ID: 7c2e5a91f3b4
+Revises: d4bbef91b02e
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e5a91f3b4'
+down_revision: Union[str, None] = 'd4bbef91b02e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в таблицы на рабочей базе,
+    # но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_events_active_category_published_at',
+            'events',
+            ['category', sa.text('published_at DESC'), sa.text('id DESC')],
+            postgresql_where=sa.text("status = 'active'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_events_published_at_id',
+            'events',
+            [sa.text('published_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_users_created_at_id',
+            'users',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_child_registrations_created_at_id',
+            'child_registrations',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_child_registrations_pending_created_at',
+            'child_registrations',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_where=sa.text("status = 'pending'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            op.f('ix_child_registrations_user_id'),
+            'child_registrations',
+            ['user_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table in (
+            ('ix_child_registrations_user_id', 'child_registrations'),
+            ('ix_child_registrations_pending_created_at', 'child_registrations'),
+            ('ix_child_registrations_created_at_id', 'child_registrations'),
+            ('ix_users_created_at_id', 'users'),
+            ('ix_events_published_at_id', 'events'),
+            ('ix_events_active_category_published_at', 'events'),
+        ):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,53 @@
+"""child registration natural key
+
+Revision ID: b7e3f19a4c82
+Revises: 9c4b2e7a1d35
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f19a4c82'
+down_revision: Union[str, None] = '9c4b2e7a1d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Из накопившихся дублей остается одна заявка: утвержденная,
+    # затем на рассмотрении, затем самая ранняя
+    op.execute(
+        """
+        DELETE FROM child_registrations
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    id,
+                    row_number() OVER (
+                        PARTITION BY user_id, child_name, child_surname, age
+                        ORDER BY
+                            CASE status WHEN 'approved' THEN 0 WHEN 'pending' THEN 1 ELSE 2 END,
+                            id
+                    ) AS position
+                FROM child_registrations
+            ) ranked
+            WHERE position > 1
+        )
+        """
+    )
+    op.create_unique_constraint(
+        'uq_child_registrations_user_child',
+        'child_registrations',
+        ['user_id', 'child_name', 'child_surname', 'age'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_child_registrations_user_child', 'child_registrations', type_='unique')
@@ -0,0 +1,30 @@
+"""event media upload failures
+
+Revision ID: e2a6c4f81b07
+Revises: b7e3f19a4c82
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a6c4f81b07'
+down_revision: Union[str, None] = 'b7e3f19a4c82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('media_upload_attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('events', sa.Column('media_failed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('events', 'media_failed_at')
+    op.drop_column('events', 'media_upload_attempts')
@@ -0,0 +1,77 @@
+"""event listed_at indexes
+
+Revision ID: f1c8d3a5e927
+Revises: e2a6c4f81b07
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8d3a5e927'
+down_revision: Union[str, None] = 'e2a6c4f81b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Списки сортируются по coalesce(published_at, created_at): мероприятия
+    # без даты публикации больше не выпадают из выдачи
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_events_active_category_listed_at',
+            'events',
+            ['category', sa.text('coalesce(published_at, created_at) DESC'), sa.text('id DESC')],
+            postgresql_where=sa.text("status = 'active'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_events_listed_at_id',
+            'events',
+            [sa.text('coalesce(published_at, created_at) DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for name in ('ix_events_published_at_id', 'ix_events_active_category_published_at'):
+            op.drop_index(
+                name,
+                table_name='events',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+        # Статистика по выражению индекса собирается только ANALYZE;
+        # без нее планировщик до автоанализа выбирает bitmap scan с сортировкой
+        op.execute('ANALYZE events')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_events_active_category_published_at',
+            'events',
+            ['category', sa.text('published_at DESC'), sa.text('id DESC')],
+            postgresql_where=sa.text("status = 'active'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_events_published_at_id',
+            'events',
+            [sa.text('published_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for name in ('ix_events_listed_at_id', 'ix_events_active_category_listed_at'):
+            op.drop_index(
+                name,
+                table_name='events',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
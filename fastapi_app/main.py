@@ -4,23 +4,37 @@ from typing import Any, AsyncGenerator
 import logging
 import logging.config
 
-from core.logging_config import LOGGING_CONFIG, setup_logging
-
-from bot.middleware import DatabaseMiddleware, RoleMiddleware
+from core.logging_config import setup_logging
+
+from bot.broadcast import BroadcastManager
+from bot.fsm_storage import BatchingRedisStorage
+from bot.notifications import NotificationQueue
+from bot.middleware import (
+    DatabaseMiddleware,
+    FSMBatchMiddleware,
+    HandlerMetricsMiddleware,
+    IdempotentUpdateMiddleware,
+    RoleMiddleware,
+    UpdateMetricsMiddleware,
+)
+from bot.webhook import get_webhook_router
 import uvicorn
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage
 from fastadmin import fastapi_app as admin_app
 from fastapi import FastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from bot.handlers import base_router
 from core.config import settings
+from core.db import async_session_maker
+from core.redis import redis_client
 from core.init_db import create_first_superuser, init_db
+from core.passwords import password_service
 from services import AdminAdmin, ChildRegistrationAdmin, EventAdmin, UserAdmin
 from services import admin_router, child_router, event_router
+from services.registrations_export import export_router
 
 # Настройка логирования
 setup_logging()
@@ -32,8 +46,30 @@ bot = Bot(
     token=settings.telegram_bot_token,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML),
 )
-storage = RedisStorage.from_url(settings.redis_url)  # Используем redis_url из settings
+storage = BatchingRedisStorage.from_url(
+    settings.redis_url,
+    state_ttl=settings.fsm_ttl,
+    data_ttl=settings.fsm_ttl,
+)
 dp = Dispatcher(storage=storage)
+# Рассылки доступны обработчикам как параметр broadcasts
+broadcasts = BroadcastManager(
+    bot,
+    redis_client,
+    async_session_maker,
+    rate=settings.broadcast_rate,
+    concurrency=settings.broadcast_concurrency,
+    chunk_size=settings.broadcast_chunk_size,
+)
+dp["broadcasts"] = broadcasts
+# Уведомления родителям о решении по заявкам (параметр notifications)
+notifications = NotificationQueue(bot)
+dp["notifications"] = notifications
+# Буфер FSM оборачивает встроенный FSMContextMiddleware, поэтому ставится перед ним
+dp.update.outer_middleware.unregister(dp.fsm)
+dp.update.outer_middleware(UpdateMetricsMiddleware())
+dp.update.outer_middleware(FSMBatchMiddleware(storage))
+dp.update.outer_middleware(dp.fsm)
 
 # Регистрация маршрутов
 dp.include_routers(
@@ -48,6 +84,15 @@ dp.message.middleware(DatabaseMiddleware())  # Сначала DatabaseMiddleware
 dp.message.middleware(RoleMiddleware())      # Затем RoleMiddleware
 dp.callback_query.middleware(DatabaseMiddleware())  # Сначала DatabaseMiddleware
 dp.callback_query.middleware(RoleMiddleware())      # Затем RoleMiddleware
+dp.inline_query.middleware(DatabaseMiddleware())    # Inline-поиск мероприятий
+# Замер обработчиков внутри сессии и проверки ролей
+dp.message.middleware(HandlerMetricsMiddleware())
+dp.callback_query.middleware(HandlerMetricsMiddleware())
+dp.inline_query.middleware(HandlerMetricsMiddleware())
+# Повторные доставки обновления пропускаются для обработчиков с флагом idempotent
+idempotency = IdempotentUpdateMiddleware(redis_client, ttl=settings.update_dedup_ttl)
+dp.message.middleware(idempotency)
+dp.callback_query.middleware(idempotency)
 
 
 @asynccontextmanager
@@ -56,24 +101,44 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
     Контекстный менеджер для жизненного цикла приложения.
 
     Выполняет инициализацию базы данных, создание суперпользователя,
-    запуск поллинга Telegram и очистку ресурсов при завершении.
+    регистрацию вебхука или запуск поллинга Telegram и очистку ресурсов
+    при завершении.
     """
     logger.info("Инициализация базы данных...")
     await init_db()
     logger.info("Создание суперпользователя...")
     await create_first_superuser()
-    logger.info("Удаление вебхука Telegram...")
-    await bot.delete_webhook(drop_pending_updates=True)
-    logger.info("Запуск поллинга Telegram...")
-    import asyncio
-    polling_task = asyncio.create_task(dp.start_polling(bot))
+
+    polling_task = None
+    if settings.use_webhook:
+        webhook_url = settings.telegram_webhook_url.rstrip("/") + settings.telegram_webhook_path
+        logger.info(f"Регистрация вебхука Telegram: {webhook_url}")
+        await bot.set_webhook(
+            url=webhook_url,
+            secret_token=settings.telegram_webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    else:
+        logger.info("Удаление вебхука Telegram...")
+        await bot.delete_webhook(drop_pending_updates=True)
+        logger.info("Запуск поллинга Telegram...")
+        import asyncio
+        polling_task = asyncio.create_task(dp.start_polling(bot))
+
+    # Незавершенные рассылки продолжаются с контрольной точки
+    await broadcasts.resume()
 
     yield  # Передача управления приложению
 
     logger.info("Остановка приложения...")
-    await dp.stop_polling()
-    await polling_task
+    if polling_task:
+        await dp.stop_polling()
+        await polling_task
+    await broadcasts.close()
+    await notifications.close()
+    # Вебхук не удаляем: его продолжают обслуживать остальные воркеры
     await bot.session.close()
+    password_service.close()
 
 
 # Создание экземпляра приложения FastAPI
@@ -81,6 +146,20 @@ app = FastAPI(lifespan=lifespan)
 logger.info("Монтирование админ-панели fastadmin...")
 app.mount("/admin", admin_app)
 
+# Выгрузка регистраций детей (HTTP Basic, учетные данные админ-панели)
+app.include_router(export_router)
+
+# Эндпоинт для обновлений Telegram (режим вебхука)
+if settings.use_webhook:
+    app.include_router(
+        get_webhook_router(
+            bot,
+            dp,
+            path=settings.telegram_webhook_path,
+            secret_token=settings.telegram_webhook_secret,
+        )
+    )
+
 # Настройка Prometheus метрик
 Instrumentator().instrument(app).expose(app, endpoint="/metrics")
 
@@ -93,6 +172,8 @@ if __name__ == "__main__":
         app,
         host=settings.web_server_host,
         port=settings.web_server_port,
-        log_config=LOGGING_CONFIG,  # Передача конфигурации логирования
+        # Логирование уже настроено setup_logging: логгеры uvicorn пишут
+        # в общую очередь через корневой логгер
+        log_config=None,
         log_level="info",  # Синхронизация с конфигурацией
     )
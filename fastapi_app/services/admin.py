@@ -1,11 +1,58 @@
 from __future__ import annotations
 from fastadmin import SqlAlchemyModelAdmin, register
+from fastadmin.api.exceptions import AdminApiException
+from sqlalchemy import func, select
+from core.config import settings
 from core.db import AsyncSessionLocal
+from core.passwords import password_service
+from core.rate_limit import LoginRateLimiter
+from core.redis import redis_client
+from crud.events import SEARCH_CONFIG, build_search_query
 from services.models import Admin, ChildRegistration, Event, User
 import logging
 
 logger = logging.getLogger("my_app")
 
+admin_login_limiter = LoginRateLimiter(
+    redis_client,
+    max_attempts=settings.admin_login_max_attempts,
+    window=settings.admin_login_window,
+)
+
+
+async def verify_admin_credentials(username: str, password: str) -> int | None:
+    """Проверить email и пароль администратора, вернуть id или None.
+
+    bcrypt выполняется в пуле потоков password_service. Хеш с устаревшим
+    числом раундов пересохраняется после успешного входа. Неудачные попытки
+    учитываются в admin_login_limiter; проверять блокировку должен вызывающий.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Admin).join(Admin.user).where(User.email == username)
+        )
+        admin = result.scalar_one_or_none()
+        if admin is None:
+            await password_service.dummy_verify()
+            verified, new_hash = False, None
+        else:
+            verified, new_hash = await password_service.verify_and_update(password, admin.password)
+
+        if not verified:
+            await admin_login_limiter.register_failure(username)
+            logger.info(f"Authentication failed for username={username}")
+            return None
+
+        if new_hash is not None:
+            admin.password = new_hash
+            await session.commit()
+            logger.info(f"Password hash upgraded for admin id={admin.id}")
+
+    await admin_login_limiter.reset(username)
+    logger.info(f"Authentication successful for username={username}")
+    return admin.id
+
+
 # Проверка импортов моделей
 logger.info(f"Imported models: Admin={Admin}, ChildRegistration={ChildRegistration}, Event={Event}, User={User}")
 
@@ -20,11 +67,13 @@ class AdminAdmin(SqlAlchemyModelAdmin):
         logger.info(f"Registering AdminAdmin with model: {Admin}")
         super().__init__(*args, **kwargs)
 
-    def authenticate(self, username: str, password: str) -> bool:
+    async def authenticate(self, username: str, password: str) -> int | None:
+        """Проверить email и пароль администратора, вернуть id или None."""
         logger.info(f"Attempting authentication: username={username}")
-        result = super().authenticate(username, password)
-        logger.info(f"Authentication {'successful' if result else 'failed'} for username={username}")
-        return result
+        if await admin_login_limiter.is_blocked(username):
+            logger.warning(f"Too many failed login attempts for username={username}")
+            raise AdminApiException(429, detail="Слишком много попыток входа. Попробуйте позже.")
+        return await verify_admin_credentials(username, password)
 
 
 @register(ChildRegistration, sqlalchemy_sessionmaker=AsyncSessionLocal)
@@ -41,15 +90,50 @@ class ChildRegistrationAdmin(SqlAlchemyModelAdmin):
 
 @register(Event, sqlalchemy_sessionmaker=AsyncSessionLocal)
 class EventAdmin(SqlAlchemyModelAdmin):
-    list_display = ["title", "date", "location", "created_at"]
-    list_filter = ["date", "created_at"]
-    search_fields = ["title", "location"]
-    date_hierarchy = "date"
+    list_display = ["title", "category", "status", "published_at", "created_at"]
+    list_filter = ["category", "status", "published_at"]
+    search_fields = ["title"]
+    date_hierarchy = "published_at"
 
     def __init__(self, *args, **kwargs):
         logger.info(f"Registering EventAdmin with model: {Event}")
         super().__init__(*args, **kwargs)
 
+    async def orm_get_list(
+        self,
+        offset: int | None = None,
+        limit: int | None = None,
+        search: str | None = None,
+        sort_by: str | None = None,
+        filters: dict | None = None,
+    ) -> tuple[list, int]:
+        """Поиск в админке через полнотекстовый индекс вместо ILIKE.
+
+        Без поискового запроса работает стандартный список fastadmin.
+        Поиск учитывает фильтры на точное совпадение и сортирует по
+        релевантности, если сортировка не выбрана.
+        """
+        search_query = build_search_query(search or "")
+        if search_query is None:
+            return await super().orm_get_list(offset, limit, None, sort_by, filters)
+
+        tsquery = func.to_tsquery(SEARCH_CONFIG, search_query)
+        query = select(Event).where(Event.search_vector.op("@@")(tsquery))
+        for (field, condition), value in (filters or {}).items():
+            if condition == "exact":
+                query = query.where(getattr(Event, field) == value)
+        if sort_by:
+            column = getattr(Event, sort_by.lstrip("-"))
+            query = query.order_by(column.desc() if sort_by.startswith("-") else column.asc())
+        else:
+            query = query.order_by(func.ts_rank(Event.search_vector, tsquery).desc(), Event.id.desc())
+
+        async with AsyncSessionLocal() as session:
+            total = (await session.execute(select(func.count()).select_from(query.subquery()))).scalar()
+            if offset is not None and limit is not None:
+                query = query.offset(offset).limit(limit)
+            return (await session.scalars(query)).all(), total
+
 
 @register(User, sqlalchemy_sessionmaker=AsyncSessionLocal)
 class UserAdmin(SqlAlchemyModelAdmin):
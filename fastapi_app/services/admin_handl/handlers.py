@@ -1,18 +1,21 @@
 from __future__ import annotations
 
-from typing import Optional
+import html
+import os
+from collections import defaultdict
+from typing import Any, Optional, Sequence
 
 from aiogram import F, Router, types
-from aiogram.types import Message
+from aiogram.types import FSInputFile, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
+from bot.broadcast import BroadcastManager, format_progress
+from bot.notifications import NotificationQueue
 from bot.logger import logger
 from bot.keyboards import get_main_menu_keyboard, get_inline_keyboard
-from core.db import get_async_session
+from core.user_cache import CachedUser, user_cache
 from crud.events import events_crud
 from crud.users import users_crud
 from crud.child_registrations import child_reg_crud
@@ -22,13 +25,25 @@ from crud.child_registrations import child_reg_crud
 #     get_registration_by_id,
 #     update_registration_status,
 # )
+from services.event_handl.render import warm_event_lists
 from services.models import User
+from services.registrations_export import (
+    EXPORT_PERIODS,
+    STATUS_LABELS,
+    export_filename,
+    period_range,
+    temp_export_path,
+    write_export,
+)
 from .keyboards import (
+    bulk_page_ids,
+    get_bulk_registrations_keyboard,
     get_child_actions_keyboard,
     get_child_registrations_list_keyboard,
     get_users_list_keyboard,
     get_events_list_keyboard,
     get_event_actions_keyboard,
+    refresh_bulk_keyboard,
 )
 
 admin_router = Router()
@@ -41,14 +56,22 @@ class StartState(StatesGroup):
     CHILD_REGISTRATIONS = State()
     SELECT_CHILD = State()
     SELECT_EVENT = State()
+    BROADCAST_TEXT = State()
+
 
+# Размер страницы в списках администратора
+PER_PAGE = 5
+# Размер страницы массовой обработки заявок
+BULK_PER_PAGE = 10
 
 ADMIN_USERS_MENU = get_inline_keyboard(
     ("Список пользователей", "users_list"),
     ("Список детей", "child_registrations_list"),
     ("Список мероприятий", "event_list_admin"),
+    ("Выгрузка регистраций", "admin_export"),
+    ("Рассылка всем пользователям", "admin_broadcast"),
     ("Вернуться в главное меню", "back_to_main"),
-    sizes=(1, 1, 1, 1),
+    sizes=(1, 1, 1, 1, 1, 1),
 )
 
 
@@ -72,25 +95,21 @@ async def handle_back_to_main(
     callback: types.CallbackQuery,
     state: FSMContext,
     session: AsyncSession,  # Добавляем сессию как зависимость
+    user: Optional[CachedUser] = None,
 ) -> None:
     """Возвращает пользователя в главное меню."""
     # Ленивый импорт QuizState
     from bot.handlers import QuizState
     user_id = callback.from_user.id
-    async with session:  # Используем переданную сессию
-        result = await session.execute(
-            select(User)
-            .where(User.telegram_id == user_id)
-            .options(selectinload(User.admin_role))  # Предварительная загрузка admin_role
-        )
-        user = result.scalar_one_or_none()
-        if not user:
-            user = User(telegram_id=user_id, name=callback.from_user.username or "Anonymous")
-            session.add(user)
-            await session.commit()
-    
-    is_admin = user.admin_role is not None if user else False
-    main_menu_kb = get_main_menu_keyboard(is_admin=is_admin)
+    # Пользователь уже загружен RoleMiddleware через кэш
+    if not user:
+        db_user = User(telegram_id=user_id, name=callback.from_user.username or "Anonymous")
+        session.add(db_user)
+        await session.commit()
+        user = CachedUser(id=db_user.id, telegram_id=user_id, name=db_user.name, is_admin=False)
+        await user_cache.set(user)
+
+    main_menu_kb = get_main_menu_keyboard(is_admin=user.is_admin)
 
     await state.set_state(QuizState.MAIN_MENU)
     await callback.message.edit_text(
@@ -100,24 +119,56 @@ async def handle_back_to_main(
     await callback.answer()
 
 
-@admin_router.callback_query(F.data == "users_list")
-async def show_users_list(
-    callback: types.CallbackQuery,
+def parse_page_callback(data: str) -> tuple[int, str, bool]:
+    """Разбирает callback навигации вида {prefix}_{prev|next}_{page}_{cursor}.
+
+    Returns:
+        Номер страницы, курсор и признак движения назад.
+    """
+    direction, page, cursor = data.split("_")[-3:]
+    return int(page), cursor, direction == "prev"
+
+
+async def get_saved_position(
     state: FSMContext,
-    session: AsyncSession,
-) -> None:
-    """Обрабатывает отображение списка пользователей."""
+    menu: str,
+) -> tuple[int, Optional[str], bool]:
+    """Возвращает сохраненную позицию списка, если пользователь в том же меню."""
     data = await state.get_data()
-    page = data.get("current_page", 0)
-    per_page = 5
+    if data.get("current_menu") != menu:
+        return 0, None, False
+    return (
+        data.get("current_page", 0),
+        data.get("list_cursor"),
+        data.get("list_backward", False),
+    )
 
-    async with get_async_session() as session:
-        users = await users_crud.get_all_users(session, offset=page * per_page, limit=per_page)
-        total_users = await users_crud.get_users_count(session)
 
-    keyboard = get_users_list_keyboard(users, page, total_users, per_page)
+async def show_users_page(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    page: int = 0,
+    cursor: Optional[str] = None,
+    backward: bool = False,
+) -> None:
+    """Отображает страницу списка пользователей по курсору."""
+    users_page = await users_crud.get_users_page(
+        session, cursor=cursor, backward=backward, limit=PER_PAGE,
+    )
+    keyboard = get_users_list_keyboard(
+        users_page.items,
+        page,
+        prev_cursor=users_page.prev_cursor if users_page.has_prev else None,
+        next_cursor=users_page.next_cursor if users_page.has_next else None,
+    )
 
-    await state.update_data(current_menu="users_list", current_page=page)
+    await state.update_data(
+        current_menu="users_list",
+        current_page=page,
+        list_cursor=cursor,
+        list_backward=backward,
+    )
     await callback.message.edit_text(
         ("Выберите необходимого пользователя для изменения его профиля.\n\n"
          f"Список пользователей (страница {page + 1}):"),
@@ -126,35 +177,56 @@ async def show_users_list(
     await callback.answer()
 
 
-@admin_router.callback_query(F.data == "child_registrations_list")
-async def show_child_registrations_list(
+@admin_router.callback_query(F.data == "users_list")
+async def show_users_list(
     callback: types.CallbackQuery,
     state: FSMContext,
     session: AsyncSession,
 ) -> None:
-    """Обрабатывает отображение списка зарегистрированных детей."""
-    data = await state.get_data()
-    page = data.get("current_page", 0)
-    per_page = 5
+    """Обрабатывает отображение списка пользователей."""
+    page, cursor, backward = await get_saved_position(state, "users_list")
+    await show_users_page(callback, state, session, page, cursor, backward)
 
-    async with get_async_session() as session:
-        registrations = await child_reg_crud.get_all_registrations(
-            session,
-            offset=page * per_page,
-            limit=per_page
-        )
-        total_registrations = await child_reg_crud.get_registrations_count(session)
 
+@admin_router.callback_query(F.data.startswith(("users_prev_", "users_next_")))
+async def paginate_users_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Переключает страницу списка пользователей."""
+    try:
+        page, cursor, backward = parse_page_callback(callback.data)
+    except ValueError:
+        await callback.answer("Неверный формат действия.", show_alert=True)
+        return
+    await show_users_page(callback, state, session, page, cursor, backward)
+
+
+async def show_child_registrations_page(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    page: int = 0,
+    cursor: Optional[str] = None,
+    backward: bool = False,
+) -> None:
+    """Отображает страницу списка зарегистрированных детей по курсору."""
+    registrations_page = await child_reg_crud.get_registrations_page(
+        session, cursor=cursor, backward=backward, limit=PER_PAGE,
+    )
     keyboard = get_child_registrations_list_keyboard(
-        registrations,
+        registrations_page.items,
         page,
-        total_registrations,
-        per_page
+        prev_cursor=registrations_page.prev_cursor if registrations_page.has_prev else None,
+        next_cursor=registrations_page.next_cursor if registrations_page.has_next else None,
     )
 
     await state.update_data(
         current_menu="child_registrations_list",
-        current_page=page
+        current_page=page,
+        list_cursor=cursor,
+        list_backward=backward,
     )
     await callback.message.edit_text(
         ("Управление зарегистрированными детьми.\n\n"
@@ -164,6 +236,32 @@ async def show_child_registrations_list(
     await callback.answer()
 
 
+@admin_router.callback_query(F.data == "child_registrations_list")
+async def show_child_registrations_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Обрабатывает отображение списка зарегистрированных детей."""
+    page, cursor, backward = await get_saved_position(state, "child_registrations_list")
+    await show_child_registrations_page(callback, state, session, page, cursor, backward)
+
+
+@admin_router.callback_query(F.data.startswith(("child_reg_prev_", "child_reg_next_")))
+async def paginate_child_registrations_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Переключает страницу списка зарегистрированных детей."""
+    try:
+        page, cursor, backward = parse_page_callback(callback.data)
+    except ValueError:
+        await callback.answer("Неверный формат действия.", show_alert=True)
+        return
+    await show_child_registrations_page(callback, state, session, page, cursor, backward)
+
+
 @admin_router.callback_query(F.data.startswith("child_select_"))
 async def show_child_actions(
     callback: types.CallbackQuery,
@@ -179,11 +277,10 @@ async def show_child_actions(
     """
     reg_id = int(callback.data.split("_")[2])  # Извлекаем reg_id из child_select_{reg_id}
 
-    async with get_async_session() as session:
-        registration = await child_reg_crud.get_registration_by_id(session, reg_id)
-        if not registration:
-            await callback.answer("Запись не найдена.", show_alert=True)
-            return
+    registration = await child_reg_crud.get_registration_by_id(reg_id=reg_id, session=session)
+    if not registration:
+        await callback.answer("Запись не найдена.", show_alert=True)
+        return
 
     status = "✅" if registration.status == "approved" else "❌" if registration.status == "rejected" else "⏳"
     text = f"{registration.child_name} {registration.child_surname} (Возраст: {registration.age}) [{status}]"
@@ -197,11 +294,39 @@ async def show_child_actions(
     await callback.answer()
 
 
-@admin_router.callback_query(F.data.startswith("child_reg_"))
+def notify_parents(
+    notifications: NotificationQueue,
+    registrations: Sequence[Any],
+    status: str,
+) -> None:
+    """Ставит в очередь уведомления родителям, одно сообщение на родителя.
+
+    Args:
+        notifications: Очередь уведомлений.
+        registrations: Строки из set_statuses (child_name, child_surname, telegram_id).
+        status: Новый статус заявок.
+    """
+    children = defaultdict(list)
+    for reg in registrations:
+        if reg.telegram_id:
+            children[reg.telegram_id].append(html.escape(f"{reg.child_name} {reg.child_surname}"))
+    approved = status == "approved"
+    for telegram_id, names in children.items():
+        if len(names) == 1:
+            verdict = "утверждена" if approved else "отклонена"
+            text = f"Заявка на регистрацию ребенка {names[0]} {verdict}."
+        else:
+            verdict = "утверждены" if approved else "отклонены"
+            text = f"Заявки на регистрацию {verdict}:\n" + "\n".join(f"• {name}" for name in names)
+        notifications.enqueue(telegram_id, text)
+
+
+@admin_router.callback_query(F.data.regexp(r"^child_reg_(approve|reject)_\d+$"))
 async def handle_child_registration_action(
     callback: types.CallbackQuery,
     state: FSMContext,
     session: AsyncSession,
+    notifications: NotificationQueue,
 ) -> None:
     """Обрабатывает действия над записью ребенка (утвердить/отклонить).
 
@@ -209,6 +334,7 @@ async def handle_child_registration_action(
         callback: Объект CallbackQuery от aiogram.
         state: Контекст конечного автомата состояний.
         session: Асинхронная сессия SQLAlchemy.
+        notifications: Очередь уведомлений родителям.
     """
     parts = callback.data.split("_")
     if len(parts) < 3:  # Минимальный формат: ["child", "reg", "action", "reg_id"]
@@ -218,94 +344,76 @@ async def handle_child_registration_action(
     action = parts[2]  # Третий элемент — действие (approve/reject)
     reg_id = int(parts[3])  # Четвертый элемент — ID регистрации
 
-    async with get_async_session() as session:
-            registration = await child_reg_crud.get_registration_by_id(session, reg_id)
-            if not registration:
-                await callback.answer("Запись не найдена.", show_alert=True)
-                return
-
-            if action == "approve":
-                if await child_reg_crud.update_registration_status(session, reg_id, "approved"):  # Добавлен await
-                    await callback.answer("Регистрация утверждена.")
-                else:
-                    await callback.answer("Ошибка при утверждении.", show_alert=True)
-            elif action == "reject":
-                if await child_reg_crud.update_registration_status(session, reg_id, "rejected"):  # Добавлен await
-                    await callback.answer("Регистрация отклонена.")
-                else:
-                    await callback.answer("Ошибка при отклонении.", show_alert=True)
-
-        # Обновляем список после изменения статуса
+    status = "approved" if action == "approve" else "rejected"
+    updated = await child_reg_crud.set_statuses(session, [reg_id], status)
+    if not updated:
+        await callback.answer("Заявка не найдена или уже рассмотрена.", show_alert=True)
+        return
+    notify_parents(notifications, updated, status)
+    await callback.answer("Регистрация утверждена." if status == "approved" else "Регистрация отклонена.")
+
+    # Обновляем текущую страницу списка после изменения статуса
     data = await state.get_data()
     page = data.get("current_page", 0)
-    per_page = 5
-    async with get_async_session() as session:
-        registrations = await child_reg_crud.get_all_registrations(
-            session,
-            offset=page * per_page,
-            limit=per_page
-        )
-        total_registrations = await child_reg_crud.get_registrations_count(session)
-        new_keyboard = get_child_registrations_list_keyboard(
-            registrations,
-            page,
-            total_registrations,
-            per_page
-        )
-        # Добавляем информацию о последней измененной записи в текст
-        last_updated_reg = next((reg for reg in registrations if reg.id == reg_id), None)
-        status_text = f" (Последняя запись: {last_updated_reg.child_name} [{last_updated_reg.status}]" if last_updated_reg else ""
-        new_text = (
-            f"Управление зарегистрированными детьми.\n\n"
-            f"Список детей (страница {page + 1}):{status_text}"
-        )
-
-        current_message = callback.message
-        # Преобразуем клавиатуру в строку для сравнения содержимого
-        current_markup_str = str(current_message.reply_markup) if current_message.reply_markup else ""
-        new_markup_str = str(new_keyboard) if new_keyboard else ""
-        # Проверяем, изменилось ли сообщение
-        if (current_message.text != new_text or current_markup_str != new_markup_str):
-            await current_message.edit_text(
-                new_text,
-                reply_markup=new_keyboard,
-            )
-            logger.info("Message updated with new status.")
-        else:
-            logger.info("Message not modified, skipping edit_text.")
+    registrations_page = await child_reg_crud.get_registrations_page(
+        session,
+        cursor=data.get("list_cursor"),
+        backward=data.get("list_backward", False),
+        limit=PER_PAGE,
+    )
+    new_keyboard = get_child_registrations_list_keyboard(
+        registrations_page.items,
+        page,
+        prev_cursor=registrations_page.prev_cursor if registrations_page.has_prev else None,
+        next_cursor=registrations_page.next_cursor if registrations_page.has_next else None,
+    )
+    # Добавляем информацию о последней измененной записи в текст
+    last_updated_reg = next((reg for reg in registrations_page.items if reg.id == reg_id), None)
+    status_text = f" (Последняя запись: {last_updated_reg.child_name} [{last_updated_reg.status}]" if last_updated_reg else ""
+    new_text = (
+        f"Управление зарегистрированными детьми.\n\n"
+        f"Список детей (страница {page + 1}):{status_text}"
+    )
 
-    await callback.answer()
+    current_message = callback.message
+    # Преобразуем клавиатуру в строку для сравнения содержимого
+    current_markup_str = str(current_message.reply_markup) if current_message.reply_markup else ""
+    new_markup_str = str(new_keyboard) if new_keyboard else ""
+    # Проверяем, изменилось ли сообщение
+    if (current_message.text != new_text or current_markup_str != new_markup_str):
+        await current_message.edit_text(
+            new_text,
+            reply_markup=new_keyboard,
+        )
+        logger.info("Message updated with new status.")
+    else:
+        logger.info("Message not modified, skipping edit_text.")
 
 
-@admin_router.callback_query(F.data == "event_list_admin")
-async def show_events_list(
+async def show_events_page(
     callback: types.CallbackQuery,
     state: FSMContext,
     session: AsyncSession,
+    page: int = 0,
+    cursor: Optional[str] = None,
+    backward: bool = False,
 ) -> None:
-    """Обрабатывает отображение списка мероприятий."""
-    data = await state.get_data()
-    page = data.get("current_page", 0)
-    per_page = 5
-
-    async with get_async_session() as session:
-        events = await events_crud.get_all_events(
-            session,
-            offset=page * per_page,
-            limit=per_page
-        )
-        total_events = await events_crud.get_events_count(session)
-
+    """Отображает страницу списка мероприятий по курсору."""
+    events_page = await events_crud.get_events_page(
+        session, cursor=cursor, backward=backward, limit=PER_PAGE,
+    )
     keyboard = get_events_list_keyboard(
-        events,
+        events_page.items,
         page,
-        total_events,
-        per_page
+        prev_cursor=events_page.prev_cursor if events_page.has_prev else None,
+        next_cursor=events_page.next_cursor if events_page.has_next else None,
     )
 
     await state.update_data(
         current_menu="event_list_admin",
-        current_page=page
+        current_page=page,
+        list_cursor=cursor,
+        list_backward=backward,
     )
     await callback.message.edit_text(
         ("Управление мероприятиями.\n\n"
@@ -315,6 +423,32 @@ async def show_events_list(
     await callback.answer()
 
 
+@admin_router.callback_query(F.data == "event_list_admin")
+async def show_events_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Обрабатывает отображение списка мероприятий."""
+    page, cursor, backward = await get_saved_position(state, "event_list_admin")
+    await show_events_page(callback, state, session, page, cursor, backward)
+
+
+@admin_router.callback_query(F.data.startswith(("event_prev_", "event_next_")))
+async def paginate_events_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Переключает страницу списка мероприятий."""
+    try:
+        page, cursor, backward = parse_page_callback(callback.data)
+    except ValueError:
+        await callback.answer("Неверный формат действия.", show_alert=True)
+        return
+    await show_events_page(callback, state, session, page, cursor, backward)
+
+
 @admin_router.callback_query(F.data.startswith("event_select_"))
 async def show_event_actions(
     callback: types.CallbackQuery,
@@ -324,11 +458,10 @@ async def show_event_actions(
     """Отображает действия (изменить статус/категорию, удалить) для выбранного мероприятия."""
     event_id = int(callback.data.split("_")[2])
 
-    async with get_async_session() as session:
-        event = await events_crud.get_event_by_id(session, event_id)
-        if not event:
-            await callback.answer("Мероприятие не найдено.", show_alert=True)
-            return
+    event = await events_crud.get_event_by_id(session, event_id)
+    if not event:
+        await callback.answer("Мероприятие не найдено.", show_alert=True)
+        return
 
     status = {"active": "✅", "inactive": "❌", "pending": "⏳"}.get(event.status, "⏳")
     text = f"{event.title} (ID: {event.vk_post_id}) [{status}, {event.category}]"
@@ -358,69 +491,385 @@ async def handle_event_action(
     event_id = int(parts[4] if action_type != "delete" else parts[3])
     value = parts[3] if action_type != "delete" else None
 
-    async with get_async_session() as session:
-        event = await events_crud.get_event_by_id(session, event_id)
-        if not event:
-            await callback.answer("Мероприятие не найдено.", show_alert=True)
-            return
+    event = await events_crud.get_event_by_id(session, event_id)
+    if not event:
+        await callback.answer("Мероприятие не найдено.", show_alert=True)
+        return
 
-        if action_type == "status":
-            if value in ["active", "inactive", "pending"]:
-                if await events_crud.update_event_status(session, event_id, value):
-                    await callback.answer(f"Статус изменён на {value}.")
-                else:
-                    await callback.answer("Ошибка при изменении статуса.", show_alert=True)
-            else:
-                await callback.answer("Недопустимый статус.", show_alert=True)
-        elif action_type == "category":
-            if value in ["competition", "event", "sponsor"]:
-                if await events_crud.update_event_category(session, event_id, value):
-                    await callback.answer(f"Категория изменена на {value}.")
-                else:
-                    await callback.answer("Ошибка при изменении категории.", show_alert=True)
+    if action_type == "status":
+        if value in ["active", "inactive", "pending"]:
+            if await events_crud.update_event_status(session, event_id, value):
+                await callback.answer(f"Статус изменён на {value}.")
             else:
-                await callback.answer("Недопустимая категория.", show_alert=True)
-        elif action_type == "delete":
-            if await events_crud.delete_event(session, event_id):
-                await callback.answer("Мероприятие удалено.")
+                await callback.answer("Ошибка при изменении статуса.", show_alert=True)
+        else:
+            await callback.answer("Недопустимый статус.", show_alert=True)
+    elif action_type == "category":
+        if value in ["competition", "event", "sponsor"]:
+            if await events_crud.update_event_category(session, event_id, value):
+                await callback.answer(f"Категория изменена на {value}.")
             else:
-                await callback.answer("Ошибка при удалении.", show_alert=True)
+                await callback.answer("Ошибка при изменении категории.", show_alert=True)
+        else:
+            await callback.answer("Недопустимая категория.", show_alert=True)
+    elif action_type == "delete":
+        if await events_crud.delete_event(session, event_id):
+            await callback.answer("Мероприятие удалено.")
+        else:
+            await callback.answer("Ошибка при удалении.", show_alert=True)
 
-    # Обновляем список после изменения
+    # Публичные списки затронутых категорий собираются заново сразу
+    await warm_event_lists(session, {event.category, value if action_type == "category" else None})
+
+    # Обновляем текущую страницу списка после изменения
     data = await state.get_data()
     page = data.get("current_page", 0)
-    per_page = 5
-    async with get_async_session() as session:
-        events = await events_crud.get_all_events(
-            session,
-            offset=page * per_page,
-            limit=per_page
+    events_page = await events_crud.get_events_page(
+        session,
+        cursor=data.get("list_cursor"),
+        backward=data.get("list_backward", False),
+        limit=PER_PAGE,
+    )
+    new_keyboard = get_events_list_keyboard(
+        events_page.items,
+        page,
+        prev_cursor=events_page.prev_cursor if events_page.has_prev else None,
+        next_cursor=events_page.next_cursor if events_page.has_next else None,
+    )
+    last_updated_event = next((evt for evt in events_page.items if evt.id == event_id), None)
+    status_text = (f" (Последнее: {last_updated_event.title} [{last_updated_event.status}, {last_updated_event.category}])" 
+                   if last_updated_event else "")
+    new_text = (
+        f"Управление мероприятиями.\n\n"
+        f"Список мероприятий (страница {page + 1}):{status_text}"
+    )
+
+    current_message = callback.message
+    current_markup_str = str(current_message.reply_markup) if current_message.reply_markup else ""
+    new_markup_str = str(new_keyboard) if new_keyboard else ""
+    if current_message.text != new_text or current_markup_str != new_markup_str:
+        await current_message.edit_text(
+            new_text,
+            reply_markup=new_keyboard,
         )
-        total_events = await events_crud.get_events_count(session)
-        new_keyboard = get_events_list_keyboard(
-            events,
-            page,
-            total_events,
-            per_page
+        logger.info(f"Event list updated after action: {action_type}={value or 'delete'} on event_id={event_id}")
+    else:
+        logger.info("Event list not modified, skipping edit_text.")
+
+    await callback.answer()
+
+
+# region Рассылка
+
+def get_broadcast_progress_keyboard(broadcast_id: int) -> types.InlineKeyboardMarkup:
+    return get_inline_keyboard(
+        ("Обновить", f"admin_broadcast_status_{broadcast_id}"),
+        ("Остановить", f"admin_broadcast_stop_{broadcast_id}"),
+        ("Меню администратора", "admin"),
+        sizes=(2, 1),
+    )
+
+
+@admin_router.callback_query(F.data == "admin_broadcast")
+async def start_broadcast(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+) -> None:
+    """Запрашивает текст рассылки."""
+    await state.set_state(StartState.BROADCAST_TEXT)
+    await callback.message.edit_text(
+        "Отправьте текст рассылки одним сообщением (форматирование сохранится).",
+        reply_markup=get_inline_keyboard(("Отмена", "admin"), sizes=(1,)),
+    )
+    await callback.answer()
+
+
+@admin_router.message(StartState.BROADCAST_TEXT)
+async def preview_broadcast(
+    message: Message,
+    state: FSMContext,
+    is_admin: bool = False,
+) -> None:
+    """Показывает текст рассылки и просит подтвердить отправку."""
+    if not is_admin:
+        await state.clear()
+        return
+    if not message.text:
+        await message.answer("Рассылка поддерживает только текст. Отправьте текстовое сообщение.")
+        return
+    await state.update_data(broadcast_text=message.html_text)
+    await message.answer(message.html_text)
+    await message.answer(
+        "Отправить это сообщение всем пользователям бота?",
+        reply_markup=get_inline_keyboard(
+            ("Отправить", "admin_broadcast_confirm"),
+            ("Отмена", "admin"),
+            sizes=(2,),
+        ),
+    )
+
+
+@admin_router.callback_query(F.data == "admin_broadcast_confirm")
+async def confirm_broadcast(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    broadcasts: BroadcastManager,
+) -> None:
+    """Создает рассылку и запускает ее в фоне."""
+    text = (await state.get_data()).get("broadcast_text")
+    if not text:
+        await callback.answer("Текст рассылки не найден, начните заново.", show_alert=True)
+        return
+    await state.update_data(broadcast_text=None)
+    await state.set_state(StartState.START_ADMIN)
+
+    broadcast_id = await broadcasts.create(text, created_by=callback.from_user.id)
+    broadcasts.start(broadcast_id)
+    progress = await broadcasts.get_progress(broadcast_id)
+    await callback.message.edit_text(
+        f"Рассылка #{broadcast_id} запущена.\n{format_progress(progress)}",
+        reply_markup=get_broadcast_progress_keyboard(broadcast_id),
+    )
+    await callback.answer()
+
+
+@admin_router.callback_query(F.data.regexp(r"^admin_broadcast_(status|stop)_\d+$"))
+async def handle_broadcast_action(
+    callback: types.CallbackQuery,
+    broadcasts: BroadcastManager,
+) -> None:
+    """Показывает ход рассылки или останавливает ее."""
+    _, _, action, broadcast_id = callback.data.split("_")
+    broadcast_id = int(broadcast_id)
+    # Telegram принимает только один ответ на callback
+    notice, alert = None, False
+    if action == "stop":
+        if await broadcasts.cancel(broadcast_id):
+            notice = "Рассылка остановится после текущей порции."
+        else:
+            notice, alert = "Рассылка уже завершена.", True
+
+    progress = await broadcasts.get_progress(broadcast_id)
+    if progress is None:
+        await callback.answer("Рассылка не найдена.", show_alert=True)
+        return
+    status = {
+        "pending": "ожидает запуска",
+        "running": "идет",
+        "done": "завершена",
+        "cancelled": "остановлена",
+    }.get(progress.status, progress.status)
+    text = f"Рассылка #{broadcast_id}: {status}.\n{format_progress(progress)}"
+    if callback.message.text != text:
+        await callback.message.edit_text(
+            text,
+            reply_markup=None if progress.finished else get_broadcast_progress_keyboard(broadcast_id),
         )
-        last_updated_event = next((evt for evt in events if evt.id == event_id), None)
-        status_text = (f" (Последнее: {last_updated_event.title} [{last_updated_event.status}, {last_updated_event.category}])" 
-                       if last_updated_event else "")
-        new_text = (
-            f"Управление мероприятиями.\n\n"
-            f"Список мероприятий (страница {page + 1}):{status_text}"
+    await callback.answer(notice, show_alert=alert)
+
+# endregion
+
+
+# region Выгрузка регистраций
+
+@admin_router.callback_query(F.data == "admin_export")
+async def start_export(
+    callback: types.CallbackQuery,
+) -> None:
+    """Предлагает выбрать статус регистраций для выгрузки."""
+    await callback.message.edit_text(
+        "Выгрузка регистраций детей. Какие заявки выгрузить?",
+        reply_markup=get_inline_keyboard(
+            ("Все", "admin_export_status_all"),
+            *((label, f"admin_export_status_{status}") for status, label in STATUS_LABELS.items()),
+            ("Меню администратора", "admin"),
+            sizes=(2, 2, 1),
+        ),
+    )
+    await callback.answer()
+
+
+@admin_router.callback_query(F.data.regexp(r"^admin_export_status_(all|pending|approved|rejected)$"))
+async def choose_export_period(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+) -> None:
+    """Запоминает статус и предлагает период и формат файла."""
+    status = callback.data.rsplit("_", 1)[1]
+    await state.update_data(export_status=None if status == "all" else status)
+    buttons = [
+        (f"{label}, {fmt.upper()}", f"admin_export_file_{period}_{fmt}")
+        for period, label in EXPORT_PERIODS.items()
+        for fmt in ("csv", "xlsx")
+    ]
+    await callback.message.edit_text(
+        "За какой период и в каком формате?",
+        reply_markup=get_inline_keyboard(
+            *buttons,
+            ("Назад", "admin_export"),
+            sizes=(2, 2, 2, 1),
+        ),
+    )
+    await callback.answer()
+
+
+@admin_router.callback_query(F.data.regexp(r"^admin_export_file_(month|season|all)_(csv|xlsx)$"))
+async def send_export(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Отправляет выгрузку документом.
+
+    Строки читаются курсором и пишутся во временный файл, который
+    отправляется с диска и удаляется.
+    """
+    _, _, _, period, fmt = callback.data.split("_")
+    status = (await state.get_data()).get("export_status")
+    date_from, date_to = period_range(period)
+    await callback.answer("Готовлю файл...")
+
+    path = temp_export_path(fmt)
+    try:
+        rows = child_reg_crud.stream_export_rows(session, status, date_from, date_to)
+        count = await write_export(rows, fmt, path)
+        if not count:
+            await callback.message.answer("Регистраций по выбранным условиям нет.")
+            return
+        await callback.message.answer_document(
+            FSInputFile(path, filename=export_filename(fmt, status, date_from, date_to)),
+            caption=f"Регистраций: {count}",
         )
+        logger.info(f"Admin {callback.from_user.id} exported {count} registrations ({fmt})")
+    finally:
+        os.unlink(path)
 
-        current_message = callback.message
-        current_markup_str = str(current_message.reply_markup) if current_message.reply_markup else ""
-        new_markup_str = str(new_keyboard) if new_keyboard else ""
-        if current_message.text != new_text or current_markup_str != new_markup_str:
-            await current_message.edit_text(
-                new_text,
-                reply_markup=new_keyboard,
-            )
-            logger.info(f"Event list updated after action: {action_type}={value or 'delete'} on event_id={event_id}")
-        else:
-            logger.info("Event list not modified, skipping edit_text.")
+# endregion
+
+
+# region Массовая обработка заявок
+
+async def show_bulk_page(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    page: int = 0,
+    cursor: Optional[str] = None,
+    backward: bool = False,
+) -> None:
+    """Отображает страницу заявок на рассмотрении с отметками выбора."""
+    pending_page = await child_reg_crud.get_pending_page(
+        session, cursor=cursor, backward=backward, limit=BULK_PER_PAGE,
+    )
+    if not pending_page.items and cursor:
+        # Все заявки страницы рассмотрены: возвращаемся к началу очереди
+        page, cursor, backward = 0, None, False
+        pending_page = await child_reg_crud.get_pending_page(session, limit=BULK_PER_PAGE)
+
+    data = await state.get_data()
+    selected = set(data.get("bulk_selected", []))
+    keyboard = get_bulk_registrations_keyboard(
+        pending_page.items,
+        selected,
+        page,
+        prev_cursor=pending_page.prev_cursor if pending_page.has_prev else None,
+        next_cursor=pending_page.next_cursor if pending_page.has_next else None,
+    )
+    await state.update_data(
+        current_menu="admin_bulk",
+        current_page=page,
+        list_cursor=cursor,
+        list_backward=backward,
+    )
+    text = (
+        f"Заявки на рассмотрении (страница {page + 1}).\n"
+        "Отметьте заявки и выберите действие; выбор сохраняется между страницами."
+        if pending_page.items else "Заявок на рассмотрении нет."
+    )
+    await callback.message.edit_text(text, reply_markup=keyboard)
 
+
+@admin_router.callback_query(F.data == "admin_bulk")
+async def show_bulk_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Открывает массовую обработку заявок."""
+    page, cursor, backward = await get_saved_position(state, "admin_bulk")
+    await show_bulk_page(callback, state, session, page, cursor, backward)
     await callback.answer()
+
+
+@admin_router.callback_query(F.data.startswith(("admin_bulk_prev_", "admin_bulk_next_")))
+async def paginate_bulk_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Переключает страницу массовой обработки."""
+    try:
+        page, cursor, backward = parse_page_callback(callback.data)
+    except ValueError:
+        await callback.answer("Неверный формат действия.", show_alert=True)
+        return
+    await show_bulk_page(callback, state, session, page, cursor, backward)
+    await callback.answer()
+
+
+@admin_router.callback_query(F.data.regexp(r"^admin_bulk_toggle_\d+$") | F.data.in_({"admin_bulk_page", "admin_bulk_clear"}))
+async def change_bulk_selection(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+) -> None:
+    """Меняет выбор заявок, обновляя показанную клавиатуру без запроса к базе."""
+    selected = set((await state.get_data()).get("bulk_selected", []))
+    if callback.data == "admin_bulk_clear":
+        selected.clear()
+    elif callback.data == "admin_bulk_page":
+        page_ids = set(bulk_page_ids(callback.message.reply_markup))
+        # Повторное нажатие снимает выбор со страницы
+        selected = selected - page_ids if page_ids <= selected else selected | page_ids
+    else:
+        selected ^= {int(callback.data.rsplit("_", 1)[1])}
+    await state.update_data(bulk_selected=sorted(selected))
+
+    keyboard = refresh_bulk_keyboard(callback.message.reply_markup, selected)
+    if keyboard != callback.message.reply_markup:
+        await callback.message.edit_reply_markup(reply_markup=keyboard)
+    await callback.answer(f"Выбрано: {len(selected)}")
+
+
+@admin_router.callback_query(F.data.in_({"admin_bulk_approve", "admin_bulk_reject"}))
+async def handle_bulk_action(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    notifications: NotificationQueue,
+) -> None:
+    """Утверждает или отклоняет выбранные заявки одним запросом.
+
+    Уведомления родителям отправляются в фоне через очередь, поэтому ответ
+    админу не ждет сотен сообщений.
+    """
+    selected = (await state.get_data()).get("bulk_selected", [])
+    if not selected:
+        await callback.answer("Не выбрано ни одной заявки.", show_alert=True)
+        return
+
+    status = "approved" if callback.data == "admin_bulk_approve" else "rejected"
+    updated = await child_reg_crud.set_statuses(session, selected, status)
+    await state.update_data(bulk_selected=[])
+    notify_parents(notifications, updated, status)
+    logger.info(f"Admin {callback.from_user.id} set status {status} for {len(updated)} registrations")
+
+    verdict = "Утверждено" if status == "approved" else "Отклонено"
+    skipped = len(selected) - len(updated)
+    await callback.answer(
+        f"{verdict}: {len(updated)}." + (f" Уже рассмотрены ранее: {skipped}." if skipped else ""),
+        show_alert=bool(skipped),
+    )
+    page, cursor, backward = await get_saved_position(state, "admin_bulk")
+    await show_bulk_page(callback, state, session, page, cursor, backward)
+
+# endregion
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -7,8 +9,8 @@ from services.models import User, Event
 def get_child_registrations_list_keyboard(
     registrations,
     page: int,
-    total: int,
-    per_page: int
+    prev_cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None,
 ) -> InlineKeyboardMarkup:
     """Создает клавиатуру для списка зарегистрированных детей с выбором."""
     builder = InlineKeyboardBuilder()
@@ -21,16 +23,20 @@ def get_child_registrations_list_keyboard(
                 callback_data=f"child_select_{reg.id}",
             )
         )
-    if page > 0:
+    if prev_cursor:
         builder.row(InlineKeyboardButton(
             text="⬅️ Предыдущая",
-            callback_data="child_reg_prev"
+            callback_data=f"child_reg_prev_{page - 1}_{prev_cursor}"
         ))
-    if (page + 1) * per_page < total:
+    if next_cursor:
         builder.row(InlineKeyboardButton(
             text="➡️ Следующая",
-            callback_data="child_reg_next"
+            callback_data=f"child_reg_next_{page + 1}_{next_cursor}"
         ))
+    builder.row(InlineKeyboardButton(
+        text="Массовая обработка заявок",
+        callback_data="admin_bulk"
+    ))
     builder.row(InlineKeyboardButton(
         text="⬅️ Назад",
         callback_data="admin"
@@ -38,6 +44,92 @@ def get_child_registrations_list_keyboard(
     return builder.as_markup()
 
 
+BULK_SELECTED = "☑️"
+BULK_NOT_SELECTED = "⬜️"
+BULK_ACTIONS = {
+    "admin_bulk_approve": "✅ Утвердить",
+    "admin_bulk_reject": "❌ Отклонить",
+}
+
+
+def bulk_action_text(callback_data: str, selected_count: int) -> str:
+    return f"{BULK_ACTIONS[callback_data]} ({selected_count})"
+
+
+def get_bulk_registrations_keyboard(
+    registrations,
+    selected: set[int],
+    page: int,
+    prev_cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None,
+) -> InlineKeyboardMarkup:
+    """Создает клавиатуру выбора заявок на рассмотрении для массовой обработки."""
+    builder = InlineKeyboardBuilder()
+    for reg in registrations:
+        mark = BULK_SELECTED if reg.id in selected else BULK_NOT_SELECTED
+        builder.row(InlineKeyboardButton(
+            text=f"{mark} {reg.child_name} {reg.child_surname} (Возраст: {reg.age})",
+            callback_data=f"admin_bulk_toggle_{reg.id}"
+        ))
+    navigation = []
+    if prev_cursor:
+        navigation.append(InlineKeyboardButton(
+            text="⬅️ Предыдущая",
+            callback_data=f"admin_bulk_prev_{page - 1}_{prev_cursor}"
+        ))
+    if next_cursor:
+        navigation.append(InlineKeyboardButton(
+            text="➡️ Следующая",
+            callback_data=f"admin_bulk_next_{page + 1}_{next_cursor}"
+        ))
+    if navigation:
+        builder.row(*navigation)
+    if registrations:
+        builder.row(
+            InlineKeyboardButton(text="Выбрать страницу", callback_data="admin_bulk_page"),
+            InlineKeyboardButton(text="Сбросить выбор", callback_data="admin_bulk_clear"),
+        )
+        builder.row(*(
+            InlineKeyboardButton(text=bulk_action_text(data, len(selected)), callback_data=data)
+            for data in BULK_ACTIONS
+        ))
+    builder.row(InlineKeyboardButton(
+        text="⬅️ Назад",
+        callback_data="child_registrations_list"
+    ))
+    return builder.as_markup()
+
+
+def refresh_bulk_keyboard(
+    markup: InlineKeyboardMarkup,
+    selected: set[int],
+) -> InlineKeyboardMarkup:
+    """Обновляет отметки и счетчики в уже показанной клавиатуре без запроса к базе."""
+    rows = []
+    for row in markup.inline_keyboard:
+        buttons = []
+        for button in row:
+            data = button.callback_data or ""
+            if data.startswith("admin_bulk_toggle_"):
+                mark = BULK_SELECTED if int(data.rsplit("_", 1)[1]) in selected else BULK_NOT_SELECTED
+                button = button.model_copy(update={"text": f"{mark} {button.text.split(' ', 1)[1]}"})
+            elif data in BULK_ACTIONS:
+                button = button.model_copy(update={"text": bulk_action_text(data, len(selected))})
+            buttons.append(button)
+        rows.append(buttons)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def bulk_page_ids(markup: InlineKeyboardMarkup) -> list[int]:
+    """Id заявок на показанной странице массовой обработки."""
+    return [
+        int(button.callback_data.rsplit("_", 1)[1])
+        for row in markup.inline_keyboard
+        for button in row
+        if (button.callback_data or "").startswith("admin_bulk_toggle_")
+    ]
+
+
 def get_child_actions_keyboard(
     reg_id: int,
     status: str
@@ -68,8 +160,8 @@ def get_child_actions_keyboard(
 def get_users_list_keyboard(
     users: list[User],
     page: int,
-    total_users: int,
-    per_page: int,
+    prev_cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None,
 ) -> InlineKeyboardMarkup:
     """Создает клавиатуру для списка пользователей с пагинацией."""
     builder = InlineKeyboardBuilder()
@@ -79,15 +171,15 @@ def get_users_list_keyboard(
             text=text,
             callback_data=f"user_{user.id}"
         ))
-    if page > 0:
+    if prev_cursor:
         builder.add(InlineKeyboardButton(
             text="⬅️ Предыдущая",
-            callback_data="users_prev"
+            callback_data=f"users_prev_{page - 1}_{prev_cursor}"
         ))
-    if (page + 1) * per_page < total_users:
+    if next_cursor:
         builder.add(InlineKeyboardButton(
             text="➡️ Следующая",
-            callback_data="users_next"
+            callback_data=f"users_next_{page + 1}_{next_cursor}"
         ))
     builder.add(InlineKeyboardButton(
         text="⬅️ Назад",
@@ -99,8 +191,8 @@ def get_users_list_keyboard(
 def get_events_list_keyboard(
     events: list[Event],
     page: int,
-    total_events: int,
-    per_page: int
+    prev_cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None,
 ) -> InlineKeyboardMarkup:
     """Создает клавиатуру для списка мероприятий с выбором."""
     builder = InlineKeyboardBuilder()
@@ -113,15 +205,15 @@ def get_events_list_keyboard(
                 callback_data=f"event_select_{event.id}"
             )
         )
-    if page > 0:
+    if prev_cursor:
         builder.row(InlineKeyboardButton(
             text="⬅️ Предыдущая",
-            callback_data="event_prev"
+            callback_data=f"event_prev_{page - 1}_{prev_cursor}"
         ))
-    if (page + 1) * per_page < total_events:
+    if next_cursor:
         builder.row(InlineKeyboardButton(
             text="➡️ Следующая",
-            callback_data="event_next"
+            callback_data=f"event_next_{page + 1}_{next_cursor}"
         ))
     builder.row(InlineKeyboardButton(
         text="⬅️ Назад",
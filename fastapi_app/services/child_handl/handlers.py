@@ -6,12 +6,13 @@ from aiogram import F, Router, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import ReplyKeyboardRemove
-from sqlalchemy import select, func
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.db import get_async_session
+from core.user_cache import CachedUser
 from bot.keyboards import get_main_menu_keyboard
-from services.models import ChildRegistration, User
+from crud.child_registrations import child_reg_crud
+from services.models import User
 
 child_router = Router()
 
@@ -40,7 +41,7 @@ async def process_child_name(
     state: FSMContext,
 ) -> None:
     """Обработать имя ребенка и запросить фамилию."""
-    await state.update_data(child_name=message.text)
+    await state.update_data(child_name=message.text.strip())
     await state.set_state(ChildRegState.CHILD_SURNAME)
     await message.answer("Введите фамилию ребенка:")
 
@@ -51,7 +52,7 @@ async def process_child_surname(
     state: FSMContext,
 ) -> None:
     """Обработать фамилию ребенка и запросить возраст."""
-    await state.update_data(child_surname=message.text)
+    await state.update_data(child_surname=message.text.strip())
     await state.set_state(ChildRegState.AGE)
     await message.answer("Введите возраст ребенка:")
 
@@ -73,19 +74,24 @@ async def process_age(
         await message.answer(f"Ошибка: {e}. Пожалуйста, введите корректный возраст.")
 
 
-@child_router.message(ChildRegState.PARENT_CONTACT)
+# Флаг idempotent: повторная доставка того же обновления не обрабатывается
+@child_router.message(ChildRegState.PARENT_CONTACT, flags={"idempotent": True})
 async def process_parent_contact(
     message: types.Message,
     state: FSMContext,
     session: AsyncSession,
+    user: Optional[CachedUser] = None,
+    is_admin: bool = False,
 ) -> None:
-    """Завершить регистрацию ребенка и вернуть в главное меню."""
+    """Завершить регистрацию ребенка и вернуть в главное меню.
+
+    Повторная заявка на того же ребенка (имя, фамилия, возраст) не
+    создается: вставка идет через ON CONFLICT DO NOTHING.
+    """
     data = await state.get_data()
     user_id = message.from_user.id
 
-    # Проверка или создание пользователя
-    result = await session.execute(select(User).where(User.telegram_id == user_id))
-    user = result.scalar_one_or_none()
+    # Пользователь уже получен RoleMiddleware, создаем только нового
     if not user:
         user = User(
             telegram_id=user_id,
@@ -95,21 +101,18 @@ async def process_parent_contact(
         session.add(user)
         await session.flush()  # Получаем ID пользователя
 
-    is_admin = user.admin_role is not None
     main_menu_kb = get_main_menu_keyboard(is_admin=is_admin)
 
     # Сохранение регистрации ребенка
-    child_reg = ChildRegistration(
-        user_id=user.id,
-        child_name=data["child_name"],
-        child_surname=data["child_surname"],
-        age=data["age"],
-        parent_contact=message.text,
-        status="pending",
-        created_at=func.now(),
-    )
-    session.add(child_reg)
     try:
+        reg_id = await child_reg_crud.create_registration_if_absent(
+            session,
+            user_id=user.id,
+            child_name=data["child_name"],
+            child_surname=data["child_surname"],
+            age=data["age"],
+            parent_contact=message.text,
+        )
         await session.commit()
     except Exception as e:
         await session.rollback()
@@ -118,6 +121,8 @@ async def process_parent_contact(
 
     await state.clear()
     await message.answer(
-        "Регистрация ребенка успешно завершена!",
+        "Регистрация ребенка успешно завершена!"
+        if reg_id is not None
+        else "Этот ребенок уже зарегистрирован, повторная заявка не нужна.",
         reply_markup=main_menu_kb,
     )
@@ -1,18 +1,21 @@
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from aiogram import Router, F, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, InputMediaPhoto
+from aiogram.types import CallbackQuery
+from aiogram.utils.formatting import Bold, Text
 from sqlalchemy.ext.asyncio import AsyncSession
 from enum import Enum
 
-from core.db import get_async_session
-from services.event_handl.keyboards import build_event_list_keyboard
+from bot.media import CAPTION_LIMIT, event_photo_sources, event_photo_urls, remember_file_ids, send_photos
+from crud.base import KeysetPage
+from core.user_cache import CachedUser
+from services.event_handl.render import EVENTS_PER_PAGE, RenderedEventList, render_event_list
 from bot.keyboards import get_main_menu_keyboard
-from services.models import Event, User
+from services.models import Event
 from crud.events import events_crud
-from crud.users import CRUDUsers
 
 # Настройка логирования
 logging.basicConfig(
@@ -23,8 +26,11 @@ logger = logging.getLogger(__name__)
 
 event_router = Router()
 
-# Инициализация CRUD-объектов
-users_crud = CRUDUsers(User)
+# Inline-поиск: результатов на страницу, длина описания и кэш на стороне Telegram
+INLINE_RESULTS_LIMIT = 20
+INLINE_DESCRIPTION_LENGTH = 100
+INLINE_CACHE_TIME = 60
+MESSAGE_LIMIT = 4096
 
 class EventCategory(Enum):
     COMPETITION = "competition"
@@ -32,76 +38,117 @@ class EventCategory(Enum):
     SPONSOR = "sponsor"
 
 class EventState(StatesGroup):
-    """Состояния FSM для работы с событиями"""
+    """Состояния FSM для работы с событиями.
+
+    Позиция в списке хранится в данных FSM: category, current_page,
+    list_cursor, list_backward и media_message_ids.
+    """
     START_EVENT = State()      # Состояние просмотра списка событий
     DETAILS_EVENT = State()    # Состояние просмотра деталей события
-    current_page = State()     # Текущая страница пагинации
-    total_pages = State()      # Всего страниц
-    message_id = State()       # ID последнего сообщения
-    selected_event_id = State()# ID просматриваемого события
-    category = State()         # Категория событий
 
 # region Основные обработчики
 
 
 @event_router.callback_query(F.data == 'competition')
-async def handle_competitions(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def handle_competitions(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
     """Обработчик кнопки 'Соревнования'"""
     await state.set_state(EventState.START_EVENT)
-    await state.update_data(category=EventCategory.COMPETITION.value)
-    await show_event_list(callback, state, page=1, category=EventCategory.COMPETITION.value)
+    await show_event_list(callback, state, session, page=1, category=EventCategory.COMPETITION.value)
 
 
 @event_router.callback_query(F.data == 'event')
-async def handle_events(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def handle_events(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
     """Обработчик кнопки 'Мероприятия'"""
     await state.set_state(EventState.START_EVENT)
-    await state.update_data(category=EventCategory.EVENT.value)
-    await show_event_list(callback, state, page=1, category=EventCategory.EVENT.value)
+    await show_event_list(callback, state, session, page=1, category=EventCategory.EVENT.value)
 
 
 @event_router.callback_query(F.data == 'sponsor')
-async def handle_sponsors(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def handle_sponsors(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
     """Обработчик кнопки 'Спонсоры'"""
     await state.set_state(EventState.START_EVENT)
-    await state.update_data(category=EventCategory.SPONSOR.value)
-    await show_event_list(callback, state, page=1, category=EventCategory.SPONSOR.value)
+    await show_event_list(callback, state, session, page=1, category=EventCategory.SPONSOR.value)
 
 
 @event_router.callback_query(F.data.startswith('page_'))
-async def handle_pagination(callback: types.CallbackQuery, state: FSMContext) -> None:
-    """Обработчик пагинации"""
+async def handle_pagination(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    """Обработчик пагинации (page_{N}_{n|p}_{cursor})"""
     try:
-        page = int(callback.data.split('_')[1])
+        parts = callback.data.split('_')
+        page = int(parts[1])
+        cursor = parts[3] if len(parts) > 3 else None
+        backward = len(parts) > 2 and parts[2] == 'p'
         state_data = await state.get_data()
         category = state_data.get('category', EventCategory.COMPETITION.value)
-        await show_event_list(callback, state, page, category=category)
+        await show_event_list(
+            callback, state, session, page, category=category,
+            cursor=cursor, backward=backward,
+        )
     except (ValueError, IndexError) as e:
         logger.error(f"Ошибка пагинации: {e}")
         await callback.answer("Ошибка обработки страницы.", show_alert=True)
 
 
 @event_router.callback_query(F.data.startswith('/details_'))
-async def handle_details(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def handle_details(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
     """Обработчик просмотра деталей события"""
     try:
         event_id = int(callback.data.split('_')[1])
         await state.set_state(EventState.DETAILS_EVENT)
-        await show_event_details(callback, state, event_id)
+        await show_event_details(callback, state, session, event_id)
     except (ValueError, IndexError) as e:
         logger.error(f"Ошибка загрузки деталей: {e}")
         await callback.answer("Ошибка обработки события.", show_alert=True)
 
 
 @event_router.callback_query(F.data.startswith('back_to_list_'))
-async def handle_back_to_list(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def handle_back_to_list(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
     """Обработчик возврата к списку событий"""
     try:
         page = int(callback.data.split('_')[-1])
         state_data = await state.get_data()
         category = state_data.get('category', EventCategory.COMPETITION.value)
         await state.set_state(EventState.START_EVENT)
-        await show_event_list(callback, state, page, category=category)
+        media_message_ids = state_data.get('media_message_ids') or []
+        await state.update_data(media_message_ids=None)
+
+        if callback.message.photo:
+            # Пост с одним фото пришел отдельным сообщением под списком,
+            # сам список не менялся — достаточно убрать фото
+            await delete_messages(callback, media_message_ids or [callback.message.message_id])
+            await callback.answer()
+            return
+
+        await show_event_list(
+            callback, state, session, page, category=category,
+            cursor=state_data.get('list_cursor'),
+            backward=state_data.get('list_backward', False),
+        )
+        await delete_messages(callback, media_message_ids)
     except (ValueError, IndexError) as e:
         logger.error(f"Ошибка возврата: {e}")
         await callback.answer("Ошибка возврата к списку.", show_alert=True)
@@ -111,28 +158,49 @@ async def handle_back_to_list(callback: types.CallbackQuery, state: FSMContext)
 async def handle_back_to_menu(
     callback: types.CallbackQuery,
     state: FSMContext,
-    session: AsyncSession,
-    **kwargs: Any
+    user: Optional[CachedUser] = None,
+    is_admin: bool = False,
 ) -> None:
     """Обработчик возврата в главное меню"""
     try:
-        data = kwargs.get('data', {})
-        if not data.get('user'):
-            user = await users_crud.get_user_by_telegram_id(
-                session=session,
-                telegram_id=callback.from_user.id
-            )
-            if user:
-                data['user'] = user
-                data['is_admin'] = hasattr(user, 'admin_role') and user.admin_role is not None
-
-        await return_to_main_menu(callback, state, data)
+        # Пользователь и роль уже получены RoleMiddleware через кэш
+        await return_to_main_menu(callback, state, {'user': user, 'is_admin': is_admin})
         await callback.answer()
     except Exception as e:
         logger.error(f"Ошибка возврата в меню: {e}", exc_info=True)
         await callback.message.answer("Произошла ошибка. Попробуйте позже.")
         await callback.answer()
 
+
+@event_router.inline_query()
+async def handle_inline_search(
+    inline_query: types.InlineQuery,
+    session: AsyncSession,
+) -> None:
+    """Поиск мероприятий в inline-режиме (@bot запрос).
+
+    Следующая порция результатов запрашивается Telegram с offset,
+    равным курсору поиска.
+    """
+    text = inline_query.query.strip()
+    page = KeysetPage()
+    if text:
+        try:
+            page = await events_crud.search_events(
+                session,
+                text,
+                cursor=inline_query.offset or None,
+                limit=INLINE_RESULTS_LIMIT,
+            )
+        except ValueError as e:
+            logger.warning(f"Некорректный offset inline-запроса {inline_query.offset!r}: {e}")
+
+    await inline_query.answer(
+        [build_inline_result(event) for event in page.items],
+        cache_time=INLINE_CACHE_TIME,
+        next_offset=page.next_cursor if page.has_next else "",
+    )
+
 # endregion
 
 # region Вспомогательные функции
@@ -140,74 +208,65 @@ async def handle_back_to_menu(
 async def show_event_list(
     callback: types.CallbackQuery,
     state: FSMContext,
+    session: AsyncSession,
     page: int,
     category: str,
-    events_per_page: int = 5
+    events_per_page: int = EVENTS_PER_PAGE,
+    cursor: Optional[str] = None,
+    backward: bool = False,
 ):
-    """Отображает список событий с пагинацией для указанной категории"""
-    async with get_async_session() as session:
-        try:
-            if category not in [c.value for c in EventCategory]:
-                logger.error(f"Invalid category provided: {category}")
-                await callback.answer("Недопустимая категория.", show_alert=True)
-                return
-
-            # Получаем общее количество событий для категории
-            total_events = await events_crud.get_events_count(
-                session=session,
-                category=category,
-                status="active"
-            )
-            if not total_events:
-                await callback.answer(f"Нет активных {category}.", show_alert=True)
-                return
-
-            # Вычисляем параметры пагинации
-            total_pages = calculate_total_pages(total_events, events_per_page)
-            page = normalize_page_number(page, total_pages)
-            
-            # Получаем события для страницы
-            current_events = await events_crud.get_all_events(
-                session=session,
-                offset=(page - 1) * events_per_page,
-                limit=events_per_page,
-                category=category,
-                status="active"
-            )
+    """Отображает список событий с keyset-пагинацией для указанной категории.
 
-            # Формируем и отправляем сообщение
-            await send_event_list_message(
-                callback, state, current_events, page, total_pages, category
-            )
+    Страница берется из кэша отрисованных списков, при промахе
+    собирается из базы, и показывается в том же сообщении.
+    """
+    try:
+        if category not in [c.value for c in EventCategory]:
+            logger.error(f"Invalid category provided: {category}")
+            await callback.answer("Недопустимая категория.", show_alert=True)
+            return
 
-        except Exception as e:
-            logger.error(f"Ошибка показа списка для категории {category}: {e}", exc_info=True)
-            await callback.answer("Ошибка загрузки данных.", show_alert=True)
+        rendered = await render_event_list(
+            session, category, page, cursor=cursor, backward=backward, per_page=events_per_page,
+        )
+        if rendered is None:
+            await callback.answer(f"Нет активных {category}.", show_alert=True)
+            return
+
+        await send_event_list_message(callback, rendered)
+        await state.update_data(
+            category=category,
+            current_page=rendered.page,
+            list_cursor=rendered.cursor,
+            list_backward=rendered.backward,
+        )
+
+    except Exception as e:
+        logger.error(f"Ошибка показа списка для категории {category}: {e}", exc_info=True)
+        await callback.answer("Ошибка загрузки данных.", show_alert=True)
 
 
 async def show_event_details(
     callback: types.CallbackQuery,
     state: FSMContext,
+    session: AsyncSession,
     event_id: int
 ):
     """Отображает детали события"""
-    async with get_async_session() as session:
-        try:
-            event = await events_crud.get_event_by_id(session, event_id)
-            if not event:
-                await callback.answer("Событие не найдено.", show_alert=True)
-                return
-
-            # Отправляем контент события
-            await send_event_content(callback, event)
+    try:
+        event = await events_crud.get_event_by_id(session, event_id)
+        if not event:
+            await callback.answer("Событие не найдено.", show_alert=True)
+            return
 
-            # Сохраняем состояние и отправляем клавиатуру
-            await save_event_view_state(state, event_id)
-            await send_back_button(callback, state)
+        state_data = await state.get_data()
+        back_keyboard = build_back_to_list_keyboard(state_data.get('current_page', 1))
+        media_message_ids = await send_event_content(callback, session, event, back_keyboard)
+        await state.update_data(media_message_ids=media_message_ids)
 
-        except Exception as e:
-            logger.error(f"Ошибка показа деталей: {e}", exc_info=True)
-            await callback.answer("Ошибка загрузки данных.", show_alert=True)
+    except Exception as e:
+        logger.error(f"Ошибка показа деталей: {e}", exc_info=True)
+        await callback.answer("Ошибка загрузки данных.", show_alert=True)
 
 
 async def return_to_main_menu(
@@ -231,130 +290,135 @@ async def return_to_main_menu(
 
         logger.debug(f"Возврат в меню для пользователя {user.id}, is_admin={is_admin}")
         
-        await callback.message.answer(
+        await edit_or_answer(
+            callback,
             f"Привет, {user.name if user else 'пользователь'}! Добро пожаловать!",
             reply_markup=get_main_menu_keyboard(is_admin=is_admin)
         )
-        
-        try:
-            await callback.message.delete()
-        except Exception as delete_error:
-            logger.warning(f"Не удалось удалить сообщение: {delete_error}")
-            
+
     except Exception as e:
         logger.error(f"Ошибка возврата в меню: {e}", exc_info=True)
         raise
 
-# endregion
-
-# region Вспомогательные функции
 
-def calculate_total_pages(total_items: int, per_page: int) -> int:
-    """Вычисляет общее количество страниц"""
-    return max(1, (total_items + per_page - 1) // per_page)
+def build_inline_result(event: Event) -> types.InlineQueryResultArticle:
+    """Результат inline-поиска: заголовок, начало текста и пост целиком при выборе."""
+    footer = f"\n\nДата: {event.listed_at.strftime('%Y-%m-%d')}" if event.listed_at else ""
+    # Разметка передается entities, поэтому текст поста не нужно экранировать
+    content_limit = MESSAGE_LIMIT - len(event.title) - len(footer) - 4
+    content = event.content if len(event.content) <= content_limit else event.content[:content_limit] + "..."
+    urls = event_photo_urls(event)
+    return types.InlineQueryResultArticle(
+        id=str(event.id),
+        title=event.title,
+        description=event.content[:INLINE_DESCRIPTION_LENGTH],
+        thumbnail_url=urls[0] if urls else None,
+        input_message_content=types.InputTextMessageContent(
+            **Text(Bold(event.title), "\n", content, footer).as_kwargs(text_key="message_text"),
+        ),
+    )
 
 
-def normalize_page_number(page: int, total_pages: int) -> int:
-    """Нормализует номер страницы"""
-    return max(1, min(page, total_pages))
+async def edit_or_answer(
+    callback: types.CallbackQuery,
+    text: str,
+    **kwargs: Any,
+) -> types.Message:
+    """Показывает текст в том же сообщении, а если его нельзя
+    отредактировать (фото, слишком старое) — отправляет новое."""
+    if callback.message.text:
+        try:
+            result = await callback.message.edit_text(text, **kwargs)
+            return result if isinstance(result, types.Message) else callback.message
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return callback.message
+            logger.warning(f"Не удалось отредактировать сообщение: {e}")
+    return await callback.message.answer(text, **kwargs)
+
+
+async def delete_messages(callback: types.CallbackQuery, message_ids: list[int]) -> None:
+    """Удаляет служебные сообщения (фото поста) одним запросом."""
+    if not message_ids:
+        return
+    try:
+        await callback.bot.delete_messages(callback.message.chat.id, message_ids)
+    except TelegramBadRequest as e:
+        logger.warning(f"Не удалось удалить сообщения: {e}")
 
 
 async def send_event_list_message(
     callback: types.CallbackQuery,
-    state: FSMContext,
-    events: list[Event],
-    page: int,
-    total_pages: int,
-    category: str
+    rendered: RenderedEventList,
 ) -> None:
-    """Формирует и отправляет сообщение со списком событий."""
-    category_titles = {
-        EventCategory.COMPETITION.value: "🏆 Активные соревнования",
-        EventCategory.EVENT.value: "📅 Активные мероприятия",
-        EventCategory.SPONSOR.value: "🤝 Спонсоры"
-    }
-    max_title_length = 30
-
-    # Формируем текст сообщения
-    message_text = (
-        f"{category_titles.get(category, 'События')} (Страница {page}/{total_pages}):\n\n" +
-        "\n".join(
-            f"Пост № <b>{event.id}</b>. <b>{event.title[:max_title_length].capitalize()}"
-            f"{'...' if len(event.title) > max_title_length else ''}</b> - "
-            f"{event.published_at.strftime('%Y-%m-%d')}"
-            for event in events
-        )
-    )
-
-    # Создаем клавиатуру
-    keyboard = build_event_list_keyboard(events, page, total_pages)
-
-    # Отправляем сообщение
-    try:
-        if page == 1:
-            await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
-
-    msg = await callback.message.answer(
-        message_text,
-        reply_markup=keyboard,
+    """Показывает готовую страницу списка событий в том же сообщении."""
+    await edit_or_answer(
+        callback,
+        rendered.text,
+        reply_markup=rendered.reply_markup,
         parse_mode='HTML'
     )
 
-    # Сохраняем состояние
-    await state.update_data(
-        current_page=page,
-        total_pages=total_pages,
-        message_id=msg.message_id,
-        category=category
-    )
 
-
-async def send_event_content(callback: types.CallbackQuery, event: Event):
-    """Отправляет контент события (текст + медиа)"""
+async def send_event_content(
+    callback: types.CallbackQuery,
+    session: AsyncSession,
+    event: Event,
+    back_keyboard: types.InlineKeyboardMarkup,
+) -> list[int]:
+    """Показывает контент события (текст + медиа) с кнопкой возврата.
+
+    Текстовый пост заменяет список в том же сообщении. Одно фото
+    уходит одним сообщением с подписью и кнопкой. Для альбома (или
+    текста длиннее подписи) список заменяется текстом с кнопкой,
+    а картинки отправляются отдельно. Картинки отправляются по file_id,
+    если уже загружены в Telegram.
+
+    :return: id отправленных сообщений с картинками.
+    """
     message_text = (
         f"<b>{event.title}</b>\n"
         f"{event.content}\n\n"
-        f"Дата: {event.published_at.strftime('%Y-%m-%d')}"
+        f"Дата: {event.listed_at.strftime('%Y-%m-%d')}"
     )
 
-    if event.images and isinstance(event.images, list) and event.images:
+    media_message_ids: list[int] = []
+    sources, cached = event_photo_sources(event)
+    if sources:
+        # Длинный текст не помещается в подпись и остается в сообщении списка
+        caption = message_text if len(message_text) <= CAPTION_LIMIT else None
+        single = len(sources) == 1 and caption is not None
         try:
-            await callback.message.answer_photo(
-                photo=event.images[0],
-                caption=message_text,
-                parse_mode='HTML'
+            messages = await send_photos(
+                callback.bot,
+                callback.message.chat.id,
+                sources,
+                caption=caption,
+                parse_mode='HTML',
+                **({'reply_markup': back_keyboard} if single else {}),
             )
-            return
         except Exception as e:
             logger.error(f"Ошибка отправки фото: {e}")
-
-    await callback.message.answer(message_text, parse_mode='HTML')
-
-
-async def send_back_button(callback: types.CallbackQuery, state: FSMContext):
-    """Отправляет кнопку возврата к списку"""
-    state_data = await state.get_data()
-    current_page = state_data.get('current_page', 1)
-    
-    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
+        else:
+            media_message_ids = [message.message_id for message in messages]
+            if not cached:
+                await remember_file_ids(session, event, messages)
+            if single:
+                return media_message_ids
+            if caption:
+                message_text = f"<b>{event.title}</b>"
+
+    await edit_or_answer(callback, message_text, reply_markup=back_keyboard, parse_mode='HTML')
+    return media_message_ids
+
+
+def build_back_to_list_keyboard(current_page: int) -> types.InlineKeyboardMarkup:
+    """Кнопка возврата к списку"""
+    return types.InlineKeyboardMarkup(inline_keyboard=[[
         types.InlineKeyboardButton(
             text="🔙 Вернуться к списку",
             callback_data=f"back_to_list_{current_page}"
         )
     ]])
-    
-    await callback.message.answer(
-        "Вернуться к событиям",
-        reply_markup=keyboard
-    )
 
-async def save_event_view_state(state: FSMContext, event_id: int):
-    """Сохраняет состояние просмотра события"""
-    await state.update_data(
-        selected_event_id=event_id,
-        viewing_mode='details'
-    )
-
-# endregion
\ No newline at end of file
+# endregion
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import List, Optional
 from aiogram import types
 
 from services.models import Event
@@ -10,7 +10,9 @@ logger = logging.getLogger(__name__)
 def build_event_list_keyboard(
     events: List[Event],
     current_page: int,
-    total_pages: int
+    total_pages: int,
+    prev_cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None,
 ) -> types.InlineKeyboardMarkup:
     """Строит инлайн-клавиатуру для списка событий.
 
@@ -18,6 +20,8 @@ def build_event_list_keyboard(
         events: Список объектов событий.
         current_page: Текущая страница пагинации (начинается с 1).
         total_pages: Общее количество страниц.
+        prev_cursor: Курсор первого события страницы, если есть предыдущая.
+        next_cursor: Курсор последнего события страницы, если есть следующая.
 
     Returns:
         InlineKeyboardMarkup: Клавиатура с кнопками для событий, навигации и возврата в меню.
@@ -51,17 +55,17 @@ def build_event_list_keyboard(
     else:
         logger.warning("Список событий пуст, создается клавиатура только с кнопкой 'В меню'")
 
-    # Кнопки навигации
+    # Кнопки навигации: курсор в callback_data избавляет от OFFSET
     nav_buttons = []
-    if current_page > 1:
+    if prev_cursor:
         nav_buttons.append(types.InlineKeyboardButton(
             text="⬅️ Назад",
-            callback_data=f"page_{current_page-1}"
+            callback_data=f"page_{current_page-1}_p_{prev_cursor}"
         ))
-    if current_page < total_pages:
+    if next_cursor:
         nav_buttons.append(types.InlineKeyboardButton(
             text="Вперед ➡️",
-            callback_data=f"page_{current_page+1}"
+            callback_data=f"page_{current_page+1}_n_{next_cursor}"
         ))
     
     if nav_buttons:
@@ -0,0 +1,138 @@
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from aiogram import types
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.events_cache import events_cache
+from crud.events import EventCategory, events_crud
+from services.event_handl.keyboards import build_event_list_keyboard
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PER_PAGE = 5
+
+CATEGORY_TITLES = {
+    EventCategory.COMPETITION.value: "🏆 Активные соревнования",
+    EventCategory.EVENT.value: "📅 Активные мероприятия",
+    EventCategory.SPONSOR.value: "🤝 Спонсоры",
+}
+MAX_TITLE_LENGTH = 30
+
+
+@dataclass
+class RenderedEventList:
+    """Готовая к отправке страница списка мероприятий."""
+
+    text: str
+    keyboard: str  # InlineKeyboardMarkup в JSON
+    page: int
+    total_pages: int
+    cursor: Optional[str] = None
+    backward: bool = False
+
+    @property
+    def reply_markup(self) -> types.InlineKeyboardMarkup:
+        return types.InlineKeyboardMarkup.model_validate_json(self.keyboard)
+
+
+def calculate_total_pages(total_items: int, per_page: int) -> int:
+    """Вычисляет общее количество страниц"""
+    return max(1, (total_items + per_page - 1) // per_page)
+
+
+def normalize_page_number(page: int, total_pages: int) -> int:
+    """Нормализует номер страницы"""
+    return max(1, min(page, total_pages))
+
+
+async def render_event_list(
+    session: AsyncSession,
+    category: str,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    backward: bool = False,
+    per_page: int = EVENTS_PER_PAGE,
+) -> Optional[RenderedEventList]:
+    """Страница активных мероприятий категории: из кэша или собранная заново.
+
+    Кэш привязан к поколению категории в events_cache, поэтому любое
+    изменение мероприятий категории (загрузка из VK, действия админа)
+    делает старые страницы недоступными. Возвращает None, если активных
+    мероприятий нет.
+    """
+    position = f"{page}{'p' if backward else 'n'}{cursor or ''}"
+    cache_key, cached = await events_cache.get("render", category, "active", position, per_page)
+    if cached is not None:
+        return cached
+
+    # Количество берется из кэша и нужно только для подписи "страница X/Y"
+    total_events = await events_crud.get_events_count(
+        session=session,
+        category=category,
+        status="active"
+    )
+    if not total_events:
+        return None
+    total_pages = calculate_total_pages(total_events, per_page)
+
+    events_page = await events_crud.get_events_page(
+        session=session,
+        cursor=cursor,
+        backward=backward,
+        limit=per_page,
+        category=category,
+        status="active"
+    )
+    if not events_page.items and cursor:
+        # Курсор устарел (события удалены) — начинаем с первой страницы
+        cursor, backward = None, False
+        events_page = await events_crud.get_events_page(
+            session=session,
+            limit=per_page,
+            category=category,
+            status="active"
+        )
+    page = 1 if cursor is None else normalize_page_number(page, total_pages)
+
+    text = (
+        f"{CATEGORY_TITLES.get(category, 'События')} (Страница {page}/{total_pages}):\n\n" +
+        "\n".join(
+            f"Пост № <b>{event.id}</b>. <b>{event.title[:MAX_TITLE_LENGTH].capitalize()}"
+            f"{'...' if len(event.title) > MAX_TITLE_LENGTH else ''}</b> - "
+            f"{event.listed_at.strftime('%Y-%m-%d')}"
+            for event in events_page.items
+        )
+    )
+    keyboard = build_event_list_keyboard(
+        events_page.items,
+        page,
+        total_pages,
+        prev_cursor=events_page.prev_cursor if events_page.has_prev else None,
+        next_cursor=events_page.next_cursor if events_page.has_next else None,
+    )
+    rendered = RenderedEventList(
+        text=text,
+        keyboard=keyboard.model_dump_json(exclude_none=True),
+        page=page,
+        total_pages=total_pages,
+        cursor=cursor,
+        backward=backward,
+    )
+    await events_cache.set(cache_key, rendered)
+    return rendered
+
+
+async def warm_event_lists(session: AsyncSession, categories: Iterable[Optional[str]]) -> None:
+    """Заново собрать первые страницы списков после изменения мероприятий.
+
+    Вызывается после инвалидации, чтобы первый пользователь, открывший
+    список, получил готовую страницу.
+    """
+    known = {c.value for c in EventCategory}
+    for category in {c for c in categories if c in known}:
+        try:
+            await render_event_list(session, category)
+        except Exception as e:
+            logger.warning(f"Failed to warm event list for {category}: {e}")
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy import BigInteger, Column, DateTime, Enum, ForeignKey, Integer
-from sqlalchemy import JSON, String, Text
+from sqlalchemy import BigInteger, Column, Computed, DateTime, Enum, ForeignKey, Index, Integer
+from sqlalchemy import JSON, String, Text, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import deferred, relationship
 
 from core.db import Base
 
@@ -30,8 +32,25 @@ class ChildRegistration(Base):
     """Модель для регистрации детей в секции."""
 
     __tablename__ = "child_registrations"
+    __table_args__ = (
+        # Список заявок в админке: ORDER BY created_at DESC, id DESC
+        Index("ix_child_registrations_created_at_id", text("created_at DESC"), text("id DESC")),
+        # Очередь заявок на рассмотрении
+        Index(
+            "ix_child_registrations_pending_created_at",
+            text("created_at DESC"),
+            text("id DESC"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # Один ребенок — одна заявка от родителя; повторная отправка
+        # формы вставляется через ON CONFLICT DO NOTHING
+        UniqueConstraint(
+            "user_id", "child_name", "child_surname", "age",
+            name="uq_child_registrations_user_child",
+        ),
+    )
 
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     child_name = Column(String, nullable=False)
     child_surname = Column(String, nullable=False)  # Новое поле для фамилии
     age = Column(Integer, nullable=False)
@@ -50,11 +69,36 @@ class Event(Base):
     """Модель для событий (соревнования, новости, спонсоры)."""
 
     __tablename__ = "events"
+    __table_args__ = (
+        # Публичные списки: WHERE category = ? AND status = 'active'
+        # ORDER BY listed_at DESC, id DESC
+        Index(
+            "ix_events_active_category_listed_at",
+            "category",
+            text("coalesce(published_at, created_at) DESC"),
+            text("id DESC"),
+            postgresql_where=text("status = 'active'"),
+        ),
+        # Список мероприятий в админке без фильтров
+        Index(
+            "ix_events_listed_at_id",
+            text("coalesce(published_at, created_at) DESC"),
+            text("id DESC"),
+        ),
+        # Полнотекстовый поиск: search_vector @@ to_tsquery('russian', ...)
+        Index("ix_events_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     vk_post_id = Column(String, unique=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     images = Column(JSON, nullable=True)
+    # Telegram file_id загруженных картинок в порядке images (не больше 10,
+    # как в альбоме); NULL — еще не загружены или images изменились
+    image_file_ids = Column(JSON(none_as_null=True), nullable=True)
+    # Неудачные попытки фоновой загрузки картинок; сбрасываются при смене images
+    media_upload_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    media_failed_at = Column(DateTime(timezone=True), nullable=True)
     status = Column(
         Enum("active", "inactive", "pending", name="news_status"),
         default="active",
@@ -65,18 +109,43 @@ class Event(Base):
     )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     published_at = Column(DateTime(timezone=True), nullable=True)
+    # Поисковый вектор заголовка (вес A) и текста (вес B); вычисляется базой,
+    # в обычных выборках не загружается
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+    ))
+
+    @hybrid_property
+    def listed_at(self):
+        """Дата мероприятия в списках: публикации в VK, а если ее нет — создания."""
+        return self.published_at or self.created_at
+
+    @listed_at.expression
+    def listed_at(cls):
+        return func.coalesce(cls.published_at, cls.created_at)
 
 
 class User(Base):
     """Модель для пользователей системы."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", text("created_at DESC"), text("id DESC")),
+    )
 
     telegram_id = Column(BigInteger, unique=True, index=True)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True)
     phone = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Когда рассылка получила отказ (бот заблокирован, аккаунт удален);
+    # такие пользователи пропускаются до следующего /start
+    blocked_at = Column(DateTime(timezone=True), nullable=True)
 
     registrations = relationship("ChildRegistration", back_populates="user")
     admin_role = relationship("Admin", back_populates="user", uselist=False)
\ No newline at end of file
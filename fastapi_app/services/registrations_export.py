@@ -0,0 +1,267 @@
+import asyncio
+import csv
+import io
+import logging
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Literal, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import Row
+from starlette.background import BackgroundTask
+
+from core.config import settings
+from core.db import async_session_maker
+from crud.child_registrations import child_reg_crud
+from services.admin import admin_login_limiter, verify_admin_credentials
+
+logger = logging.getLogger("my_app.export")
+
+ExportFormat = Literal["csv", "xlsx"]
+RegistrationStatus = Literal["pending", "approved", "rejected"]
+
+EXPORT_HEADER = [
+    "ID",
+    "Дата заявки",
+    "Статус",
+    "Фамилия",
+    "Имя",
+    "Возраст",
+    "Контакт родителя",
+    "Дата утверждения",
+    "Родитель",
+    "Telegram ID",
+    "Телефон",
+    "Email",
+]
+STATUS_LABELS = {
+    "pending": "На рассмотрении",
+    "approved": "Утверждена",
+    "rejected": "Отклонена",
+}
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Периоды для кнопок админ-бота
+EXPORT_PERIODS = {
+    "month": "За 30 дней",
+    "season": "Текущий сезон",
+    "all": "За все время",
+}
+# Сезон начинается 1 сентября
+SEASON_START_MONTH = 9
+# Строк CSV в одном куске ответа
+CSV_FLUSH_ROWS = 500
+# С этих символов Excel начинает формулу; имена и контакты вводят родители
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+export_tz = ZoneInfo(settings.export_timezone)
+
+
+def period_range(period: str, today: Optional[date] = None) -> tuple[Optional[date], Optional[date]]:
+    """Даты начала и конца (включительно) для периода из EXPORT_PERIODS."""
+    today = today or datetime.now(export_tz).date()
+    if period == "month":
+        return today - timedelta(days=30), today
+    if period == "season":
+        year = today.year if today.month >= SEASON_START_MONTH else today.year - 1
+        return date(year, SEASON_START_MONTH, 1), today
+    return None, None
+
+
+def export_filename(
+    fmt: ExportFormat,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> str:
+    parts = ["registrations"]
+    if status:
+        parts.append(status)
+    if date_from or date_to:
+        parts.append(f"{date_from or ''}_{date_to or ''}")
+    return f"{'-'.join(parts)}.{fmt}"
+
+
+def _local(value: Optional[datetime]) -> Optional[datetime]:
+    """Время в часовом поясе выгрузки без смещения: так его понимает Excel."""
+    if value is None:
+        return None
+    return value.astimezone(export_tz).replace(tzinfo=None)
+
+
+def is_formula_like(value: Any) -> bool:
+    """Строка, которую Excel прочитает как формулу."""
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES)
+
+
+def csv_value(value: Any) -> Any:
+    """Значение ячейки CSV: даты без секунд, формулы как текст (с апострофом)."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if is_formula_like(value):
+        return f"'{value}"
+    return value
+
+
+def xlsx_value(sheet: Any, value: Any) -> Any:
+    """Значение ячейки XLSX: похожая на формулу строка пишется строковой ячейкой."""
+    if not is_formula_like(value):
+        return value
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.data_type = "s"
+    return cell
+
+
+def export_values(row: Row) -> list[Any]:
+    return [
+        row.id,
+        _local(row.created_at),
+        STATUS_LABELS.get(row.status, row.status),
+        row.child_surname,
+        row.child_name,
+        row.age,
+        row.parent_contact,
+        _local(row.approved_at),
+        row.parent_name,
+        row.telegram_id,
+        row.phone,
+        row.email,
+    ]
+
+
+async def iter_csv(rows: AsyncIterator[Row]) -> AsyncIterator[bytes]:
+    """CSV кусками по CSV_FLUSH_ROWS строк.
+
+    BOM и разделитель «;» нужны, чтобы Excel с русской локалью открыл файл
+    двойным щелчком без мастера импорта.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADER)
+    count = 0
+    async for row in rows:
+        writer.writerow([csv_value(value) for value in export_values(row)])
+        count += 1
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def write_export(rows: AsyncIterator[Row], fmt: ExportFormat, path: str) -> int:
+    """Записать выгрузку в файл, вернуть число строк.
+
+    XLSX собирается в режиме write_only: openpyxl сбрасывает строки листа
+    во временный файл, а не держит их в памяти. Упаковка в zip выполняется
+    в потоке, чтобы не блокировать цикл событий. Строки, похожие на
+    формулы, в обоих форматах остаются текстом (см. is_formula_like).
+    """
+    count = 0
+
+    async def counted() -> AsyncIterator[Row]:
+        nonlocal count
+        async for row in rows:
+            count += 1
+            yield row
+
+    if fmt == "csv":
+        with open(path, "wb") as file:
+            async for chunk in iter_csv(counted()):
+                file.write(chunk)
+        return count
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Регистрации")
+    sheet.append(EXPORT_HEADER)
+    async for row in counted():
+        sheet.append([xlsx_value(sheet, value) for value in export_values(row)])
+    await asyncio.to_thread(workbook.save, path)
+    return count
+
+
+def temp_export_path(fmt: ExportFormat) -> str:
+    fd, path = tempfile.mkstemp(prefix="registrations-", suffix=f".{fmt}")
+    os.close(fd)
+    return path
+
+
+# region HTTP
+
+security = HTTPBasic()
+
+
+async def require_admin(credentials: HTTPBasicCredentials = Depends(security)) -> int:
+    """HTTP Basic с логином и паролем админ-панели."""
+    if await admin_login_limiter.is_blocked(credentials.username):
+        raise HTTPException(status.HTTP_429_TOO_MANY_REQUESTS, detail="Слишком много попыток входа")
+    admin_id = await verify_admin_credentials(credentials.username, credentials.password)
+    if admin_id is None:
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED,
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return admin_id
+
+
+export_router = APIRouter(prefix="/export", tags=["export"])
+
+
+@export_router.get("/registrations")
+async def export_registrations(
+    fmt: ExportFormat = Query("csv", alias="format"),
+    status_filter: Optional[RegistrationStatus] = Query(None, alias="status"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    admin_id: int = Depends(require_admin),
+):
+    """Выгрузка регистраций детей с данными родителей.
+
+    CSV отдается чанками по мере чтения курсора; XLSX сначала собирается во
+    временном файле (формату нужен центральный каталог zip в конце), затем
+    отдается с диска и удаляется.
+    """
+    filename = export_filename(fmt, status_filter, date_from, date_to)
+    logger.info(
+        f"Admin {admin_id} exports registrations: format={fmt}, status={status_filter}, "
+        f"from={date_from}, to={date_to}"
+    )
+
+    if fmt == "csv":
+        async def body() -> AsyncIterator[bytes]:
+            async with async_session_maker() as session:
+                rows = child_reg_crud.stream_export_rows(session, status_filter, date_from, date_to)
+                async for chunk in iter_csv(rows):
+                    yield chunk
+
+        return StreamingResponse(
+            body(),
+            media_type=MEDIA_TYPES[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    path = temp_export_path(fmt)
+    try:
+        async with async_session_maker() as session:
+            rows = child_reg_crud.stream_export_rows(session, status_filter, date_from, date_to)
+            await write_export(rows, fmt, path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[fmt],
+        filename=filename,
+        background=BackgroundTask(os.unlink, path),
+    )
+
+# endregion
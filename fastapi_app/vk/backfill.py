@@ -0,0 +1,48 @@
+"""Загрузка всей истории стены VK в таблицу events.
+
+Запуск из папки fastapi_app:
+
+    python -m vk.backfill [--offset N]
+
+Посты запрашиваются через execute (до 25 страниц по 100 за запрос,
+VK_EXECUTE_PAGES) и сохраняются пакетным upsert'ом,
+каждая страница в своей транзакции. После прерывания загрузку можно
+продолжить с последнего выведенного offset. Уведомления админам
+не отправляются.
+"""
+import argparse
+import asyncio
+import logging
+
+from core.db import async_session_maker, engine
+from core.redis import redis_client
+from vk.vk_service import VKService
+
+logger = logging.getLogger("my_app.vk_backfill")
+
+
+async def run_backfill(start_offset: int = 0) -> None:
+    vk_service = VKService(session_maker=async_session_maker)
+    inserted = updated = unchanged = 0
+    try:
+        async with async_session_maker() as session:
+            async for offset, result in vk_service.backfill(session, start_offset):
+                inserted += result.inserted
+                updated += result.updated
+                unchanged += result.unchanged
+                print(
+                    f"offset={offset} inserted={result.inserted} "
+                    f"updated={result.updated} unchanged={result.unchanged}"
+                )
+        print(f"Done: inserted={inserted} updated={updated} unchanged={unchanged}")
+    finally:
+        await vk_service.close()
+        await redis_client.aclose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка истории стены VK")
+    parser.add_argument("--offset", type=int, default=0, help="offset первой страницы wall.get")
+    args = parser.parse_args()
+    asyncio.run(run_backfill(args.offset))
@@ -1,18 +1,24 @@
 # /app/vk/celery_app.py
 import asyncio
 import logging
+from typing import Any, Coroutine, Optional, TypeVar
 from celery import Celery
-from celery.schedules import crontab
+from celery.signals import worker_process_shutdown, worker_shutdown
+from bot.media import upload_pending_media
 from core.config import settings
+from core.db import async_session_maker, engine
+from core.events_cache import events_cache
+from core.redis import redis_client
+from vk.client import create_vk_client
 from vk.vk_service import VKService
-from core.db import get_async_session
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 logger = logging.getLogger("my_app.celery")
 
+T = TypeVar("T")
+
 # Инициализация Celery
 celery_app = Celery(
     "vk_news",
@@ -35,55 +41,117 @@ celery_app.conf.update(
     worker_pool="solo",  # Используем solo пул для избежания конкуренции
 )
 
-# Настройка движка базы данных
-engine = create_async_engine(
-    settings.database_url,
-    echo=True,
-    pool_size=5,  # Максимум 5 соединений
-    max_overflow=10,  # Дополнительные соединения при необходимости
-    pool_timeout=30,  # Таймаут ожидания соединения
-)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
 
-async def fetch_and_save_news_task_async():
+class WorkerRuntime:
+    """Долгоживущие ресурсы процесса воркера.
+
+    Один цикл событий на процесс: пул соединений движка, клиенты Redis,
+    клиент VK и HTTP-сессия бота переживают запуски задач, а не
+    создаются и закрываются каждый раз. Создается лениво при первой
+    задаче (в solo-пуле сигнал worker_process_init не приходит) и
+    закрывается по сигналам остановки воркера.
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.bot = Bot(
+            token=settings.telegram_bot_token,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        self.vk_client = create_vk_client()
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self.loop.run_until_complete(coro)
+
+    async def _aclose(self) -> None:
+        await self.vk_client.close()
+        await self.bot.session.close()
+        await events_cache.cache.close()
+        await redis_client.aclose()
+        await engine.dispose()
+
+    def close(self) -> None:
+        try:
+            self.run(self._aclose())
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        finally:
+            self.loop.close()
+            logger.info("Celery worker runtime closed")
+
+
+_runtime: Optional[WorkerRuntime] = None
+
+
+def get_runtime() -> WorkerRuntime:
+    global _runtime
+    if _runtime is None:
+        _runtime = WorkerRuntime()
+        logger.info("Celery worker runtime started")
+    return _runtime
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def shutdown_runtime(**kwargs: Any) -> None:
+    global _runtime
+    if _runtime is not None:
+        _runtime.close()
+        _runtime = None
+
+
+async def fetch_and_save_news_task_async(runtime: WorkerRuntime):
     """Асинхронная задача для получения и сохранения новостей VK."""
     logger.info("Starting fetch_and_save_news_task_async")
-    bot = None
     try:
-        bot = Bot(
-            token=settings.telegram_bot_token,
-            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        vk_service = VKService(
+            bot=runtime.bot,
+            client=runtime.vk_client,
+            session_maker=async_session_maker,
         )
-        vk_service = VKService(bot=bot)
-        news = await vk_service.fetch_news(count=10)
-        async with async_session() as session:
-            await vk_service.save_news_to_db(session, news)
+        async with async_session_maker() as session:
+            result = await vk_service.sync_new_posts(session)
+        if settings.telegram_media_chat_id:
+            # Фоновая стадия: картинки новых постов загружаются в Telegram один раз
+            try:
+                async with async_session_maker() as session:
+                    await upload_pending_media(
+                        runtime.bot,
+                        session,
+                        settings.telegram_media_chat_id,
+                        limit=settings.telegram_media_upload_batch,
+                        max_attempts=settings.telegram_media_max_attempts,
+                        retry_delay=settings.telegram_media_retry_delay,
+                    )
+            except Exception as e:
+                # Не загруженные сейчас картинки догрузятся при следующем запуске
+                logger.warning(f"Media upload stage failed: {e}", exc_info=True)
         logger.info("Successfully completed fetch_and_save_news_task_async")
-        return {"status": "success", "count": len(news)}
+        return {
+            "status": "success",
+            "inserted": result.inserted,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+        }
     except Exception as e:
         logger.error(f"Error in fetch_and_save_news_task_async: {str(e)}", exc_info=True)
         raise
-    finally:
-        if bot:
-            await bot.session.close()
 
 @celery_app.task(name="fetch_and_save_news_task", bind=True, max_retries=3)
 def fetch_and_save_news_task(self):
-    """Синхронная обёртка для вызова асинхронной задачи."""
+    """Синхронная обёртка: задача выполняется в цикле событий воркера."""
+    runtime = get_runtime()
     try:
-        return asyncio.run(fetch_and_save_news_task_async())
+        return runtime.run(fetch_and_save_news_task_async(runtime))
     except Exception as e:
         logger.error(f"Task failed: {str(e)}", exc_info=True)
         raise self.retry(exc=e, countdown=5)
-    finally:
-        # Закрываем пул соединений
-        asyncio.run(engine.dispose())
 
 # Настройка Celery Beat
 celery_app.conf.beat_schedule = {
-    "fetch-vk-news-every-hour": {
+    "sync-vk-news": {
         "task": "fetch_and_save_news_task",
-        "schedule": crontab(minute=0, hour="*"),
-        "options": {"expires": 300},
+        "schedule": settings.vk_sync_interval,
+        "options": {"expires": min(300, settings.vk_sync_interval)},
     },
 }
\ No newline at end of file
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Optional
+
+import aiohttp
+from prometheus_client import Counter, Histogram
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from core.config import settings
+from core.rate_limit import TokenBucket
+
+logger = logging.getLogger("my_app.vk_client")
+
+# Prometheus метрики
+vk_requests_total = Counter(
+    "vk_api_requests_total",
+    "Total VK API requests",
+    ["status"]
+)
+vk_request_duration = Histogram(
+    "vk_api_request_duration_seconds",
+    "VK API request duration"
+)
+
+# Коды ошибок VK, после которых запрос имеет смысл повторить:
+# 1 — неизвестная ошибка, 6 — слишком много запросов в секунду,
+# 9 — flood control, 10 — внутренняя ошибка сервера.
+# Остальные (5 — авторизация, 15 — доступ запрещен, 100 — параметры,
+# 29 — дневной лимит метода и т.д.) повторять бесполезно.
+RETRYABLE_ERROR_CODES = frozenset({1, 6, 9, 10})
+
+# Максимум вызовов API в одном execute
+EXECUTE_MAX_CALLS = 25
+
+
+class VKAPIError(Exception):
+    """Ошибка, которую вернул VK API."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"VK API error {code}: {message}")
+        self.code = code
+        self.message = message
+
+    @property
+    def retryable(self) -> bool:
+        return self.code in RETRYABLE_ERROR_CODES
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, VKAPIError):
+        return exc.retryable
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class VKClient:
+    """Клиент VK API с общим пулом соединений и ограничением частоты.
+
+    Все запросы идут через одну aiohttp-сессию и ведро токенов
+    (по умолчанию 3 запроса в секунду — лимит VK для ключа сообщества).
+    Повторяются только сетевые ошибки и ошибки VK из RETRYABLE_ERROR_CODES.
+    Несколько вызовов объединяются в один запрос execute.
+    """
+
+    base_url = "https://api.vk.com/method"
+
+    def __init__(
+        self,
+        access_token: str,
+        version: str = "5.131",
+        rate: float = 3,
+        max_attempts: int = 5,
+        timeout: float = 30,
+    ) -> None:
+        self.access_token = access_token
+        self.version = version
+        self.max_attempts = max_attempts
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limiter = TokenBucket(rate)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Сессия создается внутри работающего цикла событий
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _request(self, method: str, params: dict[str, Any]) -> Any:
+        await self.limiter.acquire()
+        data = {**params, "access_token": self.access_token, "v": self.version}
+        start_time = time.time()
+        try:
+            async with self.session.post(f"{self.base_url}/{method}", data=data) as response:
+                response.raise_for_status()
+                payload = await response.json()
+        except Exception:
+            vk_requests_total.labels(status="error").inc()
+            raise
+        finally:
+            vk_request_duration.observe(time.time() - start_time)
+
+        # Неудачный вызов внутри execute возвращает false, а описание — в execute_errors
+        errors = [payload["error"]] if "error" in payload else payload.get("execute_errors")
+        if errors:
+            vk_requests_total.labels(status="error").inc()
+            raise VKAPIError(errors[0].get("error_code", 0), errors[0].get("error_msg", ""))
+        vk_requests_total.labels(status="success").inc()
+        return payload
+
+    async def _request_with_retry(self, method: str, params: dict[str, Any]) -> Any:
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_exponential(min=1, max=10),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=lambda retry_state: logger.warning(
+                f"Retrying VK API {method} (attempt {retry_state.attempt_number}): "
+                f"{retry_state.outcome.exception()}"
+            ),
+            reraise=True,
+        ):
+            with attempt:
+                return await self._request(method, params)
+
+    async def call(self, method: str, **params: Any) -> Any:
+        """Вызвать метод VK API и вернуть поле response."""
+        logger.debug(f"VK API call {method}: {params}")
+        payload = await self._request_with_retry(method, params)
+        return payload["response"]
+
+    async def execute(self, calls: list[tuple[str, dict[str, Any]]]) -> list[Any]:
+        """Выполнить до EXECUTE_MAX_CALLS вызовов одним запросом execute.
+
+        :param calls: список пар (метод, параметры)
+        :return: ответы в порядке вызовов.
+        :raises VKAPIError: если хотя бы один вызов внутри execute не удался.
+        """
+        if not calls:
+            return []
+        if len(calls) > EXECUTE_MAX_CALLS:
+            raise ValueError(f"execute принимает не больше {EXECUTE_MAX_CALLS} вызовов")
+        code = "return [" + ",".join(
+            f"API.{method}({json.dumps(params, ensure_ascii=False)})" for method, params in calls
+        ) + "];"
+        payload = await self._request_with_retry("execute", {"code": code})
+        return payload["response"]
+
+    async def call_many(self, calls: list[tuple[str, dict[str, Any]]]) -> list[Any]:
+        """Выполнить любое число вызовов пачками по EXECUTE_MAX_CALLS."""
+        results: list[Any] = []
+        for start in range(0, len(calls), EXECUTE_MAX_CALLS):
+            results.extend(await self.execute(calls[start:start + EXECUTE_MAX_CALLS]))
+        return results
+
+
+def create_vk_client() -> VKClient:
+    return VKClient(settings.vk_access_token, rate=settings.vk_requests_per_second)
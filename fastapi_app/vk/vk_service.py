@@ -1,143 +1,251 @@
-import aiohttp
-import time
-from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime
-from services.models import Event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from datetime import datetime, timezone
+from typing import AsyncIterator
+from redis.asyncio import Redis
 from core.config import settings
-from sqlalchemy import select
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from core.db import async_session_maker
+from core.events_cache import events_cache
+from core.redis import redis_client
+from crud.events import UpsertResult, events_crud
+from crud.users import users_crud
+from services.event_handl.render import warm_event_lists
 from aiogram import Bot
-from prometheus_client import Counter, Histogram
+from bot.notifications import NotificationDispatcher
+from vk.client import VKClient, create_vk_client
 import logging
 
 logger = logging.getLogger("my_app.vk_service")
 
-# Prometheus метрики
-vk_requests_total = Counter(
-    "vk_api_requests_total",
-    "Total VK API requests",
-    ["status"]
-)
-vk_request_duration = Histogram(
-    "vk_api_request_duration_seconds",
-    "VK API request duration"
-)
+# Максимальный размер страницы wall.get
+WALL_PAGE_SIZE = 100
+
 
 class VKService:
-    def __init__(self, bot: Bot = None):
-        self.base_url = "https://api.vk.com/method"
-        self.access_token = settings.vk_access_token
+    def __init__(
+        self,
+        bot: Bot = None,
+        redis: Redis = None,
+        client: VKClient = None,
+        session_maker: async_sessionmaker = async_session_maker,
+    ):
         self.group_id = settings.vk_group_id
+        # Фабрика сессий для работы вне сессии загрузки (прогрев кэша)
+        self.session_maker = session_maker
         self.bot = bot
+        self.notifier = NotificationDispatcher(bot) if bot else None
+        self.redis = redis or redis_client
+        self._own_client = client is None
+        self.client = client or create_vk_client()
+
+    async def close(self) -> None:
+        """Закрыть клиент VK, если он создан этим сервисом."""
+        if self._own_client:
+            await self.client.close()
+
+    @property
+    def watermark_key(self) -> str:
+        return f"vk_sync:{self.group_id}:last_post_id"
+
+    async def get_watermark(self) -> int:
+        """Id последнего сохраненного поста стены (0, если синхронизации не было)."""
+        value = await self.redis.get(self.watermark_key)
+        return int(value) if value else 0
+
+    async def set_watermark(self, post_id: int) -> None:
+        await self.redis.set(self.watermark_key, post_id)
+
+    async def sync_new_posts(self, session: AsyncSession) -> UpsertResult:
+        """Инкрементальная синхронизация стены до отметки последнего поста.
+
+        Листает wall.get страницами по WALL_PAGE_SIZE, пока не встретит пост
+        с id не больше отметки. Каждая полученная страница сохраняется целиком:
+        правки уже загруженных постов тоже попадают в базу, а неизмененные
+        строки upsert пропускает. Отметка нужна, чтобы остановить листание и
+        выбрать новые посты для сводки; она сдвигается только после успешного
+        прохода, поэтому сбой посередине приводит к повторной (идемпотентной)
+        загрузке тех же постов. Без отметки загружается только первая
+        страница — историю догружает vk.backfill.
+        """
+        watermark = await self.get_watermark()
+        total = UpsertResult()
+        newest = watermark
+        for page in range(settings.vk_sync_max_pages):
+            items = await self.fetch_news(count=WALL_PAGE_SIZE, offset=page * WALL_PAGE_SIZE)
+            # Закрепленный пост идет первым вне хронологии, по нему не останавливаемся
+            reached = any(
+                item["id"] <= watermark for item in items if not item.get("is_pinned")
+            )
+            if items:
+                result = await self.save_news_to_db(session, items, notify=False, warm=False)
+                total.merge(result)
+                newest = max(newest, *(item["id"] for item in items))
+            if reached or not watermark or len(items) < WALL_PAGE_SIZE:
+                break
+        else:
+            logger.warning(
+                f"VK sync stopped after {settings.vk_sync_max_pages} pages "
+                f"before reaching post {watermark}"
+            )
+
+        if newest > watermark:
+            await self.set_watermark(newest)
+        await self.warm_caches(total.categories)
+        # Все новые посты за проход уходят одной сводкой; вставленные заново
+        # старые посты (например, удаленные админом) в нее не попадают
+        await self.notify_new_events(
+            session, [row for row in total.new_events if int(row.vk_post_id) > watermark]
+        )
+        logger.info(
+            f"VK sync done: watermark {watermark} -> {newest}, inserted={total.inserted}, "
+            f"updated={total.updated}, unchanged={total.unchanged}"
+        )
+        return total
+
+    async def backfill(
+        self,
+        session: AsyncSession,
+        start_offset: int = 0,
+    ) -> AsyncIterator[tuple[int, UpsertResult]]:
+        """Загрузить всю историю стены страницами по WALL_PAGE_SIZE.
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(min=1, max=10),
-        retry=retry_if_exception_type(aiohttp.ClientError),
-        before_sleep=lambda retry_state: logger.warning(
-            f"Retrying VK API request (attempt {retry_state.attempt_number})..."
-        ),
-    )
-    async def fetch_news(self, count: int = 10) -> list[dict]:
-        """Получение новостей из группы VK с повторными попытками."""
-        logger.info(f"Fetching {count} news from VK group {self.group_id}")
-        start_time = time.time()
+        Страницы запрашиваются пачками через execute (vk_execute_pages за
+        запрос), каждая страница сохраняется и коммитится отдельно, в памяти
+        держится не больше одной пачки. Отдает (offset следующей страницы,
+        итог страницы), чтобы прерванную загрузку можно было продолжить.
+        """
+        offset = start_offset
+        newest = 0
+        categories: set[str] = set()
+        finished = False
+        while not finished:
+            pages = await self.fetch_pages(offset, settings.vk_execute_pages)
+            for items in pages:
+                if items:
+                    result = await self.save_news_to_db(session, items, notify=False, warm=False)
+                    categories |= result.categories
+                    if offset == 0:
+                        newest = max(item["id"] for item in items)
+                    offset += len(items)
+                    yield offset, result
+                if len(items) < WALL_PAGE_SIZE:
+                    finished = True
+                    break
+        await self.warm_caches(categories)
+        # Инкрементальная синхронизация продолжит с самого свежего поста
+        if newest > await self.get_watermark():
+            await self.set_watermark(newest)
+
+    def _wall_params(self, count: int, offset: int) -> dict:
+        return {"owner_id": f"-{self.group_id}", "count": count, "offset": offset, "extended": 1}
+
+    async def fetch_news(self, count: int = 10, offset: int = 0) -> list[dict]:
+        """Получение новостей из группы VK."""
+        logger.info(f"Fetching {count} news from VK group {self.group_id} at offset {offset}")
         try:
-            async with aiohttp.ClientSession() as session:
-                params = {
-                    "access_token": self.access_token,
-                    "v": "5.131",
-                    "owner_id": f"-{self.group_id}",
-                    "count": count,
-                    "extended": 1,
-                }
-                logger.debug(f"VK API params: {params}")
-                async with session.get(f"{self.base_url}/wall.get", params=params) as response:
-                    data = await response.json()
-                    logger.debug(f"VK API response: {data}")
-                    vk_request_duration.observe(time.time() - start_time)
-                    if response.status == 200:
-                        if "error" in data:
-                            error_msg = data["error"]["error_msg"]
-                            error_code = data["error"]["error_code"]
-                            logger.error(f"VK API error {error_code}: {error_msg}")
-                            vk_requests_total.labels(status="error").inc()
-                            raise Exception(f"VK API error: {error_msg}")
-                        vk_requests_total.labels(status="success").inc()
-                        items = data.get("response", {}).get("items", [])
-                        logger.info(f"Received {len(items)} news items from VK")
-                        return items
-                    else:
-                        logger.error(f"VK API request failed with status {response.status}")
-                        vk_requests_total.labels(status="error").inc()
-                        raise Exception(f"VK API error: {response.status}")
+            response = await self.client.call("wall.get", **self._wall_params(count, offset))
         except Exception as e:
-            vk_request_duration.observe(time.time() - start_time)
             logger.error(f"Fetch news failed: {str(e)}")
             raise
+        items = response.get("items", [])
+        logger.info(f"Received {len(items)} news items from VK")
+        return items
+
+    async def fetch_pages(self, offset: int, pages: int) -> list[list[dict]]:
+        """Получить несколько страниц стены подряд одним запросом execute."""
+        calls = [
+            ("wall.get", self._wall_params(WALL_PAGE_SIZE, offset + page * WALL_PAGE_SIZE))
+            for page in range(pages)
+        ]
+        responses = await self.client.call_many(calls)
+        return [response.get("items", []) for response in responses]
 
-    async def save_news_to_db(self, session: AsyncSession, news: list[dict]):
-        """Сохранение новостей в таблицу Events и отправка уведомлений."""
+    @staticmethod
+    def news_to_rows(news: list[dict]) -> list[dict]:
+        """Преобразовать посты VK в строки для пакетной вставки в events.
+
+        Повторы одного поста в выдаче схлопываются: ON CONFLICT не может
+        обновить одну строку дважды в одном запросе.
+        """
+        rows = {}
+        for item in news:
+            images = []
+            for attachment in item.get("attachments", []):
+                if attachment["type"] == "photo":
+                    sizes = attachment["photo"]["sizes"]
+                    largest = max(sizes, key=lambda x: x["width"] * x["height"])
+                    images.append(largest["url"])
+            text = item.get("text", "")
+            vk_id = str(item["id"])
+            rows[vk_id] = {
+                "vk_post_id": vk_id,
+                "title": text[:100] or "Без заголовка",
+                "content": text or "Без текста",
+                "images": images,
+                "status": "active",
+                "category": "event",
+                "published_at": (
+                    datetime.fromtimestamp(item["date"], tz=timezone.utc) if item.get("date") else None
+                ),
+            }
+        return list(rows.values())
+
+    async def save_news_to_db(
+        self,
+        session: AsyncSession,
+        news: list[dict],
+        notify: bool = True,
+        warm: bool = True,
+    ) -> UpsertResult:
+        """Сохранение новостей в таблицу Events и отправка уведомлений.
+
+        Новые посты вставляются, отредактированные в VK — обновляются.
+        При постраничной загрузке warm=False: кэш списков прогревается один
+        раз за проход (warm_caches).
+        """
         logger.info(f"Saving {len(news)} news items to database")
-        # Собираем все vk_post_id для проверки одним запросом
-        vk_ids = [str(item["id"]) for item in news]
-        async with session.begin():  # Явное начало транзакции
-            # Проверяем существующие события одним запросом
-            result = await session.execute(
-                select(Event.vk_post_id).where(Event.vk_post_id.in_(vk_ids))
-            )
-            existing_ids = set(result.scalars().all())
-            
-            new_events = []
-            for item in news:
-                vk_id = str(item["id"])
-                if vk_id not in existing_ids:
-                    images = []
-                    if "attachments" in item:
-                        for attachment in item.get("attachments", []):
-                            if attachment["type"] == "photo":
-                                sizes = attachment["photo"]["sizes"]
-                                largest = max(sizes, key=lambda x: x["width"] * x["height"])
-                                images.append(largest["url"])
-
-                    event = Event(
-                        vk_post_id=vk_id,
-                        title=item.get("text", "")[:100] or "Без заголовка",
-                        content=item.get("text", "") or "Без текста",
-                        images=images,
-                        status="active",
-                        category="event",
-                        created_at=datetime.utcnow(),
-                        published_at=datetime.fromtimestamp(item["date"]) if item["date"] else None,
-                    )
-                    new_events.append(event)
-                    logger.debug(f"Added new event with vk_post_id {vk_id}")
-
-            if new_events:
-                session.add_all(new_events)
-                try:
-                    await session.commit()
-                    logger.info(f"Successfully saved {len(new_events)} new events to database")
-                except Exception as e:
-                    logger.error(f"Failed to save events to database: {str(e)}", exc_info=True)
-                    await session.rollback()
-                    raise
-            else:
-                logger.info("No new events to save")
-
-            # Отправка уведомлений администраторам
-            if self.bot and new_events:
-                telegram_id = getattr(settings, "answer_telegram_id", None) or settings.first_superuser_telegram_id
-                if not telegram_id:
-                    logger.warning("No Telegram ID provided, skipping notifications")
-                    return
-
-                for event in new_events:
-                    try:
-                        await self.bot.send_message(
-                            chat_id=telegram_id,
-                            text=f"Новое событие: {event.title}\nID: {event.vk_post_id}",
-                        )
-                        logger.info(f"Sent Telegram notification for event {event.vk_post_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send Telegram notification for event {event.vk_post_id}: {str(e)}")
+        rows = self.news_to_rows(news)
+        try:
+            async with session.begin():
+                result = await events_crud.upsert_vk_posts(session, rows)
+        except Exception as e:
+            logger.error(f"Failed to save events to database: {str(e)}", exc_info=True)
+            raise
+
+        if result.categories:
+            await events_cache.invalidate(*result.categories)
+            if warm:
+                await self.warm_caches(result.categories)
+
+        if notify:
+            await self.notify_new_events(session, result.new_events)
+        return result
+
+    async def warm_caches(self, categories: set[str]) -> None:
+        """Прогреть первые страницы списков отдельной короткой сессией.
+
+        Сессия загрузки для этого не используется: чтение начало бы в ней
+        новую транзакцию, и следующий session.begin() упал бы. Сессия берется
+        из фабрики, переданной в сервис, то есть из пула вызывающего процесса.
+        """
+        if not categories:
+            return
+        async with self.session_maker() as session:
+            await warm_event_lists(session, categories)
+
+    async def notify_new_events(self, session: AsyncSession, new_events: list) -> None:
+        """Разослать администраторам одну сводку о новых мероприятиях.
+
+        Вызывается после коммита: транзакция не держится открытой на время
+        запросов к Telegram.
+        """
+        if not self.notifier or not new_events:
+            return
+        chat_ids = await users_crud.get_admin_telegram_ids(session)
+        # Сессия больше не нужна, не держим соединение на время рассылки
+        await session.close()
+        if settings.first_superuser_telegram_id:
+            chat_ids.append(settings.first_superuser_telegram_id)
+        if not chat_ids:
+            logger.warning("No Telegram ID provided, skipping notifications")
+            return
+        await self.notifier.notify_new_events(chat_ids, new_events)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Модули приложения импортируются от fastapi_app, как при запуске сервиса
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fastapi_app"))
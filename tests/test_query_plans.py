@@ -0,0 +1,34 @@
+"""Планы запросов списков и поиска на живом PostgreSQL (db/explain_check.py).
+
+Нужна база с примененными миграциями (`alembic -c db/alembic.ini upgrade head`).
+Если настройки PostgreSQL не заданы (POSTGRES_USER, POSTGRES_PASSWORD,
+POSTGRES_DB и остальные обязательные поля Settings), модуль пропускается.
+"""
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+try:
+    from core.db import engine
+    from db.explain_check import explain_plans, list_queries, plan_problems
+except ValidationError as e:
+    pytest.skip(f"PostgreSQL is not configured: {e.error_count()} missing settings", allow_module_level=True)
+
+QUERIES = list_queries()
+
+
+@pytest.fixture(scope="module")
+def plans() -> dict:
+    async def explain() -> dict:
+        try:
+            return await explain_plans(QUERIES)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(explain())
+
+
+@pytest.mark.parametrize("name", list(QUERIES))
+def test_query_plan_uses_index(name: str, plans: dict) -> None:
+    assert plan_problems(QUERIES[name], plans[name]) == []